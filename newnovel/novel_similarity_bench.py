@@ -0,0 +1,350 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any
+
+from novel_similarity_webui import (
+    DEFAULT_STOPWORDS,
+    AnalysisCache,
+    EngineOptions,
+    ProgressCallback,
+    analyze_folder,
+    parse_stopwords,
+)
+
+# 语料生成规则变化时递增，旧目录与旧基线不再复用
+GENERATOR_VERSION = 1
+REPORT_VERSION = 2
+DEFAULT_SIZES = "1000,10000,100000,1000000"
+PHASES = ("scanning", "ngrams", "postings", "pairs", "linking", "grouping")
+CORPUS_MARKER = ".bench_corpus.json"
+CORPUS_EXTENSIONS = ".txt,.doc,.docx,.epub"
+
+TITLE_HEADS = [
+    "都市", "修仙", "重生", "穿越", "末世", "星际", "校园", "江湖", "仙侠", "玄幻",
+    "赘婿", "神医", "战神", "龙王", "剑仙", "魔尊", "帝尊", "天师", "兵王", "总裁",
+]
+# 标题主体由常用字随机组词，字表足够大时不同作品之间很少共享长片段
+TITLE_CHARS = (
+    "天地玄黄宇宙洪荒日月盈昃辰宿列张寒来暑往秋收冬藏云腾致雨露结为霜金生丽水玉出昆冈剑号巨阙珠称夜光"
+    "果珍李柰菜重芥姜海咸河淡鳞潜羽翔龙师火帝鸟官人皇始制文字乃服衣裳推位让国有虞陶唐吊民伐罪周发殷汤"
+    "坐朝问道垂拱平章爱育黎首臣伏戎羌遐迩一体率宾归王鸣凤在竹白驹食场化被草木赖及万方盖此身发四大五常"
+    "恭惟鞠养岂敢毁伤女慕贞洁男效才良知过必改得能莫忘罔谈彼短靡恃己长信使可覆器欲难量墨悲丝染诗赞羔羊"
+    "景行维贤克念作圣德建名立形端表正空谷传声虚堂习听祸因恶积福缘善庆尺璧非宝寸阴是竞资父事君曰严与敬"
+    "孝当竭力忠则尽命临深履薄夙兴温凊似兰斯馨如松之盛川流不息渊澄取映容止若思言辞安定笃初诚美慎终宜令"
+)
+AUTHOR_SURNAMES = ["北辰", "南宫", "西门", "东方", "慕容", "唐家", "天蚕", "辰东", "风凌", "耳根", "猫腻", "烽火"]
+AUTHOR_NAMES = ["三少", "土豆", "天下", "小刀", "戏子", "冰心", "无忌", "青衫", "落雪", "听风"]
+VERSION_TAGS = ["完整版", "修订版", "精校", "精修版", "未删减", "未删节", "全文", "完结", "第一人称", "番外"]
+EXTENSIONS = [".txt", ".txt", ".txt", ".doc", ".docx", ".epub"]
+
+
+def make_title(rng: random.Random) -> str:
+    body = "".join(rng.choice(TITLE_CHARS) for _ in range(rng.randint(3, 7)))
+    if rng.random() < 0.4:
+        return rng.choice(TITLE_HEADS) + "之" + body
+    return body
+
+
+def make_author(rng: random.Random) -> str:
+    # 少量高产作者反复出现，其余作者名基本不重复
+    if rng.random() < 0.05:
+        return rng.choice(AUTHOR_SURNAMES) + rng.choice(AUTHOR_NAMES)
+    return rng.choice(AUTHOR_SURNAMES) + "".join(rng.choice(TITLE_CHARS) for _ in range(rng.randint(1, 2)))
+
+
+def make_variant(rng: random.Random, title: str, author: str, stopwords: list[str]) -> str:
+    # 同一作品的不同下载版本：附作者、版本标签、停用词、卷号或来源前缀
+    name = title
+    roll = rng.random()
+    if roll < 0.3:
+        name = f"【{author}】{name}"
+    elif roll < 0.5:
+        name = f"{name}_作者_{author}"
+    elif roll < 0.6:
+        name = f"{name} by {author}"
+    if rng.random() < 0.5:
+        name += f"（{rng.choice(VERSION_TAGS)}）"
+    if rng.random() < 0.3:
+        name += rng.choice(stopwords)
+    if rng.random() < 0.2:
+        name += f" {rng.randint(1, 12):02d}"
+    if rng.random() < 0.1:
+        name = f"[{rng.choice(['搜书吧', 'soushu', '小说网'])}]{name}"
+    return name
+
+
+def generate_names(count: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    stopwords = parse_stopwords(",".join(DEFAULT_STOPWORDS))
+    names: list[str] = []
+    seen: set[str] = set()
+    while len(names) < count:
+        title = make_title(rng)
+        author = make_author(rng)
+        # 多数作品只有一份，少数有多个版本，形成大小不一的候选分组
+        copies = 1 if rng.random() < 0.7 else rng.randint(2, 6)
+        for _ in range(copies):
+            stem = make_variant(rng, title, author, stopwords)
+            name = stem + rng.choice(EXTENSIONS)
+            suffix = 1
+            while name in seen:
+                suffix += 1
+                name = f"{stem}_{suffix}{os.path.splitext(name)[1]}"
+            seen.add(name)
+            names.append(name)
+            if len(names) >= count:
+                break
+    return names
+
+
+def default_corpus_root() -> Path:
+    shm = Path("/dev/shm")
+    if shm.is_dir() and os.access(shm, os.W_OK):
+        return shm / "novel_similarity_bench"
+    return Path(tempfile.gettempdir()) / "novel_similarity_bench"
+
+
+def ensure_corpus(root: Path, size: int, seed: int) -> Path:
+    folder = root / f"corpus_{size}_s{seed}_g{GENERATOR_VERSION}"
+    marker = folder / CORPUS_MARKER
+    if marker.is_file():
+        if json.loads(marker.read_text(encoding="utf-8")).get("complete"):
+            return folder
+        # 上次生成中途退出，目录由本脚本创建，整体重建
+        shutil.rmtree(folder)
+    elif folder.exists():
+        raise ValueError(f"{folder} 已存在但不是生成的语料目录，不会覆盖")
+    folder.mkdir(parents=True)
+    # 先写标记再生成文件，--clean 和重建只认带标记的目录
+    meta = {"files": size, "seed": seed, "generator": GENERATOR_VERSION}
+    marker.write_text(json.dumps({**meta, "complete": False}), encoding="utf-8")
+    for name in generate_names(size, seed):
+        (folder / name).touch()
+    marker.write_text(json.dumps({**meta, "complete": True}), encoding="utf-8")
+    return folder
+
+
+def remove_corpus(folder: Path) -> None:
+    # 只删除带标记的生成语料目录，语料根目录及其中的其他内容保持不动
+    if (folder / CORPUS_MARKER).is_file():
+        shutil.rmtree(folder)
+
+
+def analyze_corpus(
+    folder: Path,
+    args: argparse.Namespace,
+    lengths: list[int],
+    progress: ProgressCallback | None = None,
+) -> dict[str, Any]:
+    # 走与 WebUI/CLI 相同的 analyze_folder，每次使用新的分析缓存且不带扫描缓存，各阶段都真实计算
+    return analyze_folder(
+        str(folder),
+        CORPUS_EXTENSIONS,
+        ",".join(DEFAULT_STOPWORDS),
+        lengths,
+        args.min_pair_matches,
+        args.max_df_abs,
+        args.max_df_ratio,
+        analysis_cache=AnalysisCache(max_entries=1),
+        progress=progress,
+        engine_options=EngineOptions(workers=args.pair_workers),
+    )
+
+
+def bench_size(folder: Path, args: argparse.Namespace, lengths: list[int]) -> dict[str, Any]:
+    phases: dict[str, dict[str, float]] = {name: {} for name in PHASES}
+    kept: dict[str, Any] = {}
+
+    def record_pairs(phase: str, counters: dict[str, Any]) -> None:
+        if phase == "pairs" and counters.get("done"):
+            kept["postings_kept"] = counters.get("postings_kept")
+
+    # 计时取多次中的最快一次，各阶段耗时取自分析结果的 stats.phase_seconds
+    result: dict[str, Any] = {}
+    for _ in range(max(1, args.repeat)):
+        result = analyze_corpus(folder, args, lengths, record_pairs)
+        for name, seconds in result["stats"]["phase_seconds"].items():
+            best = phases.setdefault(name, {}).get("seconds")
+            phases[name]["seconds"] = seconds if best is None else min(best, seconds)
+
+    if not args.no_memory:
+        # 内存单独跑一遍，tracemalloc 的开销不计入耗时；阶段边界与 phase_seconds 相同，即各阶段的 done 事件
+        tracemalloc.start()
+        try:
+            base = tracemalloc.get_traced_memory()[0]
+
+            def traced(phase: str, counters: dict[str, Any]) -> None:
+                nonlocal base
+                if counters.get("done"):
+                    current, peak = tracemalloc.get_traced_memory()
+                    phases.setdefault(phase, {})["peak_bytes"] = max(0, peak - base)
+                    tracemalloc.reset_peak()
+                    base = current
+
+            analyze_corpus(folder, args, lengths, traced)
+        finally:
+            tracemalloc.stop()
+
+    stats = result["stats"]
+    counters = {
+        "files": result["total_files"],
+        "tokens": stats["total_tokens"],
+        "postings_kept": kept.get("postings_kept"),
+        "pairs": stats["candidate_pairs"],
+        "linked_pairs": stats["linked_pairs"],
+        "groups": result["group_count"],
+        "grouped_files": result["duplicate_file_count"],
+    }
+    return {
+        "size": counters["files"],
+        "counters": counters,
+        "phases": phases,
+        "total_seconds": sum(p.get("seconds", 0.0) for p in phases.values()),
+    }
+
+
+def compare_reports(
+    current: dict[str, Any],
+    baseline: dict[str, Any],
+    threshold: float,
+    min_seconds: float,
+) -> list[str]:
+    regressions: list[str] = []
+    base_by_size = {entry["size"]: entry for entry in baseline.get("results", [])}
+    print(f"{'文件数':>9} {'阶段':<10} {'基线':>10} {'当前':>10} {'变化':>8}")
+    for entry in current["results"]:
+        base_entry = base_by_size.get(entry["size"])
+        if base_entry is None:
+            print(f"{entry['size']:>9} 基线中无此规模，跳过")
+            continue
+        for name in PHASES:
+            cur = entry["phases"].get(name, {})
+            old = base_entry["phases"].get(name, {})
+            if "seconds" in cur and "seconds" in old:
+                ratio = cur["seconds"] / old["seconds"] if old["seconds"] > 0 else 1.0
+                flag = ratio > 1 + threshold and cur["seconds"] - old["seconds"] > min_seconds
+                print(
+                    f"{entry['size']:>9} {name:<10} {old['seconds']:>9.3f}s {cur['seconds']:>9.3f}s "
+                    f"{(ratio - 1) * 100:>+7.1f}%{'  ← 变慢' if flag else ''}"
+                )
+                if flag:
+                    regressions.append(f"{entry['size']} 文件 {name} 耗时 {old['seconds']:.3f}s → {cur['seconds']:.3f}s")
+            if "peak_bytes" in cur and old.get("peak_bytes"):
+                ratio = cur["peak_bytes"] / old["peak_bytes"]
+                if ratio > 1 + threshold and cur["peak_bytes"] - old["peak_bytes"] > 1 << 20:
+                    regressions.append(
+                        f"{entry['size']} 文件 {name} 峰值内存 {old['peak_bytes'] / 1048576:.1f}MB → "
+                        f"{cur['peak_bytes'] / 1048576:.1f}MB"
+                    )
+        if entry["counters"] != base_entry["counters"]:
+            # 同一语料下计数不同说明分析结果变了，单独提示
+            print(f"{entry['size']:>9} 计数与基线不同：{base_entry['counters']} → {entry['counters']}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="小说同名筛选各分析阶段的基准测试（合成语料）")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"语料文件数，逗号分隔，默认 {DEFAULT_SIZES}")
+    parser.add_argument("--seed", type=int, default=20240601, help="语料生成的随机种子，同种子生成完全相同的文件名")
+    parser.add_argument(
+        "--corpus-root",
+        default="",
+        help="存放合成语料（空文件）的目录，默认优先使用 /dev/shm（tmpfs），否则为系统临时目录",
+    )
+    parser.add_argument("--output", default="", help="报告 JSON 输出路径，默认 bench_<时间>.json")
+    parser.add_argument("--compare", default="", help="与指定的基线报告比较，存在退化时返回码为 1")
+    parser.add_argument("--threshold", type=float, default=0.2, help="判定退化的相对阈值，默认 0.2（慢 20%%）")
+    parser.add_argument("--min-seconds", type=float, default=0.05, help="耗时增加小于该秒数时不视为退化，默认 0.05")
+    parser.add_argument("--repeat", type=int, default=1, help="每个规模重复计时的次数，取最快一次，默认 1")
+    parser.add_argument("--no-memory", action="store_true", help="不统计各阶段峰值内存（省去一次 tracemalloc 运行）")
+    parser.add_argument("--clean", action="store_true", help="结束后删除本次用到的生成语料目录")
+    parser.add_argument("--lengths", default="2,3,4,5,6")
+    parser.add_argument("--min-pair-matches", type=int, default=2)
+    parser.add_argument("--max-df-abs", type=int, default=120)
+    parser.add_argument("--max-df-ratio", type=float, default=0.04)
+    parser.add_argument("--pair-workers", type=int, default=1)
+    args = parser.parse_args()
+
+    sizes = [int(x) for x in args.sizes.split(",") if x.strip()]
+    lengths = sorted({int(x) for x in args.lengths.split(",") if x.strip()})
+    root = Path(args.corpus_root).resolve() if args.corpus_root else default_corpus_root()
+
+    results: list[dict[str, Any]] = []
+    corpora: list[Path] = []
+    try:
+        for size in sizes:
+            start = time.perf_counter()
+            try:
+                folder = ensure_corpus(root, size, args.seed)
+            except ValueError as exc:
+                parser.error(str(exc))
+            corpora.append(folder)
+            print(f"[{size} 文件] 语料就绪：{folder}（{time.perf_counter() - start:.1f}s）")
+            entry = bench_size(folder, args, lengths)
+            results.append(entry)
+            detail = "，".join(
+                f"{name} {entry['phases'][name]['seconds']:.3f}s"
+                + (f"/{entry['phases'][name]['peak_bytes'] / 1048576:.1f}MB" if "peak_bytes" in entry["phases"][name] else "")
+                for name in PHASES
+            )
+            print(f"[{size} 文件] 共 {entry['total_seconds']:.3f}s：{detail}")
+    finally:
+        if args.clean:
+            for folder in corpora:
+                remove_corpus(folder)
+            if not args.corpus_root and root.is_dir() and not any(root.iterdir()):
+                # 默认语料根目录由本脚本创建，清空后一并删除
+                root.rmdir()
+
+    report = {
+        "version": REPORT_VERSION,
+        "generator": GENERATOR_VERSION,
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "params": {
+            "seed": args.seed,
+            "lengths": lengths,
+            "min_pair_matches": args.min_pair_matches,
+            "max_df_abs": args.max_df_abs,
+            "max_df_ratio": args.max_df_ratio,
+            "pair_workers": args.pair_workers,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    output = Path(args.output or f"bench_{time.strftime('%Y%m%d_%H%M%S')}.json").resolve()
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"已输出基准报告：{output}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        if baseline.get("generator") != GENERATOR_VERSION or baseline.get("params", {}).get("seed") != args.seed:
+            print("警告：基线的语料生成版本或种子不同，结果不可直接比较")
+        if baseline.get("version") != REPORT_VERSION:
+            print("警告：基线报告的格式版本不同，各阶段的计时口径可能不一致")
+        regressions = compare_reports(report, baseline, args.threshold, args.min_seconds)
+        if regressions:
+            print("发现性能退化：")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("未发现性能退化")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,22 +1,73 @@
 from __future__ import annotations
 
 import argparse
+import codecs
 import csv
+import ctypes
+import ctypes.util
+import errno
+import gzip
+import hashlib
+import heapq
+import io
 import json
 import math
+import mmap
+import multiprocessing
+import os
+import queue
 import re
+import select
+import shutil
+import sqlite3
+import struct
+import sys
+import tempfile
 import threading
+import time
 import unicodedata
+import uuid
+import weakref
 import webbrowser
-from collections import Counter, defaultdict
-from dataclasses import dataclass
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from array import array
+from bisect import bisect_left
+from collections import Counter, OrderedDict, defaultdict
+from dataclasses import dataclass, field, replace
 from datetime import datetime
+from fnmatch import fnmatch
+from functools import lru_cache
+from itertools import compress
 from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
-from itertools import combinations
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Iterable, Iterator, Mapping
 from urllib.parse import parse_qs, urlparse
 
+# 响应压缩：gzip 总是可用，zstd（Python 3.14+ 标准库或 zstandard 包）与 brotli 为可选依赖，
+# 按服务端偏好顺序登记，协商时同权重取靠前者
+COMPRESSORS: dict[str, Callable[[bytes], bytes]] = {}
+try:
+    from compression import zstd as _zstd  # type: ignore[import-not-found]
+
+    COMPRESSORS["zstd"] = lambda data: _zstd.compress(data, level=3)
+except ImportError:
+    try:
+        import zstandard as _zstandard  # type: ignore[import-not-found]
+
+        COMPRESSORS["zstd"] = lambda data: _zstandard.ZstdCompressor(level=3).compress(data)
+    except ImportError:
+        pass
+try:
+    import brotli as _brotli  # type: ignore[import-not-found]
+
+    COMPRESSORS["br"] = lambda data: _brotli.compress(data, quality=5)
+except ImportError:
+    pass
+COMPRESSORS["gzip"] = lambda data: gzip.compress(data, compresslevel=6, mtime=0)
+
+MIN_COMPRESS_SIZE = 1024
+
 
 HTML_PAGE = r'''<!doctype html>
 <html lang="zh-CN">
@@ -112,7 +163,9 @@ HTML_PAGE = r'''<!doctype html>
     }
 
     .field input[type="text"],
-    .field input[type="number"] {
+    .field input[type="number"],
+    .field textarea,
+    .field select {
       border: 1px solid var(--line);
       border-radius: 10px;
       padding: 10px 12px;
@@ -122,13 +175,20 @@ HTML_PAGE = r'''<!doctype html>
       outline: none;
     }
 
-    .field input:focus {
+    .field textarea {
+      font-family: inherit;
+      resize: vertical;
+    }
+
+    .field input:focus,
+    .field textarea:focus {
       border-color: var(--accent-soft);
       box-shadow: 0 0 0 3px rgba(212, 107, 75, 0.2);
     }
 
     .span-12 { grid-column: span 12; }
     .span-8 { grid-column: span 8; }
+    .span-5 { grid-column: span 5; }
     .span-4 { grid-column: span 4; }
     .span-3 { grid-column: span 3; }
     .span-2 { grid-column: span 2; }
@@ -183,12 +243,24 @@ HTML_PAGE = r'''<!doctype html>
 
     .secondary:disabled { opacity: 0.5; cursor: not-allowed; }
 
+    .secondary.danger {
+      background: #f6d9d3;
+      border-color: #e4b0a5;
+      color: #7b2b22;
+    }
+
     .status {
       font-size: 13px;
       color: var(--muted);
       min-height: 20px;
     }
 
+    .progress {
+      width: 220px;
+      height: 10px;
+      accent-color: var(--accent);
+    }
+
     .summary {
       display: grid;
       grid-template-columns: repeat(4, minmax(0, 1fr));
@@ -216,11 +288,11 @@ HTML_PAGE = r'''<!doctype html>
     }
 
     .results {
-      display: grid;
-      gap: 12px;
+      display: block;
     }
 
     .group {
+      margin-bottom: 12px;
       border: 1px solid var(--line);
       border-radius: 14px;
       background: #fffdf7;
@@ -287,6 +359,11 @@ HTML_PAGE = r'''<!doctype html>
       border-bottom: none;
     }
 
+    .group.placeholder {
+      padding: 14px;
+      color: var(--muted);
+    }
+
     .chips {
       display: flex;
       flex-wrap: wrap;
@@ -303,6 +380,16 @@ HTML_PAGE = r'''<!doctype html>
       color: #6a4a34;
     }
 
+    .pair-evidence {
+      margin-top: 8px;
+      font-size: 12px;
+      color: var(--muted);
+    }
+
+    .pair-evidence li {
+      margin: 4px 0;
+    }
+
     .file-list {
       width: 100%;
       border-collapse: collapse;
@@ -331,7 +418,7 @@ HTML_PAGE = r'''<!doctype html>
 
     @media (max-width: 960px) {
       .summary { grid-template-columns: repeat(2, minmax(0, 1fr)); }
-      .span-8, .span-4, .span-3, .span-2 { grid-column: span 12; }
+      .span-8, .span-5, .span-4, .span-3, .span-2 { grid-column: span 12; }
       .group-head {
         flex-direction: column;
       }
@@ -354,8 +441,13 @@ HTML_PAGE = r'''<!doctype html>
     <section class="panel">
       <div class="grid">
         <div class="field span-12">
-          <label for="folderPath">扫描目录</label>
-          <input id="folderPath" type="text" placeholder="例如 C:/Users/lisheng/Desktop/1" />
+          <label for="folderPath">扫描目录（每行一个，多个目录合并查找跨目录的同名文件）</label>
+          <textarea id="folderPath" rows="1" placeholder="例如 C:/Users/lisheng/Desktop/1&#10;D:/novels"></textarea>
+          <div class="checks">
+            <label><input id="recursive" type="checkbox" /> 包含子目录</label>
+            <label><input id="contentDedup" type="checkbox" /> 同时比对文件内容（找出改名后的相同文件）</label>
+            <label><input id="textSimhash" type="checkbox" /> 比对 txt 正文相似度（去广告、修订后的重传）</label>
+          </div>
         </div>
 
         <div class="field span-4">
@@ -368,6 +460,21 @@ HTML_PAGE = r'''<!doctype html>
           <input id="stopwords" type="text" value="" />
         </div>
 
+        <div class="field span-2">
+          <label for="maxDepth">子目录最大深度（留空不限）</label>
+          <input id="maxDepth" type="number" min="0" value="" />
+        </div>
+
+        <div class="field span-5">
+          <label for="includeGlobs">仅包含（通配符，逗号分隔，如 武侠/*,*精校*）</label>
+          <input id="includeGlobs" type="text" value="" />
+        </div>
+
+        <div class="field span-5">
+          <label for="excludeGlobs">排除（通配符，逗号分隔，如 回收站,*/草稿/*）</label>
+          <input id="excludeGlobs" type="text" value="" />
+        </div>
+
         <div class="field span-2">
           <label for="minLen">最小片段长度</label>
           <input id="minLen" type="number" min="2" max="12" value="2" />
@@ -393,6 +500,24 @@ HTML_PAGE = r'''<!doctype html>
           <input id="maxDfRatio" type="number" min="1" max="100" value="4" />
         </div>
 
+        <div class="field span-4">
+          <label for="engine">候选生成引擎</label>
+          <select id="engine">
+            <option value="exact">精确配对（倒排表）</option>
+            <option value="minhash">MinHash/LSH（超大文件库）</option>
+          </select>
+        </div>
+
+        <div class="field span-4">
+          <label for="minhashBands">MinHash 分段数（越大召回越高）</label>
+          <input id="minhashBands" type="number" min="1" max="256" value="16" />
+        </div>
+
+        <div class="field span-4">
+          <label for="minhashRows">MinHash 每段哈希数（越大越严格）</label>
+          <input id="minhashRows" type="number" min="1" max="16" value="1" />
+        </div>
+
         <div class="field span-12">
           <label>匹配片段长度（连续且顺序一致）</label>
           <div class="checks" id="lengthChecks"></div>
@@ -403,6 +528,8 @@ HTML_PAGE = r'''<!doctype html>
       <div class="actions">
         <button id="runBtn" class="primary">开始分析</button>
         <button id="csvBtn" class="secondary" disabled>导出当前结果 CSV</button>
+        <button id="undoDeleteBtn" class="secondary" type="button" hidden>撤销上次删除</button>
+        <progress id="progressBar" class="progress" max="1" value="0" hidden></progress>
         <span id="status" class="status">等待开始</span>
       </div>
     </section>
@@ -411,35 +538,85 @@ HTML_PAGE = r'''<!doctype html>
     <section id="groupControls" class="actions" hidden>
       <button id="expandAllBtn" class="secondary" type="button">全部展开</button>
       <button id="collapseAllBtn" class="secondary" type="button">全部收起</button>
+      <select id="groupSort" aria-label="分组排序">
+        <option value="default">按文件数与修改时间</option>
+        <option value="size">按文件数</option>
+        <option value="bytes">按最大文件大小</option>
+        <option value="old">按旧文件数</option>
+        <option value="name">按代表名</option>
+      </select>
+      <select id="bulkPolicy" aria-label="批量删除保留策略">
+        <option value="largest">每组保留最大文件</option>
+        <option value="newest">每组保留最新修改的文件</option>
+        <option value="extension">每组保留首选格式</option>
+      </select>
+      <input id="preferExts" type="text" placeholder=".epub,.txt" aria-label="首选扩展名（按优先级）" hidden />
+      <button id="bulkDeleteBtn" class="secondary danger" type="button">全部分组删除旧文件</button>
+      <label class="muted"><input id="quarantineMode" type="checkbox" /> 删除时移入回收区（可撤销）</label>
     </section>
     <section id="results" class="results"></section>
   </main>
 
   <script>
+    const clientId = (window.crypto && crypto.randomUUID)
+      ? crypto.randomUUID()
+      : `${Date.now()}-${Math.random().toString(16).slice(2)}`;
+
     const state = {
       latest: null,
       autoTimer: null,
+      analysisController: null,
       collapsedGroupByKey: {},
+      collapseAll: false,
       deleteInProgress: false,
+      groupSort: "default",
+      groupTotal: 0,
+      groupPages: new Map(),
+      groupPageLoads: new Map(),
+      groupEvidence: new Map(),
+      groupEvidenceLoads: new Set(),
+      openPairEvidence: new Set(),
+      groupHeights: [],
+      groupDataSeq: 0,
+      groupRenderKey: "",
+      groupRenderEnd: 0,
+      groupRenderFrame: 0,
+      lastQuarantineRun: "",
     };
 
     const folderPathInput = document.getElementById("folderPath");
     const extsInput = document.getElementById("exts");
+    const recursiveInput = document.getElementById("recursive");
+    const contentDedupInput = document.getElementById("contentDedup");
+    const textSimhashInput = document.getElementById("textSimhash");
+    const maxDepthInput = document.getElementById("maxDepth");
+    const includeGlobsInput = document.getElementById("includeGlobs");
+    const excludeGlobsInput = document.getElementById("excludeGlobs");
     const stopwordsInput = document.getElementById("stopwords");
     const minLenInput = document.getElementById("minLen");
     const maxLenInput = document.getElementById("maxLen");
     const minPairMatchesInput = document.getElementById("minPairMatches");
     const maxDfAbsInput = document.getElementById("maxDfAbs");
     const maxDfRatioInput = document.getElementById("maxDfRatio");
+    const engineSelect = document.getElementById("engine");
+    const minhashBandsInput = document.getElementById("minhashBands");
+    const minhashRowsInput = document.getElementById("minhashRows");
     const lengthChecksEl = document.getElementById("lengthChecks");
     const runBtn = document.getElementById("runBtn");
     const csvBtn = document.getElementById("csvBtn");
     const statusEl = document.getElementById("status");
+    const progressBarEl = document.getElementById("progressBar");
     const summaryEl = document.getElementById("summary");
     const groupControlsEl = document.getElementById("groupControls");
     const expandAllBtn = document.getElementById("expandAllBtn");
     const collapseAllBtn = document.getElementById("collapseAllBtn");
     const resultsEl = document.getElementById("results");
+    const groupSortSelect = document.getElementById("groupSort");
+    const bulkPolicySelect = document.getElementById("bulkPolicy");
+    const preferExtsInput = document.getElementById("preferExts");
+    const bulkDeleteBtn = document.getElementById("bulkDeleteBtn");
+    const quarantineModeInput = document.getElementById("quarantineMode");
+    const undoDeleteBtn = document.getElementById("undoDeleteBtn");
 
     function clampInt(value, minV, maxV) {
       if (!Number.isFinite(value)) {
@@ -507,9 +684,14 @@ HTML_PAGE = r'''<!doctype html>
       statusEl.textContent = text;
     }
 
-    function stemFromFilename(name) {
-      const idx = String(name).lastIndexOf(".");
-      return idx > 0 ? String(name).slice(0, idx) : String(name);
+    function setFolderPath(value) {
+      // 每行一个目录，输入框高度随行数增长
+      folderPathInput.value = value;
+      fitFolderPathRows();
+    }
+
+    function fitFolderPathRows() {
+      folderPathInput.rows = Math.min(6, Math.max(1, folderPathInput.value.split("\n").length));
     }
 
     function filenameFromPath(path) {
@@ -518,138 +700,352 @@ HTML_PAGE = r'''<!doctype html>
       return parts[parts.length - 1] || str;
     }
 
-    function formatSizeFromBytes(bytes) {
-      const units = ["B", "KB", "MB", "GB", "TB"];
-      let value = Number(bytes || 0);
-      let unitIdx = 0;
-      while (value >= 1024 && unitIdx < units.length - 1) {
-        value /= 1024;
-        unitIdx += 1;
-      }
-      if (unitIdx === 0) {
-        return `${Math.trunc(value)} ${units[unitIdx]}`;
-      }
-      return `${value.toFixed(2)} ${units[unitIdx]}`;
-    }
-
-    function createGroupKey(group) {
-      const snippets = [...(group.shared_snippets || [])]
-        .map((s) => String(s))
-        .sort()
-        .slice(0, 6);
-      if (snippets.length) {
-        return `snip::${snippets.join("|")}`;
-      }
-      const rep = String(group.representative || "").replace(/[0-9\s_]+/g, "");
-      if (rep) {
-        return `rep::${rep}`;
-      }
-      const names = [...(group.files || [])]
-        .map((f) => stemFromFilename(String(f.name || "")))
-        .sort();
-      return `name::${names.join("|")}`;
-    }
-
-    function recomputeGroupMeta(group) {
-      group.size = group.files.length;
-      const latestSize = Math.max(...group.files.map((f) => Number(f.size_bytes || 0)));
-      group.latest_size_bytes = latestSize;
-      group.latest_size_text = formatSizeFromBytes(latestSize);
-      group.old_file_count = 0;
-      group.files.forEach((f) => {
-        f.is_latest_by_size = Number(f.size_bytes || 0) >= latestSize;
-        f.size_text = formatSizeFromBytes(Number(f.size_bytes || 0));
-        if (!f.is_latest_by_size) {
-          group.old_file_count += 1;
-        }
-      });
-      if (group.files[0]?.name) {
-        group.representative = stemFromFilename(group.files[0].name);
-      }
-    }
-
-    function applyLocalDeletion(deletedPaths) {
-      if (!state.latest || !Array.isArray(deletedPaths) || !deletedPaths.length) {
-        return 0;
-      }
-      const oldGroups = state.latest.groups.map((g) => ({
-        key: createGroupKey(g),
-        paths: new Set((g.files || []).map((f) => String(f.path))),
-      }));
-      const deletedSet = new Set(deletedPaths.map((p) => String(p)));
-      let removedCount = 0;
-      const nextGroups = [];
-
-      state.latest.groups.forEach((group) => {
-        const before = group.files.length;
-        group.files = group.files.filter((f) => !deletedSet.has(String(f.path)));
-        removedCount += before - group.files.length;
-        if (group.files.length >= 2) {
-          recomputeGroupMeta(group);
-          nextGroups.push(group);
+    function setDeleteBusy(busy) {
+      state.deleteInProgress = busy;
+      bulkDeleteBtn.disabled = busy;
+      undoDeleteBtn.disabled = busy;
+      document.querySelectorAll(".file-delete-btn,.group-delete-old-btn").forEach((btn) => {
+        if (btn instanceof HTMLButtonElement) {
+          btn.disabled = busy || btn.dataset.fixedDisabled === "true";
         }
       });
+    }
 
-      state.latest.groups = nextGroups;
-      state.latest.group_count = nextGroups.length;
-      state.latest.duplicate_file_count = nextGroups.reduce((acc, g) => acc + g.files.length, 0);
-      state.latest.total_files = Math.max(0, Number(state.latest.total_files || 0) - removedCount);
-
-      const nextCollapsed = {};
-      nextGroups.forEach((g) => {
-        const newKey = createGroupKey(g);
-        const newPaths = new Set((g.files || []).map((f) => String(f.path)));
-
-        let bestKey = "";
-        let bestOverlap = -1;
-        oldGroups.forEach((og) => {
-          let overlap = 0;
-          newPaths.forEach((p) => {
-            if (og.paths.has(p)) {
-              overlap += 1;
-            }
-          });
-          if (overlap > bestOverlap) {
-            bestOverlap = overlap;
-            bestKey = og.key;
-          }
-        });
+    function setGroupCollapsedState(collapsed) {
+      state.collapseAll = collapsed;
+      state.collapsedGroupByKey = {};
+      state.groupHeights = [];
+      state.groupDataSeq += 1;
+      scheduleGroupRender();
+    }
+
+    const GROUP_PAGE_SIZE = 100;
+    const GROUP_GAP = 12;
+    const GROUP_OVERSCAN = 6;
+
+    function isGroupCollapsed(key) {
+      if (Object.prototype.hasOwnProperty.call(state.collapsedGroupByKey, key)) {
+        return Boolean(state.collapsedGroupByKey[key]);
+      }
+      return state.collapseAll;
+    }
+
+    function groupAt(pos) {
+      const page = state.groupPages.get(Math.floor(pos / GROUP_PAGE_SIZE));
+      return page ? page[pos % GROUP_PAGE_SIZE] : undefined;
+    }
+
+    function groupHeight(pos) {
+      if (state.groupHeights[pos]) {
+        return state.groupHeights[pos];
+      }
+      const group = groupAt(pos);
+      if (!group) {
+        return (state.collapseAll ? 120 : 260) + GROUP_GAP;
+      }
+      const base = isGroupCollapsed(group.id) ? 120 : 170 + group.files.length * 37;
+      return base + GROUP_GAP;
+    }
+
+    function resetGroupView(total) {
+      state.groupTotal = total;
+      state.groupPages = new Map();
+      state.groupPageLoads = new Map();
+      state.groupEvidence = new Map();
+      state.groupEvidenceLoads = new Set();
+      state.openPairEvidence = new Set();
+      state.groupHeights = [];
+      state.groupDataSeq += 1;
+      state.groupRenderKey = "";
+    }
 
-        if (bestKey && Object.prototype.hasOwnProperty.call(state.collapsedGroupByKey, bestKey)) {
-          nextCollapsed[newKey] = Boolean(state.collapsedGroupByKey[bestKey]);
+    async function loadGroupEvidence(id) {
+      const loads = state.groupEvidenceLoads;
+      if (state.groupEvidence.has(id) || loads.has(id)) {
+        return;
+      }
+      loads.add(id);
+      try {
+        const params = new URLSearchParams();
+        if (state.latest && state.latest.version !== undefined) {
+          params.set("version", String(state.latest.version));
+        }
+        const resp = await fetch(`/api/groups/${encodeURIComponent(id)}/evidence?${params}`);
+        const data = await resp.json();
+        // 结果已更新（409）或视图已重置时不再回填，等新的分页重新请求
+        if (!resp.ok || state.groupEvidenceLoads !== loads) {
           return;
         }
-        nextCollapsed[newKey] = Boolean(state.collapsedGroupByKey[newKey]);
-      });
-      state.collapsedGroupByKey = nextCollapsed;
-      return removedCount;
+        state.groupEvidence.set(id, data);
+        state.groupDataSeq += 1;
+        scheduleGroupRender();
+      } finally {
+        loads.delete(id);
+      }
     }
 
-    function setDeleteBusy(busy) {
-      state.deleteInProgress = busy;
-      document.querySelectorAll(".file-delete-btn,.group-delete-old-btn").forEach((btn) => {
-        if (btn instanceof HTMLButtonElement) {
-          btn.disabled = busy || btn.dataset.fixedDisabled === "true";
+    async function loadGroupPage(pageIdx) {
+      if (state.groupPages.has(pageIdx)) {
+        return;
+      }
+      if (state.groupPageLoads.has(pageIdx)) {
+        return state.groupPageLoads.get(pageIdx);
+      }
+      const loads = state.groupPageLoads;
+      const task = (async () => {
+        const params = new URLSearchParams({
+          offset: String(pageIdx * GROUP_PAGE_SIZE),
+          limit: String(GROUP_PAGE_SIZE),
+          sort: state.groupSort,
+        });
+        const resp = await fetch(`/api/groups?${params}`);
+        const data = await resp.json();
+        if (!resp.ok) {
+          throw new Error(data.error || "读取分组失败");
         }
+        // 期间结果被重置（重新分析、删除、换排序）时丢弃过期的分页
+        if (state.groupPageLoads !== loads) {
+          return;
+        }
+        state.groupPages.set(pageIdx, data.groups);
+        state.groupDataSeq += 1;
+        scheduleGroupRender();
+      })();
+      loads.set(pageIdx, task);
+      try {
+        await task;
+      } finally {
+        loads.delete(pageIdx);
+      }
+    }
+
+    function scheduleGroupRender() {
+      if (state.groupRenderFrame) {
+        return;
+      }
+      state.groupRenderFrame = window.requestAnimationFrame(() => {
+        state.groupRenderFrame = 0;
+        renderVisibleGroups();
       });
     }
 
-    function setGroupCollapsedState(collapsed) {
-      document.querySelectorAll("#results .group").forEach((el) => {
-        el.classList.toggle("collapsed", collapsed);
-        const keyEncoded = el.getAttribute("data-group-key") || "";
-        if (keyEncoded) {
-          const key = decodeURIComponent(keyEncoded);
-          state.collapsedGroupByKey[key] = collapsed;
+    function renderVisibleGroups() {
+      const total = state.groupTotal;
+      if (!state.latest || !total) {
+        return;
+      }
+      const viewStart = Math.max(0, -resultsEl.getBoundingClientRect().top);
+      const viewEnd = viewStart + window.innerHeight;
+
+      let pos = 0;
+      let y = 0;
+      while (pos < total - 1 && y + groupHeight(pos) <= viewStart) {
+        y += groupHeight(pos);
+        pos += 1;
+      }
+      let last = pos;
+      let yEnd = y;
+      while (last < total && yEnd < viewEnd) {
+        yEnd += groupHeight(last);
+        last += 1;
+      }
+      const first = Math.max(0, pos - GROUP_OVERSCAN);
+      last = Math.min(total, last + GROUP_OVERSCAN);
+
+      const renderKey = `${first}:${last}:${state.groupDataSeq}`;
+      if (renderKey === state.groupRenderKey) {
+        return;
+      }
+      state.groupRenderKey = renderKey;
+      state.groupRenderEnd = last;
+
+      let topPad = 0;
+      for (let i = 0; i < first; i += 1) {
+        topPad += groupHeight(i);
+      }
+      const parts = [`<div class="virtual-pad" style="height:${topPad}px"></div>`];
+      const missingPages = new Set();
+      const missingEvidence = [];
+      for (let i = first; i < last; i += 1) {
+        const group = groupAt(i);
+        if (group) {
+          if (!state.groupEvidence.has(group.id)) {
+            missingEvidence.push(group.id);
+          }
+          parts.push(renderGroupArticle(group, i));
+        } else {
+          missingPages.add(Math.floor(i / GROUP_PAGE_SIZE));
+          parts.push(`<article class="group placeholder" style="height:${groupHeight(i) - GROUP_GAP}px">分组 ${i + 1} 加载中...</article>`);
         }
+      }
+      parts.push(`<div class="virtual-pad" style="height:0px"></div>`);
+      resultsEl.innerHTML = parts.join("");
+      measureRenderedGroups();
+
+      missingPages.forEach((pageIdx) => {
+        loadGroupPage(pageIdx).catch((err) => setStatus(`读取分组失败：${err.message}`));
       });
-      document.querySelectorAll("#results .toggle-group-btn").forEach((btn) => {
-        btn.textContent = collapsed ? "展开" : "收起";
+      missingEvidence.forEach((id) => {
+        loadGroupEvidence(id).catch(() => {});
+      });
+    }
+
+    function measureRenderedGroups() {
+      resultsEl.querySelectorAll(".group[data-group-index]").forEach((el) => {
+        state.groupHeights[Number(el.getAttribute("data-group-index"))] = el.offsetHeight + GROUP_GAP;
       });
+      const pads = resultsEl.querySelectorAll(".virtual-pad");
+      if (pads.length === 2) {
+        let bottomPad = 0;
+        for (let i = state.groupRenderEnd; i < state.groupTotal; i += 1) {
+          bottomPad += groupHeight(i);
+        }
+        pads[1].style.height = `${bottomPad}px`;
+      }
+    }
+
+    const ANALYSIS_PHASES = [
+      ["scanning", "扫描文件"],
+      ["ngrams", "生成片段"],
+      ["postings", "建立倒排"],
+      ["pairs", "统计配对"],
+      ["linking", "判定关联"],
+      ["content", "比对内容"],
+      ["grouping", "整理分组"],
+    ];
+
+    const CONTENT_STAGES = [
+      ["partial", "首尾哈希"],
+      ["full", "整文件哈希"],
+      ["simhash", "正文指纹"],
+    ];
+
+    function phaseFraction(phase, c) {
+      if (c.done) {
+        return 1;
+      }
+      if (phase === "ngrams" && c.files_total) {
+        return c.files_done / c.files_total;
+      }
+      if (phase === "postings" && c.signatures_total) {
+        return c.signatures_done / c.signatures_total;
+      }
+      if (phase === "pairs" && c.tokens_total) {
+        return c.tokens_done / c.tokens_total;
+      }
+      if (phase === "pairs" && c.bands_total) {
+        return c.bands_done / c.bands_total;
+      }
+      if (phase === "pairs" && c.shards_total) {
+        return c.shards_done / c.shards_total;
+      }
+      if (phase === "linking" && c.pairs_total) {
+        return c.pairs_done / c.pairs_total;
+      }
+      if (phase === "content" && c.files_total) {
+        const stageIdx = Math.max(0, CONTENT_STAGES.findIndex(([key]) => key === c.stage));
+        return (stageIdx + c.files_done / c.files_total) / CONTENT_STAGES.length;
+      }
+      return 0;
+    }
+
+    function phaseDetail(phase, c) {
+      if (phase === "scanning") {
+        return `已扫描 ${c.files || 0} 个文件${c.dirs ? `，${c.dirs} 个目录` : ""}`;
+      }
+      if (phase === "ngrams") {
+        return `${c.files_done || 0} / ${c.files_total || 0} 个文件`;
+      }
+      if (phase === "postings" && c.signatures_total) {
+        return `MinHash 签名 ${c.signatures_done || 0} / ${c.signatures_total}`;
+      }
+      if (phase === "postings") {
+        return c.done ? `${c.tokens} 个片段` : "";
+      }
+      if (phase === "pairs" && c.shards_total) {
+        return `分片 ${c.shards_done || 0} / ${c.shards_total}，保留 ${c.postings_kept || 0}，候选对 ${c.pairs || 0}`;
+      }
+      if (phase === "pairs" && c.bands_total) {
+        return `LSH 分段 ${c.bands_done || 0} / ${c.bands_total}，候选对 ${c.pairs || 0}`;
+      }
+      if (phase === "pairs") {
+        const spilled = c.spilled_runs ? `，已落盘 ${c.spilled_runs} 段` : "";
+        return `片段 ${c.tokens_done || 0} / ${c.tokens_total || 0}，保留 ${c.postings_kept || 0}，候选对 ${c.pairs || 0}${spilled}`;
+      }
+      if (phase === "linking") {
+        return `${c.pairs_done || 0} / ${c.pairs_total || 0} 个候选对`;
+      }
+      if (phase === "content" && c.files_total) {
+        const stage = CONTENT_STAGES.find(([key]) => key === c.stage);
+        return `${stage ? stage[1] : ""} ${c.files_done || 0} / ${c.files_total}`;
+      }
+      if (phase === "content" && c.done) {
+        return c.near_files !== undefined ? `${c.near_files} 个文件正文近似` : `${c.files} 个文件内容有重复`;
+      }
+      if (phase === "grouping") {
+        return c.done ? `${c.groups} 个分组` : "";
+      }
+      return "";
+    }
+
+    function renderProgress(phase, counters) {
+      if (phase === "queued") {
+        progressBarEl.hidden = false;
+        progressBarEl.value = 0;
+        setStatus(counters.ahead ? `排队中，前面还有 ${counters.ahead} 个任务...` : "排队中...");
+        return;
+      }
+      const idx = ANALYSIS_PHASES.findIndex(([key]) => key === phase);
+      if (idx < 0) {
+        return;
+      }
+      const frac = Math.min(1, Math.max(0, phaseFraction(phase, counters)));
+      progressBarEl.hidden = false;
+      progressBarEl.value = (idx + frac) / ANALYSIS_PHASES.length;
+      const detail = phaseDetail(phase, counters);
+      setStatus(`分析中 · ${ANALYSIS_PHASES[idx][1]}${detail ? `：${detail}` : ""}`);
+    }
+
+    async function readAnalysisStream(resp, onProgress = renderProgress) {
+      const reader = resp.body.getReader();
+      const decoder = new TextDecoder("utf-8");
+      let buffer = "";
+      let result = null;
+      const handleLine = (line) => {
+        if (!line.trim()) {
+          return;
+        }
+        const msg = JSON.parse(line);
+        if (msg.event === "progress") {
+          onProgress(msg.phase, msg.counters || {});
+        } else if (msg.event === "error" || msg.event === "cancelled") {
+          throw new Error(msg.error || "分析失败");
+        } else if (msg.event === "result") {
+          result = msg.result;
+        }
+      };
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) {
+          break;
+        }
+        buffer += decoder.decode(value, { stream: true });
+        let nl = buffer.indexOf("\n");
+        while (nl >= 0) {
+          handleLine(buffer.slice(0, nl));
+          buffer = buffer.slice(nl + 1);
+          nl = buffer.indexOf("\n");
+        }
+      }
+      handleLine(buffer + decoder.decode());
+      if (!result) {
+        throw new Error("分析连接中断");
+      }
+      return result;
     }
 
     function scheduleAutoPreview(message) {
-      if (!state.latest || runBtn.disabled) {
+      if (!state.latest) {
         return;
       }
       if (state.autoTimer) {
@@ -681,14 +1077,15 @@ HTML_PAGE = r'''<!doctype html>
     }
 
     function renderGroupArticle(group, idx) {
-      const groupKey = createGroupKey(group);
-      const groupKeyEncoded = encodeURIComponent(groupKey);
-      const collapsed = Boolean(state.collapsedGroupByKey[groupKey]);
+      const groupKeyEncoded = encodeURIComponent(group.id);
+      const collapsed = isGroupCollapsed(group.id);
+      // 多目录分析时标出每个文件所在的扫描目录
+      const multiRoot = Boolean(state.latest && state.latest.roots && state.latest.roots.length > 1);
       const filesRows = group.files
         .map((file) => `
           <tr>
                 <td>${file.is_latest_by_size ? "<span style='color:#2f7a57;font-weight:700;'>最新</span>" : "旧"}</td>
-                <td>${escapeHtml(file.name)}</td>
+                <td>${escapeHtml(file.name)}${multiRoot && file.root ? ` <span class='chip' title="${escapeHtml(file.root)}">${escapeHtml(filenameFromPath(file.root))}</span>` : ""}${file.content_hash ? " <span class='chip'>内容相同</span>" : ""}${file.text_near_duplicate ? " <span class='chip'>正文近似</span>" : ""}</td>
                 <td>${escapeHtml(file.modified)}</td>
                 <td>${escapeHtml(file.size_text)}</td>
             <td><button class="mini-btn danger file-delete-btn" data-file-path="${encodeURIComponent(file.path)}" ${state.deleteInProgress ? "disabled" : ""}>删除</button></td>
@@ -696,9 +1093,19 @@ HTML_PAGE = r'''<!doctype html>
         `)
         .join("");
 
-      const chips = group.shared_snippets
-        .map((s) => `<span class="chip">${escapeHtml(s)}</span>`)
-        .join("");
+      const evidence = state.groupEvidence.get(group.id);
+      const chips = evidence
+        ? evidence.shared_snippets.map((s) => `<span class="chip">${escapeHtml(s)}</span>`).join("")
+          || "<span class='chip'>无高置信公共片段</span>"
+        : "<span class='chip'>公共片段加载中...</span>";
+      const pairRows = evidence && evidence.pairs
+        ? evidence.pairs
+          .map((pair) => `<li>${escapeHtml(pair.a)} ⇄ ${escapeHtml(pair.b)}：${pair.shared_count} 个片段（${pair.tokens.map((t) => escapeHtml(t)).join("、")}）</li>`)
+          .join("")
+        : "";
+      const pairNote = evidence && evidence.pair_count > evidence.pairs.length
+        ? `，仅列出 ${evidence.pairs.length} 对`
+        : "";
 
       return `
         <article class="group${collapsed ? " collapsed" : ""}" data-group-index="${idx}" data-group-key="${groupKeyEncoded}">
@@ -706,11 +1113,14 @@ HTML_PAGE = r'''<!doctype html>
             <div>
               <h3>分组 ${idx + 1} · ${group.size} 个文件</h3>
               <div class="muted">代表名：${escapeHtml(group.representative)}</div>
-              <div class="chips">${chips || "<span class='chip'>无高置信公共片段</span>"}</div>
+              <div class="chips">${chips}</div>
+              ${pairRows ? `<details class="pair-evidence" data-evidence-id="${groupKeyEncoded}" ${state.openPairEvidence.has(group.id) ? "open" : ""}><summary>配对命中片段（共 ${evidence.pair_count} 对${pairNote}）</summary><ul>${pairRows}</ul></details>` : ""}
             </div>
             <div class="group-right">
-              <div class="muted">命中长度统计：${escapeHtml(group.length_stats_text)}</div>
+              <div class="muted">命中长度统计：${evidence ? escapeHtml(evidence.length_stats_text) : "加载中..."}</div>
               <div class="muted">最大文件大小：${escapeHtml(group.latest_size_text)}</div>
+              ${group.content_duplicate_count ? `<div class="muted">内容完全相同：${escapeHtml(group.content_duplicate_count)} 个文件</div>` : ""}
+              ${group.text_near_duplicate_count ? `<div class="muted">正文近似：${escapeHtml(group.text_near_duplicate_count)} 个文件</div>` : ""}
               <div class="group-actions">
                 <button class="mini-btn toggle-group-btn" data-group-key="${groupKeyEncoded}">${collapsed ? "展开" : "收起"}</button>
                 <button class="mini-btn danger group-delete-old-btn" data-group-index="${idx}" data-fixed-disabled="${group.old_file_count === 0 ? "true" : "false"}" ${group.old_file_count === 0 || state.deleteInProgress ? "disabled" : ""}>删除旧文件（保留最大）</button>
@@ -738,16 +1148,16 @@ HTML_PAGE = r'''<!doctype html>
     }
 
     function renderResults(result) {
-      if (!result.groups.length) {
+      resetGroupView(Number(result.group_count || 0));
+      if (!state.groupTotal) {
         groupControlsEl.hidden = true;
         resultsEl.innerHTML = "<div class='muted'>未发现满足条件的分组，请尝试放宽或收紧参数。</div>";
         return;
       }
 
       groupControlsEl.hidden = false;
-      resultsEl.innerHTML = result.groups
-        .map((group, idx) => renderGroupArticle(group, idx))
-        .join("");
+      resultsEl.innerHTML = "";
+      renderVisibleGroups();
     }
 
     async function runAnalysis(isAutoRefresh = false) {
@@ -760,16 +1170,37 @@ HTML_PAGE = r'''<!doctype html>
       const payload = {
         folder_path: folderPathInput.value.trim(),
         extensions: extsInput.value.trim(),
+        recursive: recursiveInput.checked,
+        content_dedup: contentDedupInput.checked,
+        text_simhash: textSimhashInput.checked,
+        max_depth: maxDepthInput.value.trim() === "" ? null : Number(maxDepthInput.value),
+        include: includeGlobsInput.value.trim(),
+        exclude: excludeGlobsInput.value.trim(),
         stopwords: stopwordsInput.value.trim(),
         lengths,
         min_pair_matches: Number(minPairMatchesInput.value || 2),
         max_df_abs: Number(maxDfAbsInput.value || 120),
         max_df_ratio: Number(maxDfRatioInput.value || 4) / 100,
+        engine: engineSelect.value,
+        minhash_bands: Number(minhashBandsInput.value || 16),
+        minhash_rows: Number(minhashRowsInput.value || 1),
+        stream: true,
+        include_groups: false,
+        client_id: clientId,
       };
+      // 新分析开始时中止尚未返回的旧请求，服务端也会按 client_id 取消旧分析
+      if (state.analysisController) {
+        state.analysisController.abort();
+      }
+      const controller = new AbortController();
+      state.analysisController = controller;
       runBtn.disabled = true;
       csvBtn.disabled = true;
       setStatus("分析中，请稍候...");
+      progressBarEl.value = 0;
+      progressBarEl.hidden = false;
       groupControlsEl.hidden = true;
+      resetGroupView(0);
       resultsEl.innerHTML = "";
       summaryEl.hidden = true;
 
@@ -778,26 +1209,65 @@ HTML_PAGE = r'''<!doctype html>
           method: "POST",
           headers: { "Content-Type": "application/json" },
           body: JSON.stringify(payload),
+          signal: controller.signal,
         });
-        const data = await resp.json();
         if (!resp.ok) {
-          throw new Error(data.error || "分析失败");
+          const errData = await resp.json();
+          throw new Error(errData.error || "分析失败");
         }
+        const data = await readAnalysisStream(resp);
 
         state.latest = data;
         if (data.folder) {
-          folderPathInput.value = data.folder;
+          setFolderPath(data.folder);
         }
         renderSummary(data);
         renderResults(data);
-        csvBtn.disabled = !data.groups.length;
+        csvBtn.disabled = !data.group_count;
         const triggerText = isAutoRefresh ? "自动刷新" : "完成";
-        setStatus(`${triggerText}：扫描 ${data.total_files} 个文件，得到 ${data.group_count} 个候选分组。`);
+        const elapsedText = data.stats ? `，用时 ${Number(data.stats.total_seconds).toFixed(2)} 秒` : "";
+        setStatus(`${triggerText}：扫描 ${data.total_files} 个文件，得到 ${data.group_count} 个候选分组${elapsedText}。`);
       } catch (err) {
+        if (controller.signal.aborted) {
+          return;
+        }
         setStatus(`失败：${err.message}`);
       } finally {
-        runBtn.disabled = false;
+        if (state.analysisController === controller) {
+          state.analysisController = null;
+          runBtn.disabled = false;
+          progressBarEl.hidden = true;
+        }
+      }
+    }
+
+    function applyPushedResult(summary) {
+      // 服务端监听到目录变化或其他页面更新结果时推送摘要；本页分析进行中或已是该版本时忽略
+      // 删除进行中时以删除响应里的差异为准，避免先整体刷新导致差异的基准版本失配
+      if (state.analysisController || state.deleteInProgress || (state.latest && Number(state.latest.version) >= Number(summary.version))) {
+        return;
+      }
+      const firstLoad = !state.latest;
+      state.latest = summary;
+      renderSummary(summary);
+      renderResults(summary);
+      csvBtn.disabled = !summary.group_count;
+      const prefix = firstLoad ? "已载入当前结果" : "目录有变化，已自动更新";
+      setStatus(`${prefix}：共 ${summary.total_files} 个文件，${summary.group_count} 个候选分组。`);
+    }
+
+    function subscribeResultEvents() {
+      if (!window.EventSource) {
+        return;
       }
+      const source = new EventSource("/api/events");
+      source.addEventListener("result", (event) => {
+        try {
+          applyPushedResult(JSON.parse(event.data));
+        } catch (err) {
+          // 忽略格式异常的推送，等待下一次
+        }
+      });
     }
 
     async function saveDefaultPath() {
@@ -815,82 +1285,108 @@ HTML_PAGE = r'''<!doctype html>
         if (!resp.ok) {
           throw new Error(data.error || "保存默认目录失败");
         }
-        folderPathInput.value = data.default_path || path;
+        setFolderPath(data.default_path || path);
       } catch (err) {
         setStatus(`默认目录保存失败：${err.message}`);
       }
     }
 
-    function collectAffectedGroupKeys(paths) {
-      const affected = new Set();
-      if (!state.latest) {
-        return affected;
-      }
-      const deletedSet = new Set(paths.map((p) => String(p)));
-      state.latest.groups.forEach((group) => {
-        if ((group.files || []).some((f) => deletedSet.has(String(f.path)))) {
-          affected.add(createGroupKey(group));
-        }
-      });
-      return affected;
-    }
-
-    function patchResultsAfterDeletion(affectedGroupKeys) {
+    function reloadGroupView(summary) {
       if (!state.latest) {
         return;
       }
+      state.latest = summary;
+      resetGroupView(Number(summary.group_count || 0));
+      renderGroupView();
+    }
 
-      if (!state.latest.groups.length) {
+    function renderGroupView() {
+      if (!state.groupTotal) {
         groupControlsEl.hidden = true;
         resultsEl.innerHTML = "<div class='muted'>未发现满足条件的分组，请尝试放宽或收紧参数。</div>";
         return;
       }
-
       groupControlsEl.hidden = false;
-      const nextGroups = state.latest.groups;
-      const nextKeySet = new Set(nextGroups.map((g) => createGroupKey(g)));
-
-      resultsEl.querySelectorAll(".group").forEach((article) => {
-        const keyEncoded = article.getAttribute("data-group-key") || "";
-        const key = keyEncoded ? decodeURIComponent(keyEncoded) : "";
-        if (!nextKeySet.has(key)) {
-          article.remove();
+      renderVisibleGroups();
+    }
+
+    function applyDeletionDiff(summary, diff) {
+      // 服务端只返回变化的分组：移除的分组 ID、剔除文件后的分组，以及被移除分组在各排序中的原位置。
+      // 已加载的分页按位置平移并替换变化的分组；版本对不上或当前排序不在差异里时整体重新加载
+      if (!state.latest) {
+        return;
+      }
+      const removedPositions = diff && diff.removed_positions ? diff.removed_positions[state.groupSort] : undefined;
+      if (!removedPositions || Number(diff.base_version) !== Number(state.latest.version)) {
+        reloadGroupView(summary);
+        return;
+      }
+      const removed = new Set(diff.removed);
+      // 剔除文件后分组 ID 随成员变化，按原 ID 找到已加载的分组
+      const updated = new Map(diff.updated.map((group) => [group.previous_id, group]));
+      const shiftOf = (pos) => {
+        let lo = 0;
+        let hi = removedPositions.length;
+        while (lo < hi) {
+          const mid = (lo + hi) >> 1;
+          if (removedPositions[mid] < pos) {
+            lo = mid + 1;
+          } else {
+            hi = mid;
+          }
         }
-      });
+        return lo;
+      };
 
-      nextGroups.forEach((group, idx) => {
-        const key = createGroupKey(group);
-        const keyEncoded = encodeURIComponent(key);
-        const selector = `.group[data-group-key="${keyEncoded}"]`;
-        const current = resultsEl.querySelector(selector);
-
-        if (!current || affectedGroupKeys.has(key)) {
-          const template = document.createElement("template");
-          template.innerHTML = renderGroupArticle(group, idx).trim();
-          const nextEl = template.content.firstElementChild;
-          if (!nextEl) {
+      const total = Number(summary.group_count || 0);
+      const slots = new Map();
+      const heights = [];
+      state.groupPages.forEach((groups, pageIdx) => {
+        groups.forEach((group, offset) => {
+          if (removed.has(group.id)) {
             return;
           }
-          if (current) {
-            current.replaceWith(nextEl);
-          } else {
-            resultsEl.appendChild(nextEl);
+          const pos = pageIdx * GROUP_PAGE_SIZE + offset;
+          const next = pos - shiftOf(pos);
+          slots.set(next, updated.get(group.id) || group);
+          if (!updated.has(group.id) && state.groupHeights[pos]) {
+            heights[next] = state.groupHeights[pos];
           }
-          return;
+        });
+      });
+      // 平移后只保留完整的分页，缺口所在的分页交给懒加载重新请求
+      const pages = new Map();
+      new Set([...slots.keys()].map((pos) => Math.floor(pos / GROUP_PAGE_SIZE))).forEach((pageIdx) => {
+        const start = pageIdx * GROUP_PAGE_SIZE;
+        const page = [];
+        for (let pos = start; pos < Math.min(total, start + GROUP_PAGE_SIZE); pos += 1) {
+          if (!slots.has(pos)) {
+            return;
+          }
+          page.push(slots.get(pos));
         }
+        pages.set(pageIdx, page);
+      });
 
-        current.setAttribute("data-group-index", String(idx));
-        const h3 = current.querySelector("h3");
-        if (h3) {
-          h3.textContent = `分组 ${idx + 1} · ${group.size} 个文件`;
-        }
-        const deleteOldBtn = current.querySelector(".group-delete-old-btn");
-        if (deleteOldBtn instanceof HTMLButtonElement) {
-          deleteOldBtn.dataset.groupIndex = String(idx);
-          deleteOldBtn.dataset.fixedDisabled = group.old_file_count === 0 ? "true" : "false";
-          deleteOldBtn.disabled = group.old_file_count === 0 || state.deleteInProgress;
+      const evidence = state.groupEvidence;
+      const openPairs = state.openPairEvidence;
+      updated.forEach((group, previousId) => {
+        if (Object.prototype.hasOwnProperty.call(state.collapsedGroupByKey, previousId)) {
+          state.collapsedGroupByKey[group.id] = state.collapsedGroupByKey[previousId];
+          delete state.collapsedGroupByKey[previousId];
         }
       });
+      [...removed, ...updated.keys()].forEach((id) => {
+        evidence.delete(id);
+        openPairs.delete(id);
+      });
+      state.latest = summary;
+      resetGroupView(total);
+      state.groupPages = pages;
+      state.groupHeights = heights;
+      state.groupEvidence = evidence;
+      state.openPairEvidence = openPairs;
+      renderGroupView();
     }
 
     async function deleteFiles(paths, purpose) {
@@ -907,12 +1403,11 @@ HTML_PAGE = r'''<!doctype html>
         .map((p) => `- ${filenameFromPath(p)}`)
         .join("\n");
       const suffix = paths.length > 3 ? `\n- ...其余 ${paths.length - 3} 个文件` : "";
-      const confirmText = `⚠️ 危险操作检测！\n操作类型：删除文件\n影响范围：${paths.length} 个文件\n风险评估：删除后不可恢复\n\n预览：\n${preview}${suffix}\n\n请确认是否继续？`;
+      const confirmText = `⚠️ 危险操作检测！\n操作类型：删除文件\n影响范围：${paths.length} 个文件\n风险评估：${deleteRiskText()}\n\n预览：\n${preview}${suffix}\n\n请确认是否继续？`;
       if (!window.confirm(confirmText)) {
         return;
       }
 
-      const affectedGroupKeys = collectAffectedGroupKeys(paths);
       setDeleteBusy(true);
       try {
         const resp = await fetch("/api/delete-files", {
@@ -921,6 +1416,7 @@ HTML_PAGE = r'''<!doctype html>
           body: JSON.stringify({
             folder_path: folderPathInput.value.trim(),
             paths,
+            mode: deleteMode(),
           }),
         });
         const data = await resp.json();
@@ -928,19 +1424,17 @@ HTML_PAGE = r'''<!doctype html>
           throw new Error(data.error || "删除失败");
         }
 
-        const deletedPaths = Array.isArray(data.deleted) ? data.deleted : [];
-        const removedByUi = applyLocalDeletion(deletedPaths);
-        const deletedCount = removedByUi || Number(data.deleted_count || 0);
+        const deletedCount = Number(data.deleted_count || 0);
         const keepX = window.scrollX;
         const keepY = window.scrollY;
-        if (state.latest) {
-          renderSummary(state.latest);
-          patchResultsAfterDeletion(affectedGroupKeys);
-          csvBtn.disabled = !state.latest.groups.length;
+        if (state.latest && data.summary) {
+          renderSummary(data.summary);
+          applyDeletionDiff(data.summary, data.diff);
+          csvBtn.disabled = !data.summary.group_count;
         }
         window.requestAnimationFrame(() => window.scrollTo(keepX, keepY));
         const failed = data.failed_count || 0;
-        setStatus(`${purpose}完成：成功删除 ${deletedCount} 个文件${failed ? `，失败 ${failed} 个` : ""}。`);
+        setStatus(`${purpose}完成：成功删除 ${deletedCount} 个文件${failed ? `，失败 ${failed} 个` : ""}${rememberQuarantine(data)}。`);
       } catch (err) {
         setStatus(`删除失败：${err.message}`);
       } finally {
@@ -948,52 +1442,187 @@ HTML_PAGE = r'''<!doctype html>
       }
     }
 
-    async function saveStopwords() {
+    function deleteMode() {
+      return quarantineModeInput.checked ? "quarantine" : "delete";
+    }
+
+    function deleteRiskText() {
+      return quarantineModeInput.checked ? "文件移入扫描目录下的回收区，可撤销" : "删除后不可恢复";
+    }
+
+    function rememberQuarantine(data) {
+      if (!data.quarantine) {
+        return "";
+      }
+      state.lastQuarantineRun = data.quarantine.run_id;
+      undoDeleteBtn.hidden = false;
+      return "（已移入回收区，可撤销）";
+    }
+
+    async function undoDelete() {
+      if (!state.lastQuarantineRun || state.deleteInProgress) {
+        return;
+      }
+      setDeleteBusy(true);
       try {
-        const resp = await fetch("/api/stopwords", {
+        const resp = await fetch("/api/undo-delete", {
           method: "POST",
           headers: { "Content-Type": "application/json" },
-          body: JSON.stringify({ stopwords: stopwordsInput.value.trim() }),
+          body: JSON.stringify({ run_id: state.lastQuarantineRun, folder_path: folderPathInput.value.trim() }),
         });
         const data = await resp.json();
         if (!resp.ok) {
-          throw new Error(data.error || "保存停用词失败");
+          throw new Error(data.error || "撤销失败");
         }
-        stopwordsInput.value = data.stopwords || "";
-        scheduleAutoPreview("停用词已更新，正在刷新预览...");
-        if (!runBtn.disabled) {
-          setStatus("停用词已保存，下次启动会自动加载。");
+        state.lastQuarantineRun = "";
+        undoDeleteBtn.hidden = true;
+        if (data.result_restored && state.latest && data.summary) {
+          renderSummary(data.summary);
+          reloadGroupView(data.summary);
+          csvBtn.disabled = !data.summary.group_count;
         }
+        const failed = data.failed_count || 0;
+        const hint = data.result_restored ? "" : "，重新分析后可看到对应分组";
+        setStatus(`已撤销删除：还原 ${data.restored_count} 个文件${failed ? `，${failed} 个因原位置已有文件未还原` : ""}${hint}。`);
       } catch (err) {
-        setStatus(`停用词保存失败：${err.message}`);
+        setStatus(`撤销失败：${err.message}`);
+      } finally {
+        setDeleteBusy(false);
       }
     }
 
-    function onResultsClick(event) {
-      const target = event.target;
-      if (!(target instanceof HTMLElement)) {
+    function renderDeleteProgress(phase, counters) {
+      if (phase === "queued") {
+        setStatus("批量删除排队中...");
         return;
       }
+      const total = Number(counters.files_total || 0);
+      const done = Number(counters.files_done || 0);
+      progressBarEl.hidden = false;
+      progressBarEl.value = total ? done / total : 0;
+      const failed = Number(counters.failed || 0);
+      setStatus(`批量删除中：${done}/${total}${failed ? `，失败 ${failed} 个` : ""}`);
+    }
 
-      const toggleBtn = target.closest(".toggle-group-btn");
-      if (toggleBtn) {
-        const keyEncoded = String(toggleBtn.dataset.groupKey || "");
-        const groupEl = resultsEl.querySelector(`.group[data-group-key="${keyEncoded}"]`);
-        if (groupEl) {
-          const collapsed = groupEl.classList.toggle("collapsed");
-          toggleBtn.textContent = collapsed ? "展开" : "收起";
-          if (keyEncoded) {
-            const key = decodeURIComponent(keyEncoded);
-            state.collapsedGroupByKey[key] = collapsed;
-          }
+    async function bulkDelete() {
+      if (!state.latest || state.deleteInProgress) {
+        return;
+      }
+      const request = {
+        policy: bulkPolicySelect.value,
+        prefer_extensions: preferExtsInput.value.trim(),
+        version: state.latest.version,
+        mode: deleteMode(),
+      };
+      // 先由服务端按同一份结果生成删除计划，确认后再执行，结果版本变化时服务端会拒绝
+      let plan;
+      try {
+        const resp = await fetch("/api/bulk-delete", {
+          method: "POST",
+          headers: { "Content-Type": "application/json" },
+          body: JSON.stringify({ ...request, dry_run: true }),
+        });
+        plan = await resp.json();
+        if (!resp.ok) {
+          throw new Error(plan.error || "生成删除计划失败");
         }
+      } catch (err) {
+        setStatus(`批量删除失败：${err.message}`);
+        return;
+      }
+      if (!plan.planned_count) {
+        setStatus("按当前策略没有需要删除的文件。");
         return;
       }
 
-      const deleteOldBtn = target.closest(".group-delete-old-btn");
-      if (deleteOldBtn && state.latest) {
-        const groupIdx = Number(deleteOldBtn.dataset.groupIndex);
-        const group = state.latest.groups[groupIdx];
+      const policyText = bulkPolicySelect.options[bulkPolicySelect.selectedIndex].text;
+      const preview = plan.preview
+        .slice(0, 3)
+        .map((p) => `- ${filenameFromPath(p)}`)
+        .join("\n");
+      const suffix = plan.planned_count > 3 ? `\n- ...其余 ${plan.planned_count - 3} 个文件` : "";
+      const confirmText = `⚠️ 危险操作检测！\n操作类型：批量删除旧文件（${policyText}）\n影响范围：${plan.groups_affected} 个分组、${plan.planned_count} 个文件\n风险评估：${deleteRiskText()}\n\n预览：\n${preview}${suffix}\n\n请确认是否继续？`;
+      if (!window.confirm(confirmText)) {
+        return;
+      }
+
+      setDeleteBusy(true);
+      progressBarEl.value = 0;
+      progressBarEl.hidden = false;
+      try {
+        const resp = await fetch("/api/bulk-delete", {
+          method: "POST",
+          headers: { "Content-Type": "application/json" },
+          body: JSON.stringify({ ...request, stream: true }),
+        });
+        if (!resp.ok) {
+          const errData = await resp.json();
+          throw new Error(errData.error || "批量删除失败");
+        }
+        const data = await readAnalysisStream(resp, renderDeleteProgress);
+        if (data.summary) {
+          renderSummary(data.summary);
+          applyDeletionDiff(data.summary, data.diff);
+          csvBtn.disabled = !data.summary.group_count;
+        }
+        const failed = data.failed_count || 0;
+        setStatus(`批量删除完成：涉及 ${data.groups_affected} 个分组，成功删除 ${data.deleted_count} 个文件${failed ? `，失败 ${failed} 个` : ""}${rememberQuarantine(data)}。`);
+      } catch (err) {
+        setStatus(`批量删除失败：${err.message}`);
+      } finally {
+        setDeleteBusy(false);
+        progressBarEl.hidden = true;
+      }
+    }
+
+    async function saveStopwords() {
+      try {
+        const resp = await fetch("/api/stopwords", {
+          method: "POST",
+          headers: { "Content-Type": "application/json" },
+          body: JSON.stringify({ stopwords: stopwordsInput.value.trim() }),
+        });
+        const data = await resp.json();
+        if (!resp.ok) {
+          throw new Error(data.error || "保存停用词失败");
+        }
+        stopwordsInput.value = data.stopwords || "";
+        scheduleAutoPreview("停用词已更新，正在刷新预览...");
+        if (!runBtn.disabled) {
+          setStatus("停用词已保存，下次启动会自动加载。");
+        }
+      } catch (err) {
+        setStatus(`停用词保存失败：${err.message}`);
+      }
+    }
+
+    function onResultsClick(event) {
+      const target = event.target;
+      if (!(target instanceof HTMLElement)) {
+        return;
+      }
+
+      const toggleBtn = target.closest(".toggle-group-btn");
+      if (toggleBtn) {
+        const keyEncoded = String(toggleBtn.dataset.groupKey || "");
+        const groupEl = resultsEl.querySelector(`.group[data-group-key="${keyEncoded}"]`);
+        if (groupEl) {
+          const collapsed = groupEl.classList.toggle("collapsed");
+          toggleBtn.textContent = collapsed ? "展开" : "收起";
+          if (keyEncoded) {
+            const key = decodeURIComponent(keyEncoded);
+            state.collapsedGroupByKey[key] = collapsed;
+          }
+          measureRenderedGroups();
+          scheduleGroupRender();
+        }
+        return;
+      }
+
+      const deleteOldBtn = target.closest(".group-delete-old-btn");
+      if (deleteOldBtn && state.latest) {
+        const groupIdx = Number(deleteOldBtn.dataset.groupIndex);
+        const group = groupAt(groupIdx);
         if (!group) {
           return;
         }
@@ -1017,35 +1646,18 @@ HTML_PAGE = r'''<!doctype html>
     }
 
     function exportCsv() {
-      if (!state.latest || !state.latest.groups.length) {
+      if (!state.latest || !state.groupTotal) {
         return;
       }
-      const rows = [["group_id", "is_latest_by_size", "file_name", "modified", "size", "path", "shared_snippets"]];
-      state.latest.groups.forEach((group, gi) => {
-        const snippet = group.shared_snippets.join("|");
-        group.files.forEach((file) => {
-          rows.push([
-            String(gi + 1),
-            file.is_latest_by_size ? "yes" : "no",
-            file.name,
-            file.modified,
-            file.size_text,
-            file.path,
-            snippet,
-          ]);
-        });
-      });
-
-      const csvText = rows
-        .map((r) => r.map((x) => `"${String(x).replaceAll('"', '""')}"`).join(","))
-        .join("\n");
-
-      const blob = new Blob(["\ufeff" + csvText], { type: "text/csv;charset=utf-8;" });
+      // 服务端按当前排序逐块生成 CSV，浏览器直接落盘，不在页面内拼接
+      const params = new URLSearchParams({ format: "csv", sort: state.groupSort });
+      if (state.latest.version !== undefined) {
+        params.set("version", String(state.latest.version));
+      }
       const link = document.createElement("a");
-      link.href = URL.createObjectURL(blob);
+      link.href = `/api/export/download?${params}`;
       link.download = `novel_groups_${Date.now()}.csv`;
       link.click();
-      URL.revokeObjectURL(link.href);
     }
 
     runBtn.addEventListener("click", runAnalysis);
@@ -1053,6 +1665,40 @@ HTML_PAGE = r'''<!doctype html>
     expandAllBtn.addEventListener("click", () => setGroupCollapsedState(false));
     collapseAllBtn.addEventListener("click", () => setGroupCollapsedState(true));
     resultsEl.addEventListener("click", onResultsClick);
+    // toggle 事件不冒泡，在捕获阶段记录展开状态，重绘后保持不变
+    resultsEl.addEventListener("toggle", (event) => {
+      const el = event.target;
+      if (!el.matches || !el.matches("details[data-evidence-id]")) {
+        return;
+      }
+      const id = decodeURIComponent(el.getAttribute("data-evidence-id") || "");
+      if (el.open === state.openPairEvidence.has(id)) {
+        return;
+      }
+      if (el.open) {
+        state.openPairEvidence.add(id);
+      } else {
+        state.openPairEvidence.delete(id);
+      }
+      state.groupDataSeq += 1;
+      scheduleGroupRender();
+    }, true);
+    bulkPolicySelect.addEventListener("change", () => {
+      preferExtsInput.hidden = bulkPolicySelect.value !== "extension";
+    });
+    bulkDeleteBtn.addEventListener("click", bulkDelete);
+    undoDeleteBtn.addEventListener("click", undoDelete);
+    groupSortSelect.addEventListener("change", () => {
+      state.groupSort = groupSortSelect.value;
+      resetGroupView(state.groupTotal);
+      scheduleGroupRender();
+    });
+    window.addEventListener("scroll", scheduleGroupRender, { passive: true });
+    window.addEventListener("resize", () => {
+      state.groupHeights = [];
+      state.groupDataSeq += 1;
+      scheduleGroupRender();
+    });
     minLenInput.addEventListener("change", () => {
       buildLengthChecks();
       scheduleAutoPreview("长度范围已变化，正在刷新预览...");
@@ -1062,10 +1708,19 @@ HTML_PAGE = r'''<!doctype html>
       scheduleAutoPreview("长度范围已变化，正在刷新预览...");
     });
     stopwordsInput.addEventListener("change", saveStopwords);
+    [recursiveInput, contentDedupInput, textSimhashInput, maxDepthInput, includeGlobsInput, excludeGlobsInput].forEach((el) => {
+      el.addEventListener("change", () => scheduleAutoPreview("扫描范围已变化，正在刷新预览..."));
+    });
+    [engineSelect, minhashBandsInput, minhashRowsInput].forEach((el) => {
+      el.addEventListener("change", () => scheduleAutoPreview("候选生成引擎已变化，正在刷新预览..."));
+    });
     folderPathInput.addEventListener("change", saveDefaultPath);
-    folderPathInput.value = "__DEFAULT_PATH__";
+    folderPathInput.addEventListener("input", fitFolderPathRows);
+    setFolderPath(__DEFAULT_PATH_JSON__);
     stopwordsInput.value = __DEFAULT_STOPWORDS_JSON__;
+    quarantineModeInput.checked = __DELETE_MODE_JSON__ === "quarantine";
     buildLengthChecks();
+    subscribeResultEvents();
   </script>
 </body>
 </html>
@@ -1074,6 +1729,7 @@ HTML_PAGE = r'''<!doctype html>
 
 PATTERN_KEEP = re.compile(r"[0-9a-z\u4e00-\u9fff]+")
 SPACE_RE = re.compile(r"\s+")
+SENTENCE_SPLIT_RE = re.compile(r"[。！？!?；;…\r\n]+")
 
 DEFAULT_STOPWORDS = [
     "妈妈",
@@ -1095,6 +1751,141 @@ DEFAULT_STOPWORDS = [
 ]
 CONFIG_FILENAME = "novel_similarity_webui_config.json"
 DEFAULT_SCAN_DIR = "H:/桌面/CRNovel/CRNovel1"
+SCAN_CACHE_FILENAME = "novel_similarity_webui_scan_cache.sqlite3"
+SCAN_CACHE_SCHEMA_VERSION = 2
+PAIR_INDEX_MASK = (1 << 32) - 1
+PROGRESS_INTERVAL = 4096
+PAIR_CHECK_WORK = 1 << 18
+PARALLEL_PAIR_MIN_WORK = 1 << 22
+# 候选对累加表每项（int 键、int 值与字典槽位）的估算内存，用于把内存预算换算成条目上限
+PAIR_ENTRY_BYTES = 120
+PAIR_RUN_BUFFER_BYTES = 1 << 20
+LINK_BATCH_SIZE = 1 << 16
+DELETE_BATCH_SIZE = 256
+# 隔离删除：文件改名移入扫描目录下的回收区（同一卷，仅改元数据），可按批次撤销
+QUARANTINE_DIRNAME = ".novel_similarity_trash"
+QUARANTINE_MANIFEST = "manifest.json"
+QUARANTINE_UNDO_KEEP = 8
+QUARANTINE_PURGE_INTERVAL = 3600.0
+DELETE_MODES = ("quarantine", "delete")
+SHORT_TITLE_LEN = 12
+CONTENT_HEAD_TAIL_BYTES = 64 * 1024
+TEXT_CHUNK_BYTES = 1 << 20
+SIMHASH_MIN_FEATURES = 16
+SIMHASH_MAX_DISTANCE = 7
+WATCH_DEBOUNCE_SECONDS = 0.5
+WATCH_REBUILD_RATIO = 0.1
+# inotify 事件掩码（<sys/inotify.h>）：只关心目录项的增删、改名与写入完成
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+INOTIFY_MASK = (
+    IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+)
+INOTIFY_EVENT_SIZE = struct.calcsize("iIII")
+EVENTS_KEEPALIVE_SECONDS = 15.0
+EVIDENCE_SNIPPETS = 8
+EVIDENCE_PAIR_TOKENS = 12
+EVIDENCE_MAX_PAIRS = 50
+# 超大分组只在体积最大的若干文件之间列举配对，避免按需计算时退化为平方级
+EVIDENCE_MAX_PAIR_FILES = 200
+REQUEST_DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+ANALYSIS_DURATION_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+METRICS_ROUTES = (
+    "/",
+    "/api/analyze",
+    "/api/bulk-delete",
+    "/api/delete-files",
+    "/api/default-path",
+    "/api/events",
+    "/api/export",
+    "/api/export/download",
+    "/api/groups",
+    "/api/groups/:id/evidence",
+    "/api/jobs",
+    "/api/metrics",
+    "/api/purge-quarantine",
+    "/api/quarantine",
+    "/api/stopwords",
+    "/api/undo-delete",
+)
+ROOT_SEPARATOR = "\n"
+EXPORT_CSV_HEADER = ("group_id", "is_latest_by_size", "file_name", "modified", "size", "path", "shared_snippets", "root")
+EXPORT_FORMATS = ("csv", "ndjson")
+# 流式导出每次写出的字符数，约 64KB 一个 HTTP 分块
+EXPORT_CHUNK_CHARS = 64 * 1024
+PAIR_SHARDS_PER_WORKER = 4
+ANALYSIS_PHASES = ("scanning", "ngrams", "postings", "pairs", "linking", "content", "grouping")
+
+JOB_PRIORITIES = {"interactive": 0, "bulk": 10}
+# 批量删除时每组保留哪个文件：最大（与分组内“删除旧文件”按钮一致）、最新修改、首选扩展名
+KEEP_POLICIES = ("largest", "newest", "extension")
+
+ProgressCallback = Callable[[str, dict[str, Any]], None]
+
+
+class AnalysisCancelled(Exception):
+    pass
+
+
+class CancelToken:
+    def __init__(self) -> None:
+        self.event = threading.Event()
+
+    def cancel(self) -> None:
+        self.event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.event.is_set()
+
+    def check(self) -> None:
+        if self.event.is_set():
+            raise AnalysisCancelled("分析已取消")
+
+
+@dataclass(frozen=True)
+class ScanOptions:
+    recursive: bool = False
+    max_depth: int | None = None
+    include: tuple[str, ...] = ()
+    exclude: tuple[str, ...] = ()
+    workers: int = field(default=8, compare=False)
+
+
+ENGINES = ("exact", "minhash")
+
+
+@dataclass(frozen=True)
+class EngineOptions:
+    # minhash 引擎：bands × rows 个哈希，Jaccard 相似度约超过 (1/bands)^(1/rows) 的文件对大概率成为候选；
+    # bands 越多召回越高，rows 越多越严格越快
+    engine: str = "exact"
+    bands: int = 16
+    rows: int = 1
+    max_bucket: int = 8
+    workers: int = field(default=1, compare=False)
+    # exact 引擎候选对累加表的内存预算（MB），超出后分批排序落盘，0 表示不限
+    pair_memory_mb: int = field(default=0, compare=False)
+
+    def __post_init__(self) -> None:
+        if self.engine not in ENGINES:
+            raise ValueError(f"未知的候选生成引擎：{self.engine}")
+        if self.bands < 1 or self.rows < 1 or self.max_bucket < 1:
+            raise ValueError("minhash 参数必须为正整数")
+        if self.pair_memory_mb < 0:
+            raise ValueError("配对内存预算不能为负数")
+
+    @property
+    def num_perm(self) -> int:
+        return self.bands * self.rows
 
 
 @dataclass(frozen=True)
@@ -1105,12 +1896,15 @@ class FileMeta:
     normalized: str
     size_bytes: int
     modified_ts: float
+    # 所属扫描目录；多目录分析时据此标记文件来源
+    root: str = field(default="", compare=False)
 
 
 class UnionFind:
+    # 父指针与秩用紧凑数组保存，百万级文件时比 list 少一个数量级的内存；秩不超过 log2(n)，一个字节足够
     def __init__(self, size: int) -> None:
-        self.parent = list(range(size))
-        self.rank = [0] * size
+        self.parent = array("i", range(size))
+        self.rank = bytearray(size)
 
     def find(self, x: int) -> int:
         while self.parent[x] != x:
@@ -1118,19 +1912,44 @@ class UnionFind:
             x = self.parent[x]
         return x
 
-    def union(self, a: int, b: int) -> None:
+    def union(self, a: int, b: int) -> bool:
         ra = self.find(a)
         rb = self.find(b)
         if ra == rb:
-            return
+            return False
         if self.rank[ra] < self.rank[rb]:
             self.parent[ra] = rb
-            return
+            return True
         if self.rank[ra] > self.rank[rb]:
             self.parent[rb] = ra
-            return
+            return True
         self.parent[rb] = ra
         self.rank[ra] += 1
+        return True
+
+    def union_keys(self, keys: Iterable[int]) -> None:
+        # 批量合并打包为 (a << 32) | b 的配对；查找内联，省去逐对两次方法调用。
+        # 两端已在同一分量的配对找到同一个根后直接跳过
+        parent = self.parent
+        rank = self.rank
+        for key in keys:
+            a = key >> 32
+            while parent[a] != a:
+                parent[a] = parent[parent[a]]
+                a = parent[a]
+            b = key & PAIR_INDEX_MASK
+            while parent[b] != b:
+                parent[b] = parent[parent[b]]
+                b = parent[b]
+            if a == b:
+                continue
+            if rank[a] < rank[b]:
+                parent[a] = b
+            elif rank[a] > rank[b]:
+                parent[b] = a
+            else:
+                parent[b] = a
+                rank[a] += 1
 
 
 def normalize_title(stem: str) -> str:
@@ -1213,18 +2032,63 @@ def save_stopwords(config_path: Path, stopwords_text: str) -> str:
 
 
 def save_default_path(config_path: Path, default_path: str) -> str:
-    normalized = str(Path(default_path).resolve())
+    # 多个目录逐行保存
+    normalized = join_roots(resolve_roots(default_path))
     save_config(config_path, {"default_path": normalized})
     return normalized
 
 
+def _trie_pattern(words: tuple[str, ...]) -> str:
+    trie: dict[str, Any] = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def emit(node: dict[str, Any]) -> str:
+        alts = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else f"(?:{'|'.join(alts)})"
+        return f"(?:{body})?" if "" in node else body
+
+    return emit(trie)
+
+
+class StopwordMatcher:
+    def __init__(self, stopwords: tuple[str, ...]) -> None:
+        words = tuple(w for w in stopwords if w)
+        self.priority = {w: i for i, w in enumerate(words)}
+        # 同一起点上更短的停用词一定是最长命中的前缀，需一并纳入候选
+        self.contained = {w: [v for v in self.priority if v != w and v in w] for w in self.priority}
+        self.pattern = re.compile(f"(?=({_trie_pattern(words)}))") if words else None
+
+    def strip(self, text: str) -> str:
+        if self.pattern is None:
+            return text
+        found = set(self.pattern.findall(text))
+        if not found:
+            return SPACE_RE.sub(" ", text).strip()
+        words = set(found)
+        for word in found:
+            words.update(self.contained[word])
+        # 仅对实际出现的词按原优先级（长词优先）依次替换，结果与逐词 replace 完全一致
+        cleaned = text
+        for word in sorted(words, key=self.priority.__getitem__):
+            cleaned = cleaned.replace(word, " ")
+        return SPACE_RE.sub(" ", cleaned).strip()
+
+
+@lru_cache(maxsize=16)
+def get_stopword_matcher(stopwords: tuple[str, ...]) -> StopwordMatcher:
+    return StopwordMatcher(stopwords)
+
+
 def remove_stopwords(text: str, stopwords: list[str]) -> str:
     if not stopwords:
         return text
-    cleaned = text
-    for word in stopwords:
-        cleaned = cleaned.replace(word, " ")
-    return SPACE_RE.sub(" ", cleaned).strip()
+    return get_stopword_matcher(tuple(stopwords)).strip(text)
 
 
 def split_extensions(raw: str) -> set[str]:
@@ -1239,38 +2103,628 @@ def split_extensions(raw: str) -> set[str]:
     return exts
 
 
-def collect_files(folder: Path, extensions: set[str]) -> list[FileMeta]:
+class ScanCache:
+    def __init__(self, db_path: Path) -> None:
+        self.db_path = db_path
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCAN_CACHE_SCHEMA_VERSION:
+            self.conn.execute("DROP TABLE IF EXISTS file_meta")
+            self.conn.execute("DROP TABLE IF EXISTS content_hash")
+            self.conn.execute("DROP TABLE IF EXISTS text_simhash")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS file_meta (
+                folder TEXT NOT NULL,
+                name TEXT NOT NULL,
+                path TEXT NOT NULL,
+                stem TEXT NOT NULL,
+                normalized TEXT NOT NULL,
+                size_bytes INTEGER NOT NULL,
+                modified_ts REAL NOT NULL,
+                PRIMARY KEY (folder, name)
+            ) WITHOUT ROWID
+            """
+        )
+        # 删除文件后按路径移除缓存行（软链接的 path 为目标路径，无法还原出 folder/name）
+        self.conn.execute("CREATE INDEX IF NOT EXISTS file_meta_path ON file_meta (path)")
+        # 内容哈希按路径缓存，大小或修改时间变化即视为失效；full 为空表示尚未算过整文件哈希
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS content_hash (
+                path TEXT PRIMARY KEY,
+                size_bytes INTEGER NOT NULL,
+                modified_ts REAL NOT NULL,
+                partial TEXT NOT NULL,
+                full TEXT NOT NULL
+            ) WITHOUT ROWID
+            """
+        )
+        # simhash 以有符号 64 位整数存放；正文过短时为 NULL
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS text_simhash (
+                path TEXT PRIMARY KEY,
+                size_bytes INTEGER NOT NULL,
+                modified_ts REAL NOT NULL,
+                simhash INTEGER,
+                features INTEGER NOT NULL
+            ) WITHOUT ROWID
+            """
+        )
+        self.conn.execute(f"PRAGMA user_version = {SCAN_CACHE_SCHEMA_VERSION}")
+        self.conn.commit()
+
+    def load_folder(self, folder: str, root: str = "") -> dict[str, FileMeta]:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT name, path, stem, normalized, size_bytes, modified_ts FROM file_meta WHERE folder = ?",
+                (folder,),
+            ).fetchall()
+        return {
+            row[0]: FileMeta(
+                name=row[0],
+                path=row[1],
+                stem=row[2],
+                normalized=row[3],
+                size_bytes=int(row[4]),
+                modified_ts=float(row[5]),
+                root=root,
+            )
+            for row in rows
+        }
+
+    def save_folder(
+        self,
+        folder: str,
+        changed: list[FileMeta],
+        removed: list[str],
+        hits: int,
+    ) -> None:
+        with self.lock:
+            self.hits += hits
+            self.misses += len(changed)
+            if not changed and not removed:
+                return
+            with self.conn:
+                if removed:
+                    self.conn.executemany(
+                        "DELETE FROM file_meta WHERE folder = ? AND name = ?",
+                        [(folder, name) for name in removed],
+                    )
+                if changed:
+                    self.conn.executemany(
+                        "INSERT OR REPLACE INTO file_meta VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        [
+                            (folder, m.name, m.path, m.stem, m.normalized, m.size_bytes, m.modified_ts)
+                            for m in changed
+                        ],
+                    )
+
+    def forget_paths(self, paths: list[str]) -> list[tuple[Any, ...]]:
+        # 删除的文件直接从元数据缓存移除，返回被移除的行，撤销删除时原样写回
+        removed: list[tuple[Any, ...]] = []
+        with self.lock, self.conn:
+            for start in range(0, len(paths), 500):
+                chunk = paths[start : start + 500]
+                marks = ",".join("?" * len(chunk))
+                removed.extend(self.conn.execute(f"SELECT * FROM file_meta WHERE path IN ({marks})", chunk).fetchall())
+                self.conn.execute(f"DELETE FROM file_meta WHERE path IN ({marks})", chunk)
+        return removed
+
+    def restore_rows(self, rows: list[tuple[Any, ...]]) -> None:
+        if not rows:
+            return
+        with self.lock, self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO file_meta VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def load_content_hashes(self, files: list[FileMeta]) -> dict[str, tuple[str, str]]:
+        wanted = {f.path: f for f in files}
+        out: dict[str, tuple[str, str]] = {}
+        paths = list(wanted)
+        with self.lock:
+            for start in range(0, len(paths), 500):
+                chunk = paths[start : start + 500]
+                rows = self.conn.execute(
+                    "SELECT path, size_bytes, modified_ts, partial, full FROM content_hash "
+                    f"WHERE path IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                for path, size_bytes, modified_ts, partial, full in rows:
+                    meta = wanted[path]
+                    if int(size_bytes) == meta.size_bytes and float(modified_ts) == meta.modified_ts:
+                        out[path] = (partial, full)
+        return out
+
+    def save_content_hashes(self, rows: list[tuple[FileMeta, str, str]]) -> None:
+        if not rows:
+            return
+        with self.lock:
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO content_hash VALUES (?, ?, ?, ?, ?)",
+                    [(m.path, m.size_bytes, m.modified_ts, partial, full) for m, partial, full in rows],
+                )
+
+    def load_simhashes(self, files: list[FileMeta]) -> dict[str, int | None]:
+        wanted = {f.path: f for f in files}
+        out: dict[str, int | None] = {}
+        paths = list(wanted)
+        with self.lock:
+            for start in range(0, len(paths), 500):
+                chunk = paths[start : start + 500]
+                rows = self.conn.execute(
+                    "SELECT path, size_bytes, modified_ts, simhash FROM text_simhash "
+                    f"WHERE path IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                for path, size_bytes, modified_ts, simhash in rows:
+                    meta = wanted[path]
+                    if int(size_bytes) == meta.size_bytes and float(modified_ts) == meta.modified_ts:
+                        out[path] = None if simhash is None else int(simhash) & 0xFFFFFFFFFFFFFFFF
+        return out
+
+    def save_simhashes(self, rows: list[tuple[FileMeta, int | None, int]]) -> None:
+        if not rows:
+            return
+        with self.lock:
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO text_simhash VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (
+                            m.path,
+                            m.size_bytes,
+                            m.modified_ts,
+                            None if simhash is None else simhash - (1 << 64) if simhash >> 63 else simhash,
+                            features,
+                        )
+                        for m, simhash, features in rows
+                    ],
+                )
+
+    def rebuild(self) -> None:
+        with self.lock:
+            with self.conn:
+                self.conn.execute("DELETE FROM file_meta")
+                self.conn.execute("DELETE FROM content_hash")
+                self.conn.execute("DELETE FROM text_simhash")
+            self.conn.execute("VACUUM")
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict[str, Any]:
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "path": str(self.db_path),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+def split_patterns(raw: Any) -> tuple[str, ...]:
+    parts = raw if isinstance(raw, (list, tuple)) else str(raw or "").split(",")
+    out: list[str] = []
+    for part in parts:
+        part = str(part).strip().replace("\\", "/")
+        if part and part not in out:
+            out.append(part)
+    return tuple(out)
+
+
+def split_roots(raw: Any) -> list[str]:
+    # 多个扫描目录以列表传入，或在同一字符串中逐行书写；路径中可能出现 | 等符号，只按换行切分
+    parts = raw if isinstance(raw, (list, tuple)) else str(raw or "").splitlines()
+    out: list[str] = []
+    for part in parts:
+        part = str(part).strip()
+        if part and part not in out:
+            out.append(part)
+    return out
+
+
+def resolve_roots(raw: Any) -> list[Path]:
+    roots: list[Path] = []
+    for part in split_roots(raw):
+        root = Path(part).resolve()
+        if root not in roots:
+            roots.append(root)
+    return roots
+
+
+def join_roots(roots: Iterable[Path | str]) -> str:
+    return ROOT_SEPARATOR.join(str(r) for r in roots)
+
+
+def owning_root(path: Path, roots: Iterable[Path]) -> Path | None:
+    # 扫描目录可能嵌套（非递归扫描时），取离文件最近的一个
+    best: Path | None = None
+    for root in roots:
+        if root in path.parents and (best is None or len(root.parts) > len(best.parts)):
+            best = root
+    return best
+
+
+def parse_max_depth(raw: Any) -> int | None:
+    if raw is None or str(raw).strip() == "":
+        return None
+    depth = int(raw)
+    return depth if depth >= 0 else None
+
+
+def match_any(rel_path: str, name: str, patterns: tuple[str, ...]) -> bool:
+    return any(fnmatch(rel_path, pat) or fnmatch(name, pat) for pat in patterns)
+
+
+def scan_directory(
+    directory: str,
+    root: str,
+    extensions: set[str],
+    scan_cache: ScanCache | None,
+    options: ScanOptions,
+    cancel: CancelToken | None = None,
+) -> tuple[list[FileMeta], list[str]]:
+    cached = scan_cache.load_folder(directory, root) if scan_cache else {}
+    changed: list[FileMeta] = []
+    seen: set[str] = set()
+    hits = 0
+    rel_prefix = directory[len(root) :].strip("\\/").replace("\\", "/")
+
+    files: list[FileMeta] = []
+    subdirs: list[str] = []
+    with os.scandir(directory) as it:
+        for entry_idx, entry in enumerate(it):
+            if cancel is not None and entry_idx % PROGRESS_INTERVAL == 0:
+                cancel.check()
+            name = entry.name
+            if name == QUARANTINE_DIRNAME:
+                continue
+            rel_path = f"{rel_prefix}/{name}" if rel_prefix else name
+            if options.exclude and match_any(rel_path, name, options.exclude):
+                continue
+            # 不跟随目录软链接，避免环路；DirEntry 自带类型信息，无需额外 stat
+            if options.recursive and entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+                continue
+            if not entry.is_file():
+                continue
+            stem, suffix = os.path.splitext(name)
+            if extensions and suffix.lower() not in extensions:
+                continue
+            if options.include and not match_any(rel_path, name, options.include):
+                continue
+            stat = entry.stat()
+            size_bytes = int(stat.st_size)
+            seen.add(name)
+            meta = cached.get(name)
+            if meta is not None and meta.size_bytes == size_bytes and meta.modified_ts == stat.st_mtime:
+                hits += 1
+            else:
+                path = str(Path(entry.path).resolve()) if entry.is_symlink() else entry.path
+                meta = FileMeta(
+                    name=name,
+                    path=path,
+                    stem=stem,
+                    normalized=normalize_title(stem),
+                    size_bytes=size_bytes,
+                    modified_ts=stat.st_mtime,
+                    root=root,
+                )
+                changed.append(meta)
+            if not meta.normalized:
+                continue
+            files.append(meta)
+
+    if scan_cache is not None:
+        removed = [name for name in cached if name not in seen]
+        scan_cache.save_folder(directory, changed, removed, hits)
+    return files, subdirs
+
+
+def collect_files(
+    folder: Path,
+    extensions: set[str],
+    scan_cache: ScanCache | None = None,
+    options: ScanOptions | None = None,
+    progress: ProgressCallback | None = None,
+    cancel: CancelToken | None = None,
+) -> list[FileMeta]:
     if not folder.exists() or not folder.is_dir():
         raise FileNotFoundError(f"目录不存在：{folder}")
 
-    files: list[FileMeta] = []
-    for path in folder.iterdir():
-        if not path.is_file():
-            continue
-        if extensions and path.suffix.lower() not in extensions:
-            continue
-        stat = path.stat()
-        normalized = normalize_title(path.stem)
-        if not normalized:
-            continue
-        files.append(
-            FileMeta(
-                name=path.name,
-                path=str(path.resolve()),
-                stem=path.stem,
-                normalized=normalized,
-                size_bytes=int(stat.st_size),
-                modified_ts=stat.st_mtime,
-            )
-        )
+    options = options or ScanOptions()
+    root = str(folder)
+    files, subdirs = scan_directory(root, root, extensions, scan_cache, options, cancel)
+    dirs_scanned = 1
 
-    files.sort(key=lambda f: f.name.lower())
+    if subdirs and (options.max_depth is None or options.max_depth > 0):
+        with ThreadPoolExecutor(max_workers=max(1, options.workers)) as pool:
+            pending = {
+                pool.submit(scan_directory, sub, root, extensions, scan_cache, options, cancel): 1
+                for sub in subdirs
+            }
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                if cancel is not None and cancel.cancelled:
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    cancel.check()
+                for fut in done:
+                    depth = pending.pop(fut)
+                    try:
+                        dir_files, dir_subdirs = fut.result()
+                    except OSError:
+                        # 子目录无权限或扫描中被删除时跳过，不影响整体结果
+                        continue
+                    files.extend(dir_files)
+                    dirs_scanned += 1
+                    if progress is not None:
+                        progress("scanning", {"files": len(files), "dirs": dirs_scanned, "dirs_pending": len(pending)})
+                    if options.max_depth is not None and depth >= options.max_depth:
+                        continue
+                    for sub in dir_subdirs:
+                        pending[pool.submit(scan_directory, sub, root, extensions, scan_cache, options, cancel)] = (
+                            depth + 1
+                        )
+
+    files.sort(key=lambda f: (f.name.lower(), f.path))
     return files
 
 
-def build_file_ngrams(text: str, lengths: list[int], stopwords: list[str]) -> set[str]:
+def collect_roots(
+    roots: list[Path],
+    extensions: set[str],
+    scan_cache: ScanCache | None = None,
+    options: ScanOptions | None = None,
+    progress: ProgressCallback | None = None,
+    cancel: CancelToken | None = None,
+) -> list[FileMeta]:
+    if len(roots) == 1:
+        return collect_files(roots[0], extensions, scan_cache, options, progress, cancel)
+    # 各目录常在不同磁盘或网络盘上，互不等待地并行扫描；进度按目录汇总后上报
+    counters: list[dict[str, Any]] = [{} for _ in roots]
+    lock = threading.Lock()
+
+    def root_progress(i: int) -> ProgressCallback | None:
+        if progress is None:
+            return None
+
+        def report(phase: str, c: dict[str, Any]) -> None:
+            with lock:
+                counters[i] = c
+                merged = {key: sum(x.get(key, 0) for x in counters) for key in ("files", "dirs", "dirs_pending")}
+            progress(phase, merged)
+
+        return report
+
+    with ThreadPoolExecutor(max_workers=len(roots)) as pool:
+        futures = [
+            pool.submit(collect_files, root, extensions, scan_cache, options, root_progress(i), cancel)
+            for i, root in enumerate(roots)
+        ]
+        merged: dict[str, FileMeta] = {}
+        for fut in futures:
+            for meta in fut.result():
+                # 软链接解析后可能指向另一个扫描目录里的同一文件
+                merged.setdefault(meta.path, meta)
+    files = list(merged.values())
+    files.sort(key=lambda f: (f.name.lower(), f.path))
+    return files
+
+
+def files_fingerprint(files: list[FileMeta]) -> int:
+    return hash(tuple((f.path, f.size_bytes, f.modified_ts) for f in files))
+
+
+def partial_content_digest(path: str, size_bytes: int) -> str:
+    # 首尾各取 64 KB；不超过 128 KB 的文件等于整文件哈希
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        h.update(f.read(CONTENT_HEAD_TAIL_BYTES))
+        if size_bytes > 2 * CONTENT_HEAD_TAIL_BYTES:
+            f.seek(size_bytes - CONTENT_HEAD_TAIL_BYTES)
+        h.update(f.read(CONTENT_HEAD_TAIL_BYTES))
+    return h.hexdigest()
+
+
+def full_content_digest(path: str) -> str:
+    # mmap 交给 hashlib 直接读，大块数据哈希时会释放 GIL，线程池可并行
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return hashlib.blake2b(mm, digest_size=20).hexdigest()
+
+
+def find_content_duplicates(
+    files: list[FileMeta],
+    scan_cache: ScanCache | None = None,
+    workers: int = 8,
+    progress: ProgressCallback | None = None,
+    cancel: CancelToken | None = None,
+) -> dict[str, str]:
+    # 分三级筛：大小相同 → 首尾哈希相同 → 整文件哈希相同，越往后候选越少、代价越高
+    by_size: dict[int, list[FileMeta]] = defaultdict(list)
+    for meta in files:
+        if meta.size_bytes > 0:
+            by_size[meta.size_bytes].append(meta)
+    candidates = [meta for bucket in by_size.values() if len(bucket) > 1 for meta in bucket]
+    cached = scan_cache.load_content_hashes(candidates) if scan_cache is not None and candidates else {}
+    hashes = {path: list(value) for path, value in cached.items()}
+    dirty: set[str] = set()
+
+    def run_stage(stage: str, metas: list[FileMeta], compute: Callable[[FileMeta], str], slot: int) -> None:
+        if not metas:
+            return
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = {pool.submit(compute, meta): meta for meta in metas}
+            pending = set(futures)
+            while pending:
+                if cancel is not None and cancel.cancelled:
+                    for future in pending:
+                        future.cancel()
+                    cancel.check()
+                if progress is not None:
+                    progress("content", {"stage": stage, "files_done": len(metas) - len(pending), "files_total": len(metas)})
+                done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                for future in done:
+                    meta = futures[future]
+                    try:
+                        digest = future.result()
+                    except OSError:
+                        continue
+                    hashes.setdefault(meta.path, ["", ""])[slot] = digest
+                    dirty.add(meta.path)
+
+    run_stage(
+        "partial",
+        [m for m in candidates if not hashes.get(m.path, ["", ""])[0]],
+        lambda m: partial_content_digest(m.path, m.size_bytes),
+        0,
+    )
+    by_partial: dict[tuple[int, str], list[FileMeta]] = defaultdict(list)
+    for meta in candidates:
+        partial = hashes.get(meta.path, ["", ""])[0]
+        if partial:
+            by_partial[(meta.size_bytes, partial)].append(meta)
+
+    colliding = [
+        meta
+        for (size_bytes, _), bucket in by_partial.items()
+        if len(bucket) > 1 and size_bytes > 2 * CONTENT_HEAD_TAIL_BYTES
+        for meta in bucket
+    ]
+    run_stage("full", [m for m in colliding if not hashes[m.path][1]], lambda m: full_content_digest(m.path), 1)
+
+    if scan_cache is not None and dirty:
+        metas_by_path = {m.path: m for m in candidates}
+        scan_cache.save_content_hashes([(metas_by_path[p], hashes[p][0], hashes[p][1]) for p in dirty if hashes[p][0]])
+
+    by_content: dict[tuple[int, str], list[str]] = defaultdict(list)
+    for (size_bytes, partial), bucket in by_partial.items():
+        if len(bucket) < 2:
+            continue
+        for meta in bucket:
+            digest = partial if size_bytes <= 2 * CONTENT_HEAD_TAIL_BYTES else hashes[meta.path][1]
+            if digest:
+                by_content[(size_bytes, digest)].append(meta.path)
+    return {path: digest for (_, digest), paths in by_content.items() if len(paths) > 1 for path in paths}
+
+
+def detect_text_encoding(head: bytes) -> str:
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    try:
+        head.decode("utf-8")
+    except UnicodeDecodeError as exc:
+        # 只在采样末尾截断了多字节字符时仍视为 UTF-8；GB18030 兼容 GBK/GB2312
+        if exc.start < len(head) - 3:
+            return "gb18030"
+    return "utf-8"
+
+
+def text_simhash(path: str) -> tuple[int | None, int]:
+    # 以句子为特征的 64 位 SimHash，分块流式解码，内存占用与文件大小无关；
+    # 每个特征的 8 字节哈希按字节位置计数，最后按位汇总，避免逐特征逐位循环
+    tables: list[Counter[int]] = [Counter() for _ in range(8)]
+    features = 0
+    with open(path, "rb") as f:
+        chunk = f.read(TEXT_CHUNK_BYTES)
+        decoder = codecs.getincrementaldecoder(detect_text_encoding(chunk))(errors="replace")
+        carry = ""
+        while True:
+            final = not chunk
+            parts = SENTENCE_SPLIT_RE.split(carry + decoder.decode(chunk, final=final))
+            carry = "" if final else parts.pop()
+            digests = bytearray()
+            for part in parts:
+                sentence = SPACE_RE.sub("", part)
+                if len(sentence) >= 4:
+                    digests += hashlib.blake2b(sentence.encode("utf-8"), digest_size=8).digest()
+            features += len(digests) // 8
+            for pos, table in enumerate(tables):
+                table.update(digests[pos::8])
+            if final:
+                break
+            chunk = f.read(TEXT_CHUNK_BYTES)
+    if features < SIMHASH_MIN_FEATURES:
+        return None, features
+    simhash = 0
+    for pos, table in enumerate(tables):
+        for bit in range(8):
+            ones = sum(count for value, count in table.items() if value >> bit & 1)
+            if ones * 2 > features:
+                simhash |= 1 << (pos * 8 + bit)
+    return simhash, features
+
+
+def find_text_near_duplicates(
+    files: list[FileMeta],
+    max_distance: int = 3,
+    scan_cache: ScanCache | None = None,
+    workers: int = 1,
+    progress: ProgressCallback | None = None,
+    cancel: CancelToken | None = None,
+) -> list[tuple[str, str]]:
+    max_distance = min(max(0, int(max_distance)), SIMHASH_MAX_DISTANCE)
+    texts = [f for f in files if f.name.lower().endswith(".txt") and f.size_bytes > 0]
+    simhashes = scan_cache.load_simhashes(texts) if scan_cache is not None and texts else {}
+    missing = [f for f in texts if f.path not in simhashes]
+
+    computed: list[tuple[FileMeta, int | None, int]] = []
+    if missing:
+        # 正文解码与哈希是纯 Python 计算，放进进程池绕开 GIL
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=max(1, workers), mp_context=ctx) as pool:
+            futures = {pool.submit(text_simhash, meta.path): meta for meta in missing}
+            pending = set(futures)
+            while pending:
+                if cancel is not None and cancel.cancelled:
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    cancel.check()
+                if progress is not None:
+                    progress(
+                        "content",
+                        {"stage": "simhash", "files_done": len(missing) - len(pending), "files_total": len(missing)},
+                    )
+                done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                for future in done:
+                    meta = futures[future]
+                    try:
+                        simhash, features = future.result()
+                    except (OSError, LookupError):
+                        continue
+                    simhashes[meta.path] = simhash
+                    computed.append((meta, simhash, features))
+        if scan_cache is not None:
+            scan_cache.save_simhashes(computed)
+
+    # 鸽巢原理：海明距离不超过 k 的两个指纹，切成 k+1 段后至少有一段完全相同
+    items = [(path, h) for path, h in simhashes.items() if h is not None]
+    blocks = max_distance + 1
+    width = 64 // blocks
+    pairs: set[tuple[str, str]] = set()
+    for block in range(blocks):
+        if cancel is not None:
+            cancel.check()
+        shift = block * width
+        mask = (1 << (64 - shift if block == blocks - 1 else width)) - 1
+        buckets: dict[int, list[tuple[str, int]]] = defaultdict(list)
+        for path, h in items:
+            buckets[(h >> shift) & mask].append((path, h))
+        for members in buckets.values():
+            for i, (path_a, h_a) in enumerate(members):
+                for path_b, h_b in members[i + 1 :]:
+                    if (h_a ^ h_b).bit_count() <= max_distance:
+                        pairs.add((path_a, path_b) if path_a < path_b else (path_b, path_a))
+    return sorted(pairs)
+
+
+def extract_ngrams(cleaned: str, lengths: list[int]) -> set[str]:
     tokens: set[str] = set()
-    cleaned = remove_stopwords(text, stopwords)
     if not cleaned:
         return tokens
 
@@ -1287,13 +2741,18 @@ def build_file_ngrams(text: str, lengths: list[int], stopwords: list[str]) -> se
     return tokens
 
 
+def build_file_ngrams(text: str, lengths: list[int], stopwords: list[str]) -> set[str]:
+    return extract_ngrams(remove_stopwords(text, stopwords), lengths)
+
+
 def should_link_pair(
-    len_counter: Counter[int],
+    len_counter: Mapping[int, int],
     lengths: list[int],
     min_pair_matches: int,
     short_title_pair: bool,
     min_title_len: int,
 ) -> bool:
+    # 逐对判定的参考实现，增量索引使用；批量关联走 evaluate_link_rule，两者规则须保持一致
     selected = set(lengths)
     count2 = len_counter.get(2, 0) if 2 in selected else 0
     count3 = len_counter.get(3, 0) if 3 in selected else 0
@@ -1325,6 +2784,85 @@ def should_link_pair(
     return False
 
 
+@lru_cache(maxsize=64)
+def byte_table(op: str, threshold: int) -> bytes:
+    if op == "ge":
+        return bytes(1 if v >= threshold else 0 for v in range(256))
+    return bytes(1 if v <= threshold else 0 for v in range(256))
+
+
+def to_mask(flags: bytes) -> int:
+    return int.from_bytes(flags, "little")
+
+
+def count_at_least(col: array, threshold: int) -> int:
+    # col 为 array("I") 计数列；取出最低字节查表，高位字节非零说明计数已超过 255
+    size = len(col)
+    if threshold <= 0:
+        return to_mask(b"\x01" * size)
+    if threshold > 255:
+        return to_mask(bytes(map(threshold.__le__, col)))
+    raw = col.tobytes()
+    order = (0, 1, 2, 3) if sys.byteorder == "little" else (3, 2, 1, 0)
+    mask = to_mask(raw[order[0] :: 4].translate(byte_table("ge", threshold)))
+    high = to_mask(raw[order[1] :: 4]) | to_mask(raw[order[2] :: 4]) | to_mask(raw[order[3] :: 4])
+    if high:
+        mask |= to_mask(high.to_bytes(size, "little").translate(byte_table("ge", 1)))
+    return mask
+
+
+def evaluate_link_rule(
+    keys: array,
+    columns: Mapping[int, array],
+    lengths: list[int],
+    title_lens: bytes,
+    min_pair_matches: int,
+) -> tuple[bytes, bytes]:
+    # should_link_pair 的按列版本：每对占一个字节（0/1），整批掩码拼成大整数做按位运算，
+    # 阈值比较用 bytes.translate 查表，逐对的 Python 操作只剩按文件取标题长度。
+    # 返回 (是否命中 >=5 字片段, 是否关联) 两个字节串；title_lens 为清洗后标题长度，截断到 SHORT_TITLE_LEN + 1
+    size = len(keys)
+    selected = set(lengths)
+    zeros = array("I", bytes(4 * size))
+    cols = {n: col for n, col in columns.items() if n in selected}
+
+    def at_least(n: int, threshold: int) -> int:
+        return count_at_least(cols.get(n, zeros), threshold)
+
+    if selected == {2}:
+        return bytes(size), at_least(2, min_pair_matches).to_bytes(size, "little")
+
+    ones = to_mask(b"\x01" * size)
+    present = {n: count_at_least(col, 1) for n, col in cols.items()}
+    strong = 0
+    for n, mask in present.items():
+        if n >= 5:
+            strong |= mask
+    medium = at_least(4, 2) | at_least(3, 3)
+    loose = at_least(2, min_pair_matches) & (at_least(3, 2) | at_least(4, 1))
+
+    # 短标题兜底看两端标题的较短者：min(a, b) <= k 等价于 a <= k 或 b <= k
+    halves = array("I", keys.tobytes())
+    hi, lo = (1, 0) if sys.byteorder == "little" else (0, 1)
+    title_a = bytes(map(title_lens.__getitem__, halves[hi::2]))
+    title_b = bytes(map(title_lens.__getitem__, halves[lo::2]))
+
+    def title_at_most(k: int) -> int:
+        table = byte_table("le", k)
+        return to_mask(title_a.translate(table)) | to_mask(title_b.translate(table))
+
+    # 命中的最长片段长度为 n：n 有命中且更长的长度都没有；全无命中时视为 0
+    covered = 0
+    longer = 0
+    for n in sorted(present, reverse=True):
+        covered |= present[n] & (longer ^ ones) & title_at_most(min(n, 8))
+        longer |= present[n]
+    covered |= (longer ^ ones) & title_at_most(0)
+    fallback = title_at_most(SHORT_TITLE_LEN) & (covered | loose)
+    accept = strong | medium | fallback
+    return strong.to_bytes(size, "little"), accept.to_bytes(size, "little")
+
+
 def fmt_time(ts: float) -> str:
     return datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
 
@@ -1341,15 +2879,765 @@ def fmt_size(size_bytes: int) -> str:
     return f"{value:.2f} {units[unit_idx]}"
 
 
+class LRUCache:
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max(1, int(max_entries))
+        self.entries: OrderedDict[Any, Any] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get_or_compute(self, key: Any, compute: Callable[[], Any]) -> Any:
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+        value = compute()
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+
+class AnalysisCache:
+    def __init__(self, max_entries: int = 4) -> None:
+        self.scan = LRUCache(max_entries)
+        self.ngrams = LRUCache(max_entries)
+        self.postings = LRUCache(max_entries)
+        self.signatures = LRUCache(max_entries)
+        self.pair_stats = LRUCache(max(1, max_entries // 2))
+
+    def clear(self) -> None:
+        for stage in (self.scan, self.ngrams, self.postings, self.signatures, self.pair_stats):
+            stage.clear()
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        return {
+            name: {"hits": stage.hits, "misses": stage.misses, "entries": len(stage.entries)}
+            for name, stage in (
+                ("scan", self.scan),
+                ("ngrams", self.ngrams),
+                ("postings", self.postings),
+                ("signatures", self.signatures),
+                ("pair_stats", self.pair_stats),
+            )
+        }
+
+
+@dataclass(frozen=True)
+class NgramIndex:
+    cleaned: list[str]
+    tokens: list[set[str]]
+
+
+@dataclass(frozen=True)
+class Postings:
+    tokens: list[str]
+    docs: list[array]
+
+
+@dataclass(frozen=True)
+class MinHashSignatures:
+    # 每个文件 num_perm 个 uint32 连续存放；valid 标记有片段的文件，无片段的不参与分桶
+    num_perm: int
+    blob: bytes
+    valid: bytes
+
+
+@dataclass(frozen=True)
+class PairStats:
+    # 每个候选对打包为 (a << 32) | b，按所选长度各存一列命中数
+    lengths: list[int]
+    keys: array
+    len_columns: list[array]
+    postings_kept: int = 0
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def pair(self, i: int) -> tuple[int, int]:
+        key = self.keys[i]
+        return key >> 32, key & PAIR_INDEX_MASK
+
+    def len_counter(self, i: int) -> dict[int, int]:
+        return {n: col[i] for n, col in zip(self.lengths, self.len_columns) if col[i]}
+
+    def iter_pairs(self) -> Iterator[tuple[int, int, dict[int, int]]]:
+        for i in range(len(self.keys)):
+            a, b = self.pair(i)
+            yield a, b, self.len_counter(i)
+
+    def iter_batches(self, size: int) -> Iterator[tuple[array, dict[int, array]]]:
+        for lo in range(0, len(self.keys), size):
+            hi = lo + size
+            yield self.keys[lo:hi], {n: col[lo:hi] for n, col in zip(self.lengths, self.len_columns)}
+
+
+class SpilledPairStats:
+    # 超出内存预算时的候选对统计：若干按键排序的落盘分段，遍历时 k 路归并并合并同键计数。
+    # 归并前只知道各分段条目数之和（同一对可能出现在多个分段），完整遍历一次后才得到准确对数
+    def __init__(self, lengths: list[int], directory: str, runs: list[tuple[str, int]], postings_kept: int) -> None:
+        self.lengths = list(lengths)
+        self.directory = directory
+        self.runs = runs
+        self.postings_kept = postings_kept
+        self.merged_pairs: int | None = None
+        self.record = pair_run_record(len(lengths))
+        # 对象被回收（如被分析缓存淘汰）时删除落盘文件
+        self._cleanup = weakref.finalize(self, shutil.rmtree, directory, True)
+
+    def __len__(self) -> int:
+        if self.merged_pairs is not None:
+            return self.merged_pairs
+        return sum(count for _, count in self.runs)
+
+    def _read_run(self, path: str) -> Iterator[tuple[int, ...]]:
+        block = self.record.size * (PAIR_RUN_BUFFER_BYTES // self.record.size)
+        with open(path, "rb") as f:
+            while True:
+                data = f.read(block)
+                if not data:
+                    return
+                yield from self.record.iter_unpack(data)
+
+    def _iter_merged(self) -> Iterator[tuple[int, list[int]]]:
+        current = -1
+        counts: list[int] = []
+        merged = 0
+        for record in heapq.merge(*(self._read_run(path) for path, _ in self.runs)):
+            key = record[0]
+            if key == current:
+                for slot in range(len(counts)):
+                    counts[slot] += record[slot + 1]
+                continue
+            if current >= 0:
+                merged += 1
+                yield current, counts
+            current = key
+            counts = list(record[1:])
+        if current >= 0:
+            merged += 1
+            yield current, counts
+        self.merged_pairs = merged
+
+    def iter_pairs(self) -> Iterator[tuple[int, int, dict[int, int]]]:
+        lengths = self.lengths
+        for key, counts in self._iter_merged():
+            yield key >> 32, key & PAIR_INDEX_MASK, {n: c for n, c in zip(lengths, counts) if c}
+
+    def iter_batches(self, size: int) -> Iterator[tuple[array, dict[int, array]]]:
+        keys = array("Q")
+        columns = [array("I") for _ in self.lengths]
+        for key, counts in self._iter_merged():
+            keys.append(key)
+            for col, c in zip(columns, counts):
+                col.append(c)
+            if len(keys) >= size:
+                yield keys, dict(zip(self.lengths, columns))
+                keys = array("Q")
+                columns = [array("I") for _ in self.lengths]
+        if keys:
+            yield keys, dict(zip(self.lengths, columns))
+
+
+def build_ngram_index(
+    files: list[FileMeta],
+    lengths: list[int],
+    stopwords: list[str],
+    progress: ProgressCallback | None = None,
+    cancel: CancelToken | None = None,
+) -> NgramIndex:
+    strip = get_stopword_matcher(tuple(stopwords)).strip
+    cleaned: list[str] = []
+    tokens: list[set[str]] = []
+    for i, f in enumerate(files):
+        if i % PROGRESS_INTERVAL == 0:
+            if cancel is not None:
+                cancel.check()
+            if progress is not None:
+                progress("ngrams", {"files_done": i, "files_total": len(files)})
+        text = strip(f.normalized)
+        cleaned.append(text.replace(" ", ""))
+        tokens.append(extract_ngrams(text, lengths))
+    return NgramIndex(cleaned=cleaned, tokens=tokens)
+
+
+def build_postings(per_file_tokens: list[set[str]]) -> Postings:
+    token_ids: dict[str, int] = {}
+    tokens: list[str] = []
+    docs: list[array] = []
+    for file_idx, file_tokens in enumerate(per_file_tokens):
+        for token in file_tokens:
+            token_id = token_ids.get(token)
+            if token_id is None:
+                token_id = len(tokens)
+                token_ids[token] = token_id
+                tokens.append(token)
+                docs.append(array("I"))
+            docs[token_id].append(file_idx)
+    return Postings(tokens=tokens, docs=docs)
+
+
+def build_minhash_signatures(
+    per_file_tokens: list[set[str]],
+    num_perm: int,
+    progress: ProgressCallback | None = None,
+    cancel: CancelToken | None = None,
+) -> MinHashSignatures:
+    # shake_128 一次调用即给出一个片段的全部 num_perm 个哈希，逐位取最小值得到文件签名
+    nbytes = num_perm * 4
+    empty = bytes(nbytes)
+    blob = bytearray()
+    valid = bytearray(len(per_file_tokens))
+    files_total = len(per_file_tokens)
+    for doc, toks in enumerate(per_file_tokens):
+        if doc % PROGRESS_INTERVAL == 0:
+            if cancel is not None:
+                cancel.check()
+            if progress is not None:
+                progress("postings", {"signatures_done": doc, "signatures_total": files_total})
+        if not toks:
+            blob += empty
+            continue
+        hashes = [array("I", hashlib.shake_128(t.encode("utf-8")).digest(nbytes)) for t in toks]
+        blob += array("I", map(min, zip(*hashes))).tobytes()
+        valid[doc] = 1
+    return MinHashSignatures(num_perm=num_perm, blob=bytes(blob), valid=bytes(valid))
+
+
+def lsh_pair_stats(
+    per_file_tokens: list[set[str]],
+    signatures: MinHashSignatures,
+    options: EngineOptions,
+    lengths: list[int],
+    progress: ProgressCallback | None = None,
+    cancel: CancelToken | None = None,
+) -> PairStats:
+    stride = signatures.num_perm * 4
+    band_bytes = options.rows * 4
+    blob = signatures.blob
+    docs = [doc for doc, ok in enumerate(signatures.valid) if ok]
+    window = options.max_bucket
+
+    candidates: set[int] = set()
+    for band in range(options.bands):
+        if cancel is not None:
+            cancel.check()
+        if progress is not None:
+            progress("pairs", {"bands_done": band, "bands_total": options.bands, "pairs": len(candidates)})
+        buckets: dict[bytes, list[int]] = defaultdict(list)
+        offset = band * band_bytes
+        for doc in docs:
+            start = doc * stride + offset
+            buckets[blob[start : start + band_bytes]].append(doc)
+        for members in buckets.values():
+            # 桶内成员按编号递增；超大桶只与其后 window 个成员配对，避免退化为平方级
+            for pos in range(len(members) - 1):
+                base = members[pos] << 32
+                candidates.update(base | b for b in members[pos + 1 : pos + 1 + window])
+
+    # 候选对用完整片段集合求交复核，不受文档频次上限影响
+    keys = array("Q", sorted(candidates))
+    slot_of = {n: slot for slot, n in enumerate(lengths)}
+    len_columns = [array("I", bytes(4 * len(keys))) for _ in lengths]
+    for i, key in enumerate(keys):
+        if cancel is not None and i % PAIR_CHECK_WORK == 0:
+            cancel.check()
+        for token in per_file_tokens[key >> 32] & per_file_tokens[key & PAIR_INDEX_MASK]:
+            slot = slot_of.get(len(token))
+            if slot is not None:
+                len_columns[slot][i] += 1
+    return PairStats(lengths=list(lengths), keys=keys, len_columns=len_columns)
+
+
+def compute_max_allowed(total: int, max_df_abs: int, max_df_ratio: float) -> int:
+    if max_df_ratio > 0:
+        ratio_limit = max(3, math.ceil(total * max_df_ratio))
+        return min(max_df_abs, ratio_limit)
+    return max_df_abs
+
+
+def pair_run_record(slots: int) -> struct.Struct:
+    return struct.Struct("<Q" + "I" * slots)
+
+
+def write_pair_run(path: str, acc: dict[int, int], slots: int, field_bits: int) -> tuple[str, int]:
+    # 按键排序后解包各长度计数，定长记录顺序写入，归并时逐块读取
+    record = pair_run_record(slots)
+    field_mask = (1 << field_bits) - 1
+    shifts = [field_bits * slot for slot in range(slots)]
+    buf = bytearray()
+    with open(path, "wb") as f:
+        for key in sorted(acc):
+            packed = acc[key]
+            buf += record.pack(key, *[(packed >> shift) & field_mask for shift in shifts])
+            if len(buf) >= PAIR_RUN_BUFFER_BYTES:
+                f.write(buf)
+                buf.clear()
+        f.write(buf)
+    return path, len(acc)
+
+
+def count_pair_stats(
+    postings: Postings,
+    max_allowed: int,
+    lengths: list[int],
+    max_title_len: int,
+    progress: ProgressCallback | None = None,
+    cancel: CancelToken | None = None,
+    memory_budget: int = 0,
+) -> PairStats | SpilledPairStats:
+    # 每种长度占一个定宽位段，单个 int 累加即可同时统计各长度命中数；
+    # 位宽按最长标题取，同一对文件的某长度命中数不可能超过标题长度
+    field_bits = max(1, max_title_len).bit_length()
+    slot_of = {n: slot for slot, n in enumerate(lengths)}
+
+    acc: dict[int, int] = {}
+    acc_get = acc.get
+    postings_kept = 0
+    tokens_total = len(postings.tokens)
+    max_entries = memory_budget // PAIR_ENTRY_BYTES if memory_budget > 0 else 0
+    spill_dir = ""
+    runs: list[tuple[str, int]] = []
+    spilled = 0
+    try:
+        # 按已展开的配对数而非片段数决定检查频率，高频片段的倒排表可能很长
+        work = PAIR_CHECK_WORK
+        for token_id, (token, idxs) in enumerate(zip(postings.tokens, postings.docs)):
+            if work >= PAIR_CHECK_WORK or token_id % PROGRESS_INTERVAL == 0:
+                work = 0
+                if cancel is not None:
+                    cancel.check()
+                if progress is not None:
+                    progress(
+                        "pairs",
+                        {
+                            "tokens_done": token_id,
+                            "tokens_total": tokens_total,
+                            "postings_kept": postings_kept,
+                            "pairs": spilled + len(acc),
+                            "spilled_runs": len(runs),
+                        },
+                    )
+            df = len(idxs)
+            if df < 2 or df > max_allowed:
+                continue
+            postings_kept += 1
+            work += df * (df - 1) // 2
+            inc = 1 << (field_bits * slot_of[len(token)])
+            for pos in range(df - 1):
+                base = idxs[pos] << 32
+                for b in idxs[pos + 1 :]:
+                    key = base | b
+                    acc[key] = acc_get(key, 0) + inc
+            if max_entries and len(acc) >= max_entries:
+                # 超出预算：当前累加表排序落盘为一个分段，清空后继续
+                spill_dir = spill_dir or tempfile.mkdtemp(prefix="novel_pairs_")
+                runs.append(write_pair_run(os.path.join(spill_dir, f"{len(runs)}.run"), acc, len(lengths), field_bits))
+                spilled += len(acc)
+                acc = {}
+                acc_get = acc.get
+
+        if runs:
+            if acc:
+                runs.append(write_pair_run(os.path.join(spill_dir, f"{len(runs)}.run"), acc, len(lengths), field_bits))
+            return SpilledPairStats(lengths, spill_dir, runs, postings_kept)
+    except BaseException:
+        if spill_dir:
+            shutil.rmtree(spill_dir, ignore_errors=True)
+        raise
+
+    keys, len_columns = unpack_pair_acc(acc, len(lengths), field_bits, cancel.check if cancel is not None else None)
+    return PairStats(lengths=list(lengths), keys=keys, len_columns=len_columns, postings_kept=postings_kept)
+
+
+def unpack_pair_acc(
+    acc: dict[int, int],
+    slots: int,
+    field_bits: int,
+    check: Callable[[], None] | None = None,
+) -> tuple[array, list[array]]:
+    field_mask = (1 << field_bits) - 1
+    keys = array("Q", acc.keys())
+    len_columns = [array("I") for _ in range(slots)]
+    for i, packed in enumerate(acc.values()):
+        if check is not None and i % PAIR_CHECK_WORK == 0:
+            check()
+        for slot, col in enumerate(len_columns):
+            col.append((packed >> (field_bits * slot)) & field_mask)
+    return keys, len_columns
+
+
+# 子进程内的分片计数状态，由进程池 initializer 一次性注入，避免每个分片重复传输倒排表
+_pair_shard_state: dict[str, Any] = {}
+
+
+def _init_pair_shard_worker(
+    kept: list[tuple[int, array]],
+    field_bits: int,
+    slots: int,
+    stop: Any,
+    spill_dir: str = "",
+    max_entries: int = 0,
+) -> None:
+    _pair_shard_state.update(
+        kept=kept, field_bits=field_bits, slots=slots, stop=stop, spill_dir=spill_dir, max_entries=max_entries
+    )
+
+
+def _count_pair_shard(lo: int, hi: int) -> tuple[array, list[array]] | list[tuple[str, int]] | None:
+    # 只统计较小文件编号落在 [lo, hi) 的配对，各分片的键互不重叠，父进程直接拼接；
+    # 设有内存预算时分片结果写成落盘分段，只把文件路径交回父进程
+    kept = _pair_shard_state["kept"]
+    field_bits = _pair_shard_state["field_bits"]
+    slots = _pair_shard_state["slots"]
+    stop = _pair_shard_state["stop"]
+    spill_dir = _pair_shard_state["spill_dir"]
+    max_entries = _pair_shard_state["max_entries"]
+    runs: list[tuple[str, int]] = []
+    acc: dict[int, int] = {}
+    acc_get = acc.get
+    work = 0
+    for slot, idxs in kept:
+        if idxs[0] >= hi or idxs[-2] < lo:
+            continue
+        df = len(idxs)
+        start = bisect_left(idxs, lo)
+        end = min(bisect_left(idxs, hi, start), df - 1)
+        inc = 1 << (field_bits * slot)
+        for pos in range(start, end):
+            base = idxs[pos] << 32
+            for b in idxs[pos + 1 :]:
+                key = base | b
+                acc[key] = acc_get(key, 0) + inc
+            work += df - pos - 1
+        if work >= PAIR_CHECK_WORK:
+            work = 0
+            if stop.is_set():
+                return None
+        if max_entries and len(acc) >= max_entries:
+            runs.append(write_pair_run(os.path.join(spill_dir, f"{lo}-{len(runs)}.run"), acc, slots, field_bits))
+            acc = {}
+            acc_get = acc.get
+    if spill_dir:
+        if acc:
+            runs.append(write_pair_run(os.path.join(spill_dir, f"{lo}-{len(runs)}.run"), acc, slots, field_bits))
+        return runs
+    return unpack_pair_acc(acc, slots, field_bits)
+
+
+def count_pair_stats_sharded(
+    postings: Postings,
+    max_allowed: int,
+    lengths: list[int],
+    max_title_len: int,
+    workers: int,
+    progress: ProgressCallback | None = None,
+    cancel: CancelToken | None = None,
+    memory_budget: int = 0,
+) -> PairStats | SpilledPairStats:
+    field_bits = max(1, max_title_len).bit_length()
+    slot_of = {n: slot for slot, n in enumerate(lengths)}
+    kept = [
+        (slot_of[len(token)], idxs)
+        for token, idxs in zip(postings.tokens, postings.docs)
+        if 2 <= len(idxs) <= max_allowed
+    ]
+
+    # 按每个文件作为较小编号时要展开的配对数切分文件编号区间，使各分片工作量接近
+    doc_work: Counter[int] = Counter()
+    for _, idxs in kept:
+        df = len(idxs)
+        for pos in range(df - 1):
+            doc_work[idxs[pos]] += df - pos - 1
+    total_work = sum(doc_work.values())
+    if workers <= 1 or total_work < PARALLEL_PAIR_MIN_WORK:
+        return count_pair_stats(postings, max_allowed, lengths, max_title_len, progress, cancel, memory_budget)
+
+    shard_count = workers * PAIR_SHARDS_PER_WORKER
+    bounds = [0]
+    acc_work = 0
+    for doc in sorted(doc_work):
+        acc_work += doc_work[doc]
+        if acc_work * shard_count >= total_work * len(bounds) and len(bounds) < shard_count:
+            bounds.append(doc + 1)
+    bounds.append(PAIR_INDEX_MASK)
+    shards = list(zip(bounds, bounds[1:]))
+
+    # 预算按工作进程平分，各进程独立落盘
+    spill_dir = tempfile.mkdtemp(prefix="novel_pairs_") if memory_budget > 0 else ""
+    max_entries = max(1, memory_budget // PAIR_ENTRY_BYTES // workers) if memory_budget > 0 else 0
+    ctx = multiprocessing.get_context("spawn")
+    stop = ctx.Event()
+    results: list[Any] = [None] * len(shards)
+    pairs = 0
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=ctx,
+        initializer=_init_pair_shard_worker,
+        initargs=(kept, field_bits, len(lengths), stop, spill_dir, max_entries),
+    ) as pool:
+        futures = {pool.submit(_count_pair_shard, lo, hi): i for i, (lo, hi) in enumerate(shards)}
+        pending = set(futures)
+        try:
+            while pending:
+                if cancel is not None and cancel.cancelled:
+                    stop.set()
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    cancel.check()
+                if progress is not None:
+                    progress(
+                        "pairs",
+                        {
+                            "shards_done": len(shards) - len(pending),
+                            "shards_total": len(shards),
+                            "postings_kept": len(kept),
+                            "pairs": pairs,
+                        },
+                    )
+                done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                for future in done:
+                    shard = future.result()
+                    results[futures[future]] = shard
+                    # 落盘时分片交回 (分段路径, 条目数) 列表，否则交回键与各长度计数列
+                    if isinstance(shard, list):
+                        pairs += sum(count for _, count in shard)
+                    elif shard is not None:
+                        pairs += len(shard[0])
+        except BaseException:
+            stop.set()
+            if spill_dir:
+                shutil.rmtree(spill_dir, ignore_errors=True)
+            raise
+
+    if spill_dir:
+        if any(shard is None for shard in results):
+            shutil.rmtree(spill_dir, ignore_errors=True)
+            raise AnalysisCancelled("分析已取消")
+        runs = [run for shard in results for run in shard]
+        return SpilledPairStats(lengths, spill_dir, runs, len(kept))
+
+    keys = array("Q")
+    len_columns = [array("I") for _ in lengths]
+    for shard in results:
+        if shard is None:
+            raise AnalysisCancelled("分析已取消")
+        keys.extend(shard[0])
+        for col, part in zip(len_columns, shard[1]):
+            col.extend(part)
+    return PairStats(lengths=list(lengths), keys=keys, len_columns=len_columns, postings_kept=len(kept))
+
+
+def link_pairs(
+    total: int,
+    pair_stats: PairStats | SpilledPairStats,
+    per_file_cleaned: list[str],
+    lengths: list[int],
+    min_pair_matches: int,
+    progress: ProgressCallback | None = None,
+    cancel: CancelToken | None = None,
+) -> tuple[UnionFind, int]:
+    uf = UnionFind(total)
+    title_lens = bytes(min(len(text), SHORT_TITLE_LEN + 1) for text in per_file_cleaned)
+    linked = 0
+    deferred = array("Q")
+    done = 0
+    # 落盘的统计在此边归并边判定，pairs_total 为归并前的上界
+    pairs_total = len(pair_stats)
+    for keys, columns in pair_stats.iter_batches(LINK_BATCH_SIZE):
+        if cancel is not None:
+            cancel.check()
+        if progress is not None:
+            progress("linking", {"pairs_done": done, "pairs_total": pairs_total})
+        strong, accept = evaluate_link_rule(keys, columns, lengths, title_lens, min_pair_matches)
+        linked += accept.count(1)
+        # 命中长片段的强关联先合并，让分量尽早成形
+        uf.union_keys(compress(keys, strong))
+        deferred.extend(compress(keys, (to_mask(accept) ^ to_mask(strong)).to_bytes(len(keys), "little")))
+        done += len(keys)
+    # 其余关联多数两端已在强关联形成的同一分量内，合并时直接跳过
+    uf.union_keys(deferred)
+    return uf, linked
+
+
+def group_id(paths: Iterable[str]) -> str:
+    # 分组 ID 由成员路径决定：成员不变时重新分析得到同一 ID；删除文件后剩余分组沿用原 ID
+    h = hashlib.blake2b(digest_size=8)
+    for path in sorted(paths):
+        h.update(path.encode("utf-8", "surrogatepass") + b"\0")
+    return h.hexdigest()
+
+
+def build_group(members: list[FileMeta]) -> dict[str, Any]:
+    file_entries = sorted(
+        members,
+        key=lambda x: (-x.size_bytes, x.name.lower()),
+    )
+    latest_size = max((f.size_bytes for f in file_entries), default=0)
+    representative = file_entries[0].stem
+
+    group: dict[str, Any] = {
+        "id": group_id(f.path for f in file_entries),
+        "size": len(file_entries),
+        "representative": representative,
+        "latest_size_bytes": latest_size,
+        "latest_size_text": fmt_size(latest_size),
+        "old_file_count": sum(1 for f in file_entries if f.size_bytes < latest_size),
+        "files": [
+            {
+                "name": f.name,
+                "path": f.path,
+                "modified": fmt_time(f.modified_ts),
+                "size_bytes": f.size_bytes,
+                "size_text": fmt_size(f.size_bytes),
+                "is_latest_by_size": f.size_bytes >= latest_size,
+                "root": f.root,
+            }
+            for f in file_entries
+        ],
+    }
+    return group
+
+
+def group_evidence(group: dict[str, Any], params: Mapping[str, Any], max_pairs: int = EVIDENCE_MAX_PAIRS) -> dict[str, Any]:
+    # 依据文件名按当次分析参数重新切片，只在查看或导出某个分组时才计算
+    lengths = list(params["lengths"])
+    strip = get_stopword_matcher(tuple(params["stopwords"])).strip
+    files = group["files"]
+    member_tokens = [
+        extract_ngrams(strip(normalize_title(os.path.splitext(f["name"])[0])), lengths) for f in files
+    ]
+
+    local_counter: Counter[str] = Counter()
+    for toks in member_tokens:
+        local_counter.update(toks)
+
+    shared_candidates = [
+        token
+        for token, c in local_counter.items()
+        if c >= 2 and len(token) in lengths
+    ]
+    shared_candidates.sort(key=lambda t: (-len(t), -local_counter[t], t))
+
+    length_stats = {n: 0 for n in lengths}
+    for token in shared_candidates:
+        length_stats[len(token)] += 1
+
+    evidence: dict[str, Any] = {
+        "shared_snippets": shared_candidates[:EVIDENCE_SNIPPETS],
+        "length_stats": {str(n): c for n, c in length_stats.items()},
+        "length_stats_text": " / ".join(f"{n}字:{c}" for n, c in length_stats.items()),
+    }
+    if max_pairs <= 0:
+        return evidence
+
+    # 组内文件已按体积降序，截断时优先保留较大的文件
+    limit = min(len(files), EVIDENCE_MAX_PAIR_FILES)
+    holders: dict[str, list[int]] = defaultdict(list)
+    for i in range(limit):
+        for token in member_tokens[i]:
+            if local_counter[token] >= 2:
+                holders[token].append(i)
+    pair_tokens: dict[tuple[int, int], list[str]] = defaultdict(list)
+    for token, docs in holders.items():
+        for x in range(len(docs)):
+            for y in range(x + 1, len(docs)):
+                pair_tokens[(docs[x], docs[y])].append(token)
+
+    ranked = sorted(
+        pair_tokens.items(),
+        key=lambda item: (-max(len(t) for t in item[1]), -len(item[1]), item[0]),
+    )
+    pairs = []
+    for (a, b), tokens in ranked[:max_pairs]:
+        tokens.sort(key=lambda t: (-len(t), t))
+        pairs.append(
+            {
+                "a": files[a]["name"],
+                "b": files[b]["name"],
+                "a_path": files[a]["path"],
+                "b_path": files[b]["path"],
+                "shared_count": len(tokens),
+                "length_counts": {str(n): c for n, c in sorted(Counter(len(t) for t in tokens).items())},
+                "tokens": tokens[:EVIDENCE_PAIR_TOKENS],
+            }
+        )
+    evidence["pairs"] = pairs
+    evidence["pair_count"] = len(pair_tokens)
+    evidence["pairs_truncated"] = limit < len(files)
+    return evidence
+
+
+def group_components(files: list[FileMeta], uf: UnionFind) -> list[list[int]]:
+    comp: dict[int, list[int]] = defaultdict(list)
+    for idx in range(len(files)):
+        root = uf.find(idx)
+        comp[root].append(idx)
+
+    groups_idx = [g for g in comp.values() if len(g) >= 2]
+    groups_idx.sort(key=lambda g: (-len(g), -max(files[i].modified_ts for i in g)))
+    return groups_idx
+
+
+def iter_groups(
+    files: list[FileMeta],
+    groups_idx: list[list[int]],
+    content_hashes: Mapping[str, str] | None = None,
+    near_duplicates: set[str] | None = None,
+) -> Iterator[dict[str, Any]]:
+    for g in groups_idx:
+        group = build_group([files[i] for i in g])
+        if content_hashes is not None:
+            # 仅在组内有相同内容的副本时标记
+            digests = Counter(content_hashes[e["path"]] for e in group["files"] if e["path"] in content_hashes)
+            for entry in group["files"]:
+                digest = content_hashes.get(entry["path"], "")
+                entry["content_hash"] = digest if digests.get(digest, 0) > 1 else ""
+            group["content_duplicate_count"] = sum(1 for entry in group["files"] if entry["content_hash"])
+        if near_duplicates is not None:
+            for entry in group["files"]:
+                entry["text_near_duplicate"] = entry["path"] in near_duplicates
+            group["text_near_duplicate_count"] = sum(1 for entry in group["files"] if entry["text_near_duplicate"])
+        yield group
+
+
+def build_groups(
+    files: list[FileMeta],
+    uf: UnionFind,
+    content_hashes: Mapping[str, str] | None = None,
+    near_duplicates: set[str] | None = None,
+) -> list[dict[str, Any]]:
+    return list(iter_groups(files, group_components(files, uf), content_hashes, near_duplicates))
+
+
 def analyze_folder(
-    folder_path: str,
+    folder_path: str | list[str],
     extensions_raw: str,
     stopwords_raw: str,
     lengths: list[int],
     min_pair_matches: int,
     max_df_abs: int,
     max_df_ratio: float,
+    scan_cache: ScanCache | None = None,
+    analysis_cache: AnalysisCache | None = None,
+    scan_options: ScanOptions | None = None,
+    progress: ProgressCallback | None = None,
+    cancel: CancelToken | None = None,
+    engine_options: EngineOptions | None = None,
+    content_dedup: bool = False,
+    text_simhash_distance: int | None = None,
+    text_workers: int = 1,
+    lazy_groups: bool = False,
 ) -> dict[str, Any]:
+    # lazy_groups 时 groups 为迭代器，逐组生成，供流式导出一次性消费
     if not lengths:
         raise ValueError("必须至少选择一种片段长度")
 
@@ -1361,128 +3649,166 @@ def analyze_folder(
     max_df_abs = max(2, int(max_df_abs))
     max_df_ratio = min(max(float(max_df_ratio), 0.0), 1.0)
 
-    folder = Path(folder_path).resolve()
+    # 可同时分析多个目录，合并为一个索引，跨目录的同名文件同样归入一组
+    roots = resolve_roots(folder_path)
+    if not roots:
+        raise ValueError("扫描目录不能为空")
+    scan_options = scan_options or ScanOptions()
+    if scan_options.recursive:
+        for root in roots:
+            parent = owning_root(root, roots)
+            if parent is not None:
+                raise ValueError(f"递归扫描时目录不能相互包含：{root} 位于 {parent} 内")
     extensions = split_extensions(extensions_raw)
     stopwords = parse_stopwords(stopwords_raw)
-    files = collect_files(folder, extensions)
+    if analysis_cache is None:
+        analysis_cache = AnalysisCache(max_entries=1)
+
+    # 各阶段依次执行，某阶段耗时即上一阶段结束到本阶段结束（done 事件）之间的时间
+    phase_seconds: dict[str, float] = {}
+    started = time.perf_counter()
+    phase_mark = started
+
+    def emit(phase: str, counters: dict[str, Any]) -> None:
+        nonlocal phase_mark
+        if counters.get("done"):
+            now = time.perf_counter()
+            phase_seconds[phase] = phase_seconds.get(phase, 0.0) + now - phase_mark
+            phase_mark = now
+        if cancel is not None:
+            cancel.check()
+        if progress is not None:
+            progress(phase, counters)
+
+    emit("scanning", {"files": 0})
+
+    root_key = tuple(str(root) for root in roots)
+    # 原地覆盖文件不会改变目录 mtime，子目录变化也不会反映到根目录，
+    # 因此每次重新列目录并读取文件属性（靠扫描缓存提速），后续阶段按扫描结果指纹复用
+    listed = collect_roots(roots, extensions, scan_cache, scan_options, progress, cancel)
+    scan_key: tuple[tuple[str, ...], tuple[str, ...], ScanOptions, int] = (
+        root_key,
+        tuple(sorted(extensions)),
+        scan_options,
+        files_fingerprint(listed),
+    )
+    files = analysis_cache.scan.get_or_compute(scan_key, lambda: listed)
     total = len(files)
+    emit("scanning", {"files": total, "done": True})
     if total == 0:
         raise ValueError("未找到符合后缀条件的文件")
 
-    per_file_cleaned: list[str] = [
-        remove_stopwords(f.normalized, stopwords).replace(" ", "") for f in files
-    ]
-    per_file_tokens: list[set[str]] = [build_file_ngrams(f.normalized, lengths, stopwords) for f in files]
-
-    token_docs: dict[str, list[int]] = defaultdict(list)
-    for file_idx, tokens in enumerate(per_file_tokens):
-        for token in tokens:
-            token_docs[token].append(file_idx)
+    ngram_key = (scan_key, tuple(stopwords), tuple(lengths))
+    ngram_index: NgramIndex = analysis_cache.ngrams.get_or_compute(
+        ngram_key,
+        lambda: build_ngram_index(files, lengths, stopwords, progress, cancel),
+    )
+    emit("ngrams", {"files_done": total, "files_total": total, "done": True})
+
+    engine_options = engine_options or EngineOptions()
+    token_stats: dict[str, int | None] = {"total_tokens": None, "tokens_dropped": None, "largest_posting": None}
+    if engine_options.engine == "minhash":
+        # 以 MinHash 签名分桶代替倒排表两两展开，候选对数量随文件数近线性增长
+        emit("postings", {"signatures_done": 0, "signatures_total": total})
+        signatures: MinHashSignatures = analysis_cache.signatures.get_or_compute(
+            (ngram_key, engine_options.num_perm),
+            lambda: build_minhash_signatures(ngram_index.tokens, engine_options.num_perm, progress, cancel),
+        )
+        emit("postings", {"signatures_done": total, "signatures_total": total, "done": True})
 
-    if max_df_ratio > 0:
-        ratio_limit = max(3, math.ceil(total * max_df_ratio))
-        max_allowed = min(max_df_abs, ratio_limit)
+        pair_stats: PairStats = analysis_cache.pair_stats.get_or_compute(
+            (ngram_key, engine_options),
+            lambda: lsh_pair_stats(ngram_index.tokens, signatures, engine_options, lengths, progress, cancel),
+        )
+        emit(
+            "pairs",
+            {
+                "bands_done": engine_options.bands,
+                "bands_total": engine_options.bands,
+                "pairs": len(pair_stats),
+                "done": True,
+            },
+        )
     else:
-        max_allowed = max_df_abs
-    filtered_token_docs: dict[str, list[int]] = {}
-    for token, idxs in token_docs.items():
-        if len(idxs) < 2:
-            continue
-        if len(idxs) > max_allowed:
-            continue
-        filtered_token_docs[token] = idxs
-
-    pair_counts: dict[tuple[int, int], int] = defaultdict(int)
-    pair_len_counts: dict[tuple[int, int], Counter[int]] = defaultdict(Counter)
-    pair_tokens: dict[tuple[int, int], set[str]] = defaultdict(set)
-
-    for token, idxs in filtered_token_docs.items():
-        if len(idxs) < 2:
-            continue
-        for a, b in combinations(sorted(idxs), 2):
-            key = (a, b)
-            pair_counts[key] += 1
-            pair_len_counts[key][len(token)] += 1
-            if len(pair_tokens[key]) < 12:
-                pair_tokens[key].add(token)
-
-    uf = UnionFind(total)
-    for a, b in pair_counts:
-        len_counter = pair_len_counts[(a, b)]
-        short_title_pair = min(len(per_file_cleaned[a]), len(per_file_cleaned[b])) <= 12
-        min_title_len = min(len(per_file_cleaned[a]), len(per_file_cleaned[b]))
-        if should_link_pair(
-            len_counter=len_counter,
-            lengths=lengths,
-            min_pair_matches=min_pair_matches,
-            short_title_pair=short_title_pair,
-            min_title_len=min_title_len,
-        ):
-            uf.union(a, b)
-
-    comp: dict[int, list[int]] = defaultdict(list)
-    for idx in range(total):
-        root = uf.find(idx)
-        comp[root].append(idx)
-
-    groups_idx = [g for g in comp.values() if len(g) >= 2]
-    groups_idx.sort(key=lambda g: (-len(g), -max(files[i].modified_ts for i in g)))
-
-    groups: list[dict[str, Any]] = []
-    for g in groups_idx:
-        file_entries = sorted(
-            (files[i] for i in g),
-            key=lambda x: (-x.size_bytes, x.name.lower()),
+        emit("postings", {})
+        postings: Postings = analysis_cache.postings.get_or_compute(
+            ngram_key,
+            lambda: build_postings(ngram_index.tokens),
         )
-        latest_size = max((f.size_bytes for f in file_entries), default=0)
-
-        local_counter: Counter[str] = Counter()
-        for i in g:
-            local_counter.update(per_file_tokens[i])
-
-        shared_candidates = [
-            token
-            for token, c in local_counter.items()
-            if c >= 2 and len(token) in lengths
-        ]
-        shared_candidates.sort(key=lambda t: (-len(t), -local_counter[t], t))
-        top_shared = shared_candidates[:8]
-
-        length_stats = []
-        for n in lengths:
-            count_n = sum(1 for t in shared_candidates if len(t) == n)
-            length_stats.append(f"{n}字:{count_n}")
+        emit("postings", {"tokens": len(postings.tokens), "done": True})
 
-        representative = file_entries[0].stem
-
-        groups.append(
+        max_allowed = compute_max_allowed(total, max_df_abs, max_df_ratio)
+        token_stats = {
+            "total_tokens": len(postings.tokens),
+            "tokens_dropped": sum(1 for docs in postings.docs if len(docs) > max_allowed),
+            "largest_posting": max((len(docs) for docs in postings.docs), default=0),
+        }
+        max_title_len = max(len(f.normalized) for f in files)
+        pair_stats = analysis_cache.pair_stats.get_or_compute(
+            (ngram_key, max_allowed),
+            lambda: count_pair_stats_sharded(
+                postings,
+                max_allowed,
+                lengths,
+                max_title_len,
+                engine_options.workers,
+                progress,
+                cancel,
+                engine_options.pair_memory_mb * 1024 * 1024,
+            ),
+        )
+        emit(
+            "pairs",
             {
-                "size": len(file_entries),
-                "representative": representative,
-                "shared_snippets": top_shared,
-                "length_stats_text": " / ".join(length_stats),
-                "latest_size_bytes": latest_size,
-                "latest_size_text": fmt_size(latest_size),
-                "old_file_count": sum(1 for f in file_entries if f.size_bytes < latest_size),
-                "files": [
-                    {
-                        "name": f.name,
-                        "path": f.path,
-                        "modified": fmt_time(f.modified_ts),
-                        "size_bytes": f.size_bytes,
-                        "size_text": fmt_size(f.size_bytes),
-                        "is_latest_by_size": f.size_bytes >= latest_size,
-                    }
-                    for f in file_entries
-                ],
-            }
+                "tokens_done": len(postings.tokens),
+                "tokens_total": len(postings.tokens),
+                "postings_kept": pair_stats.postings_kept,
+                "pairs": len(pair_stats),
+                "spilled_runs": len(pair_stats.runs) if isinstance(pair_stats, SpilledPairStats) else 0,
+                "done": True,
+            },
         )
 
-    duplicate_file_count = sum(len(g["files"]) for g in groups)
+    uf, linked_pairs = link_pairs(total, pair_stats, ngram_index.cleaned, lengths, min_pair_matches, progress, cancel)
+    emit("linking", {"pairs_done": len(pair_stats), "pairs_total": len(pair_stats), "done": True})
+
+    content_hashes: dict[str, str] | None = None
+    if content_dedup:
+        # 内容完全相同的文件不论名字是否相近都并入同组
+        emit("content", {})
+        content_hashes = find_content_duplicates(files, scan_cache, scan_options.workers, progress, cancel)
+        index_of = {f.path: i for i, f in enumerate(files)}
+        first_of_digest: dict[str, int] = {}
+        for path, digest in content_hashes.items():
+            uf.union(first_of_digest.setdefault(digest, index_of[path]), index_of[path])
+        emit("content", {"files": len(content_hashes), "done": True})
+
+    near_duplicates: set[str] | None = None
+    if text_simhash_distance is not None:
+        # 正文近似重复（去广告头、修订章节后的重传）同样并入同组
+        emit("content", {"stage": "simhash", "files_done": 0, "files_total": 0})
+        index_of = {f.path: i for i, f in enumerate(files)}
+        near_duplicates = set()
+        for path_a, path_b in find_text_near_duplicates(
+            files, text_simhash_distance, scan_cache, text_workers, progress, cancel
+        ):
+            uf.union(index_of[path_a], index_of[path_b])
+            near_duplicates.update((path_a, path_b))
+        emit("content", {"near_files": len(near_duplicates), "done": True})
+
+    emit("grouping", {})
+    groups_idx = group_components(files, uf)
+    groups: Iterable[dict[str, Any]] = iter_groups(files, groups_idx, content_hashes, near_duplicates)
+    if not lazy_groups:
+        groups = list(groups)
+    emit("grouping", {"groups": len(groups_idx), "done": True})
+
+    duplicate_file_count = sum(len(g) for g in groups_idx)
     return {
-        "folder": str(folder),
+        "folder": join_roots(roots),
+        "roots": list(root_key),
         "total_files": total,
-        "group_count": len(groups),
+        "group_count": len(groups_idx),
         "duplicate_file_count": duplicate_file_count,
         "params": {
             "extensions": sorted(extensions),
@@ -1491,122 +3817,1427 @@ def analyze_folder(
             "min_pair_matches": min_pair_matches,
             "max_df_abs": max_df_abs,
             "max_df_ratio": max_df_ratio,
+            "recursive": scan_options.recursive,
+            "max_depth": scan_options.max_depth,
+            "include": list(scan_options.include),
+            "exclude": list(scan_options.exclude),
+            "engine": engine_options.engine,
+            "content_dedup": content_dedup,
+            "text_simhash_distance": text_simhash_distance,
+            **(
+                {
+                    "minhash_bands": engine_options.bands,
+                    "minhash_rows": engine_options.rows,
+                    "lsh_max_bucket": engine_options.max_bucket,
+                }
+                if engine_options.engine == "minhash"
+                else {}
+            ),
+        },
+        "stats": {
+            "phase_seconds": {phase: round(seconds, 4) for phase, seconds in phase_seconds.items()},
+            "total_seconds": round(time.perf_counter() - started, 4),
+            **token_stats,
+            "candidate_pairs": len(pair_stats),
+            "linked_pairs": linked_pairs,
+            "spilled_runs": len(pair_stats.runs) if isinstance(pair_stats, SpilledPairStats) else 0,
         },
         "groups": groups,
     }
 
 
+def ordered_groups(data: Mapping[str, Any], order: list[int] | None = None) -> Iterable[dict[str, Any]]:
+    groups = data.get("groups", [])
+    if order is None:
+        return groups
+    return (groups[i] for i in order)
+
+
+def iter_export_csv(data: Mapping[str, Any], order: list[int] | None = None) -> Iterator[str]:
+    # 攒够一块再交出，HTTP 分块和文件写入都不会碎成每行一次
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(EXPORT_CSV_HEADER)
+    for gid, group in enumerate(ordered_groups(data, order), start=1):
+        snippets = "|".join(group_evidence(group, data["params"], max_pairs=0)["shared_snippets"])
+        for file in group.get("files", []):
+            writer.writerow(
+                [
+                    gid,
+                    "yes" if file.get("is_latest_by_size") else "no",
+                    file.get("name", ""),
+                    file.get("modified", ""),
+                    file.get("size_text", ""),
+                    file.get("path", ""),
+                    snippets,
+                    file.get("root", ""),
+                ]
+            )
+        if buf.tell() >= EXPORT_CHUNK_CHARS:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+def iter_export_ndjson(
+    data: Mapping[str, Any], order: list[int] | None = None, evidence: bool = False
+) -> Iterator[str]:
+    # 首行为结果摘要（不含分组），之后每行一个分组
+    lines = [json.dumps({"type": "result", **{k: v for k, v in data.items() if k != "groups"}}, ensure_ascii=False)]
+    size = len(lines[0])
+    for gid, group in enumerate(ordered_groups(data, order), start=1):
+        record = {"type": "group", "group_id": gid, **group}
+        if evidence:
+            record.update(group_evidence(group, data["params"], max_pairs=0))
+        line = json.dumps(record, ensure_ascii=False)
+        lines.append(line)
+        size += len(line)
+        if size >= EXPORT_CHUNK_CHARS:
+            lines.append("")
+            yield "\n".join(lines)
+            lines = []
+            size = 0
+    lines.append("")
+    yield "\n".join(lines)
+
+
+def write_result_json(result: Mapping[str, Any], f: Any, evidence: bool = False) -> None:
+    # 输出与 json.dumps(result, indent=2) 相同，但分组逐个序列化，内存占用不随结果增长；
+    # evidence 时每个分组附带共享片段与长度统计
+    f.write("{")
+    sep = "\n"
+    for key, value in result.items():
+        f.write(f"{sep}  {json.dumps(key, ensure_ascii=False)}: ")
+        sep = ",\n"
+        if key != "groups":
+            f.write(json.dumps(value, ensure_ascii=False, indent=2).replace("\n", "\n  "))
+            continue
+        f.write("[")
+        item_sep = "\n    "
+        for group in value:
+            if evidence:
+                group = {**group, **group_evidence(group, result["params"], max_pairs=0)}
+            f.write(item_sep + json.dumps(group, ensure_ascii=False, indent=2).replace("\n", "\n    "))
+            item_sep = ",\n    "
+        f.write("]" if item_sep == "\n    " else "\n  ]")
+    f.write("\n}" if sep == ",\n" else "}")
+
+
+def resolve_export_format(fmt: str, output_path: Path) -> str:
+    if fmt != "auto":
+        return fmt
+    return "ndjson" if output_path.suffix.lower() in (".ndjson", ".jsonl") else "json"
+
+
+def write_result_file(result: Mapping[str, Any], output_path: Path, fmt: str) -> None:
+    # 命令行输出供离线查看，分组证据随结果一并写出
+    with output_path.open("w", encoding="utf-8") as f:
+        if fmt == "ndjson":
+            f.writelines(iter_export_ndjson(result, evidence=True))
+        else:
+            write_result_json(result, f, evidence=True)
+
+
 def export_csv(data: dict[str, Any], output_path: Path) -> None:
     with output_path.open("w", encoding="utf-8-sig", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow(
-            ["group_id", "is_latest_by_size", "file_name", "modified", "size", "path", "shared_snippets"]
-        )
-        for gid, group in enumerate(data.get("groups", []), start=1):
-            snippets = "|".join(group.get("shared_snippets", []))
-            for file in group.get("files", []):
-                writer.writerow(
-                    [
-                        gid,
-                        "yes" if file.get("is_latest_by_size") else "no",
-                        file.get("name", ""),
-                        file.get("modified", ""),
-                        file.get("size_text", ""),
-                        file.get("path", ""),
-                        snippets,
-                    ]
-                )
+        f.writelines(iter_export_csv(data))
+
+
+def check_deletable(raw: str, roots: list[Path]) -> tuple[Path, Path | None, str | None]:
+    # 返回解析后的路径与其所属扫描目录；文件必须位于某个扫描目录之内
+    p = Path(str(raw)).resolve()
+    # 常见情况只需一次 stat，区分失败原因时才再查一次
+    if not p.is_file():
+        return p, None, "不是文件" if p.exists() else "文件不存在"
+    root = owning_root(p, roots)
+    if root is None:
+        return p, None, "路径超出扫描目录"
+    return p, root, None
 
 
-def delete_files(paths: list[str], root_folder: Path) -> dict[str, Any]:
-    deleted: list[str] = []
+def delete_one(raw: str, roots: list[Path]) -> tuple[str, str | None]:
+    p, _, reason = check_deletable(raw, roots)
+    if reason is not None:
+        return str(p), reason
+    try:
+        p.unlink()
+    except Exception as exc:  # noqa: BLE001
+        return str(p), str(exc)
+    return str(p), None
+
+
+def quarantine_one(
+    raw: str, roots: list[Path], run_dirs: Mapping[Path, Path], made_dirs: set[Path]
+) -> tuple[str, str | None]:
+    p, root, reason = check_deletable(raw, roots)
+    if reason is not None or root is None:
+        return str(p), reason
+    # 每个扫描目录有自己的回收区，与文件同卷；回收区内保留相对扫描目录的路径，同一批次内不会重名
+    target = run_dirs[root] / "files" / p.relative_to(root)
+    try:
+        # 同一目录下的文件只建一次目录；并发时偶尔重复创建也无妨
+        if target.parent not in made_dirs:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            made_dirs.add(target.parent)
+        os.rename(p, target)
+    except OSError as exc:
+        if exc.errno == errno.EXDEV:
+            return str(p), "文件与回收区不在同一卷，无法隔离"
+        return str(p), str(exc)
+    return str(p), None
+
+
+def run_file_ops(
+    items: list[Any],
+    op: Callable[[Any], tuple[str, str | None]],
+    workers: int,
+    phase: str,
+    progress: ProgressCallback | None = None,
+    cancel: CancelToken | None = None,
+) -> tuple[list[str], list[dict[str, str]], bool]:
+    done: list[str] = []
     failed: list[dict[str, str]] = []
+    # 网络盘上每次 stat/unlink/rename 都是一次往返，分批交给线程池；
+    # 取消只在批次之间生效，已完成的操作照常计入结果
+    pool = ThreadPoolExecutor(max_workers=workers) if workers > 1 and len(items) > 1 else None
+    cancelled = False
+    try:
+        for start in range(0, len(items), DELETE_BATCH_SIZE):
+            if cancel is not None and cancel.cancelled:
+                cancelled = True
+                break
+            batch = items[start : start + DELETE_BATCH_SIZE]
+            outcomes = pool.map(op, batch) if pool is not None else map(op, batch)
+            for path, reason in outcomes:
+                if reason is None:
+                    done.append(path)
+                else:
+                    failed.append({"path": path, "reason": reason})
+            if progress is not None:
+                progress(
+                    phase,
+                    {
+                        "files_done": start + len(batch),
+                        "files_total": len(items),
+                        "done": len(done),
+                        "failed": len(failed),
+                    },
+                )
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return done, failed, cancelled
 
-    root = root_folder.resolve()
-    for raw in paths:
-        p = Path(str(raw)).resolve()
-        if not p.exists():
-            failed.append({"path": str(p), "reason": "文件不存在"})
-            continue
-        if not p.is_file():
-            failed.append({"path": str(p), "reason": "不是文件"})
-            continue
-        if root not in p.parents and p != root:
-            failed.append({"path": str(p), "reason": "路径超出扫描目录"})
-            continue
-        try:
-            p.unlink()
-            deleted.append(str(p))
-        except Exception as exc:  # noqa: BLE001
-            failed.append({"path": str(p), "reason": str(exc)})
 
-    return {
+def new_quarantine_id() -> str:
+    return f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+
+def write_quarantine_manifest(run_dir: Path, root: Path, entries: list[dict[str, str]], created: float) -> None:
+    manifest = {"id": run_dir.name, "root": str(root), "created": created, "entries": entries}
+    tmp = run_dir / f"{QUARANTINE_MANIFEST}.tmp"
+    tmp.write_text(json.dumps(manifest, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, run_dir / QUARANTINE_MANIFEST)
+
+
+def quarantine_run_dir(root: Path, run_id: str) -> Path:
+    if not re.fullmatch(r"[0-9A-Za-z-]+", run_id):
+        raise ValueError("无效的回收批次 ID")
+    return root.resolve() / QUARANTINE_DIRNAME / run_id
+
+
+def delete_files(
+    paths: list[str],
+    roots: Path | list[Path],
+    workers: int = 1,
+    progress: ProgressCallback | None = None,
+    cancel: CancelToken | None = None,
+    quarantine: str | None = None,
+) -> dict[str, Any]:
+    # roots 为本次分析的全部扫描目录，每个文件只能在其所属目录内删除或隔离；
+    # quarantine 为回收批次 ID，各目录下的回收区共用同一 ID
+    roots = [r.resolve() for r in ([roots] if isinstance(roots, Path) else roots)]
+    if quarantine is None:
+        deleted, failed, cancelled = run_file_ops(
+            paths, lambda raw: delete_one(raw, roots), workers, "deleting", progress, cancel
+        )
+        return {
+            "deleted_count": len(deleted),
+            "deleted": deleted,
+            "failed_count": len(failed),
+            "failed": failed,
+            "cancelled": cancelled,
+        }
+
+    created = time.time()
+    run_dirs = {root: quarantine_run_dir(root, quarantine) for root in roots}
+    made_dirs: set[Path] = set()
+    deleted, failed, cancelled = run_file_ops(
+        paths, lambda raw: quarantine_one(raw, roots, run_dirs, made_dirs), workers, "deleting", progress, cancel
+    )
+    result: dict[str, Any] = {
         "deleted_count": len(deleted),
         "deleted": deleted,
         "failed_count": len(failed),
         "failed": failed,
+        "cancelled": cancelled,
     }
+    if deleted:
+        by_root: dict[Path, list[dict[str, str]]] = defaultdict(list)
+        for path in deleted:
+            root = owning_root(Path(path), roots)
+            if root is None:
+                # 隔离成功的文件都经过 check_deletable，必然位于某个扫描目录内
+                continue
+            stored = run_dirs[root] / "files" / Path(path).relative_to(root)
+            by_root[root].append({"original": path, "stored": str(stored)})
+        for root, entries in by_root.items():
+            write_quarantine_manifest(run_dirs[root], root, entries, created)
+        result["quarantine"] = {"run_id": quarantine, "dirs": [str(run_dirs[root]) for root in by_root]}
+    return result
+
+
+def restore_quarantine(run_dir: Path, workers: int = 1) -> dict[str, Any]:
+    try:
+        manifest = json.loads((run_dir / QUARANTINE_MANIFEST).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        raise ValueError("回收批次不存在或已清理") from None
+    entries: list[dict[str, str]] = manifest["entries"]
+
+    def restore_one(entry: dict[str, str]) -> tuple[str, str | None]:
+        original = Path(entry["original"])
+        if os.path.lexists(original):
+            return str(original), "原位置已有同名文件"
+        try:
+            original.parent.mkdir(parents=True, exist_ok=True)
+            os.rename(entry["stored"], original)
+        except OSError as exc:
+            return str(original), str(exc)
+        return str(original), None
+
+    restored, failed, _ = run_file_ops(entries, restore_one, workers, "restoring")
+    done = set(restored)
+    remaining = [entry for entry in entries if entry["original"] not in done]
+    # 全部还原后删除批次目录；有冲突的文件留在回收区，清单只保留这些
+    if remaining:
+        write_quarantine_manifest(run_dir, Path(manifest["root"]), remaining, manifest["created"])
+    else:
+        shutil.rmtree(run_dir, ignore_errors=True)
+        if not any(run_dir.parent.iterdir()):
+            run_dir.parent.rmdir()
+    return {
+        "run_id": run_dir.name,
+        "restored_count": len(restored),
+        "restored": restored,
+        "failed_count": len(failed),
+        "failed": failed,
+    }
+
+
+def list_quarantine_runs(root: Path) -> list[dict[str, Any]]:
+    runs: list[dict[str, Any]] = []
+    base = root.resolve() / QUARANTINE_DIRNAME
+    if not base.is_dir():
+        return runs
+    for run_dir in sorted(base.iterdir(), reverse=True):
+        try:
+            manifest = json.loads((run_dir / QUARANTINE_MANIFEST).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        runs.append(
+            {
+                "run_id": run_dir.name,
+                "created": fmt_time(manifest["created"]),
+                "file_count": len(manifest["entries"]),
+                "dir": str(run_dir),
+            }
+        )
+    return runs
+
+
+def purge_quarantine(root: Path, older_than_seconds: float | None = None, run_id: str | None = None) -> list[str]:
+    # 永久删除回收区中的批次：指定 run_id 时只删该批次，否则删除早于保留期限的批次
+    base = root.resolve() / QUARANTINE_DIRNAME
+    if run_id:
+        targets = [quarantine_run_dir(root, run_id)]
+    elif base.is_dir():
+        targets = [d for d in base.iterdir() if d.is_dir()]
+    else:
+        targets = []
+    now = time.time()
+    purged: list[str] = []
+    for run_dir in targets:
+        if not run_id and older_than_seconds is not None:
+            try:
+                created = json.loads((run_dir / QUARANTINE_MANIFEST).read_text(encoding="utf-8"))["created"]
+            except (OSError, ValueError, KeyError):
+                created = run_dir.stat().st_mtime
+            if now - created < older_than_seconds:
+                continue
+        if run_dir.is_dir():
+            shutil.rmtree(run_dir, ignore_errors=True)
+            purged.append(run_dir.name)
+    if base.is_dir() and not any(base.iterdir()):
+        base.rmdir()
+    return purged
+
+
+def plan_bulk_deletion(
+    groups: list[dict[str, Any]], policy: str, prefer_extensions: list[str]
+) -> tuple[list[str], int]:
+    if policy not in KEEP_POLICIES:
+        raise ValueError(f"未知的保留策略：{policy}")
+    if policy == "extension" and not prefer_extensions:
+        raise ValueError("按扩展名保留时需要指定首选扩展名")
+    rank = {ext: i for i, ext in enumerate(prefer_extensions)}
+    paths: list[str] = []
+    affected = 0
+    for group in groups:
+        files = group["files"]
+        # 组内文件已按体积降序，同分时保留靠前（更大）的那个
+        if policy == "largest":
+            keep = {f["path"] for f in files if f["is_latest_by_size"]}
+        elif policy == "newest":
+            keep = {max(files, key=lambda f: f["modified"])["path"]}
+        else:
+            keep = {min(files, key=lambda f: rank.get(os.path.splitext(f["name"])[1].lower(), len(rank)))["path"]}
+        doomed = [f["path"] for f in files if f["path"] not in keep]
+        if doomed:
+            affected += 1
+            paths.extend(doomed)
+    return paths, affected
+
+
+def negotiate_encoding(accept_encoding: str, available: Mapping[str, Any]) -> str | None:
+    weights: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name] = q
+    best: str | None = None
+    best_q = 0.0
+    for name in available:
+        q = weights.get(name, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def prune_group(group: dict[str, Any], deleted: set[str]) -> dict[str, Any] | None:
+    # 剩余不足两个文件的分组整组移除，返回 None
+    files = [f for f in group["files"] if f["path"] not in deleted]
+    if len(files) < 2:
+        return None
+    latest_size = max(f["size_bytes"] for f in files)
+    files = [{**f, "is_latest_by_size": f["size_bytes"] >= latest_size} for f in files]
+    content_counts = Counter(f.get("content_hash") for f in files if f.get("content_hash"))
+    if content_counts:
+        files = [
+            {**f, "content_hash": f["content_hash"] if content_counts.get(f.get("content_hash"), 0) > 1 else ""}
+            for f in files
+        ]
+    pruned = {
+        **group,
+        # 分组 ID 由成员决定，成员变化后随之更新；文件恢复后回到原 ID
+        "id": group_id(f["path"] for f in files),
+        "size": len(files),
+        "representative": Path(files[0]["name"]).stem,
+        "latest_size_bytes": latest_size,
+        "latest_size_text": fmt_size(latest_size),
+        "old_file_count": sum(1 for f in files if f["size_bytes"] < latest_size),
+        "files": files,
+    }
+    if "content_duplicate_count" in group:
+        pruned["content_duplicate_count"] = sum(1 for f in files if f.get("content_hash"))
+    if "text_near_duplicate_count" in group:
+        pruned["text_near_duplicate_count"] = sum(1 for f in files if f.get("text_near_duplicate"))
+    return pruned
+
+
+def prune_deleted(
+    result: dict[str, Any], deleted_paths: list[str], touched: Iterable[int] | None = None
+) -> tuple[dict[str, Any], dict[int, dict[str, Any] | None]]:
+    # touched 为包含被删文件的分组下标；给出时只重算这些分组，计数按差值更新。
+    # 返回剔除后的结果，以及 {原下标: 新分组或 None（整组移除）}
+    deleted = set(deleted_paths)
+    if not deleted:
+        return result, {}
+    groups = result["groups"]
+    if touched is None:
+        touched = [i for i, g in enumerate(groups) if any(f["path"] in deleted for f in g["files"])]
+    changes = {i: prune_group(groups[i], deleted) for i in touched}
+    removed_files = sum(len(groups[i]["files"]) - (len(g["files"]) if g else 0) for i, g in changes.items())
+    # 只扣除确实在结果中的文件；路径可能重复、不在结果里或根本不在扫描范围内
+    deleted_in_result = sum(1 for i in changes for f in groups[i]["files"] if f["path"] in deleted)
+    if changes:
+        groups = [changes[i] if i in changes else g for i, g in enumerate(groups)]
+        groups = [g for g in groups if g is not None]
+    return {
+        **result,
+        "total_files": max(0, result["total_files"] - deleted_in_result),
+        "group_count": len(groups),
+        "duplicate_file_count": result["duplicate_file_count"] - removed_files,
+        "groups": groups,
+    }, changes
+
+
+GROUP_SORTS: dict[str, Callable[[dict[str, Any]], Any] | None] = {
+    "default": None,
+    "size": lambda g: (-g["size"], g["representative"]),
+    "bytes": lambda g: (-g["latest_size_bytes"], -g["size"]),
+    "old": lambda g: (-g["old_file_count"], -g["size"]),
+    "name": lambda g: g["representative"],
+}
+
+
+def sort_group_order(groups: list[dict[str, Any]], sort: str) -> list[int]:
+    if sort not in GROUP_SORTS:
+        raise ValueError(f"未知的排序方式：{sort}")
+    key = GROUP_SORTS[sort]
+    order = list(range(len(groups)))
+    if key is not None:
+        order.sort(key=lambda i: key(groups[i]))
+    return order
+
+
+def summarize_result(result: dict[str, Any], version: int) -> dict[str, Any]:
+    summary = {k: v for k, v in result.items() if k != "groups"}
+    summary["version"] = version
+    return summary
+
+
+class LiveIndex:
+    # 监听模式的常驻索引：片段倒排表与连通分量随文件增删增量维护，变化只重算受影响的分组。
+    # 仅维护按文件名的 exact 分组；max_allowed 随文件数重算，文件数漂移过大时整体重建更快
+    def __init__(
+        self,
+        lengths: list[int],
+        stopwords: list[str],
+        min_pair_matches: int,
+        max_df_abs: int,
+        max_df_ratio: float,
+        pair_workers: int = 1,
+    ) -> None:
+        self.lengths = lengths
+        self.stopwords = stopwords
+        self.min_pair_matches = min_pair_matches
+        self.max_df_abs = max_df_abs
+        self.max_df_ratio = max_df_ratio
+        self.pair_workers = pair_workers
+        self.strip = get_stopword_matcher(tuple(stopwords)).strip
+        self.rebuild([])
+
+    def rebuild(self, files: list[FileMeta]) -> None:
+        self.files: dict[int, FileMeta] = dict(enumerate(files))
+        self.doc_of = {f.path: i for i, f in enumerate(files)}
+        self.next_doc = len(files)
+        self.base_total = len(files)
+        self.max_allowed = compute_max_allowed(len(files), self.max_df_abs, self.max_df_ratio)
+        ngram_index = build_ngram_index(files, self.lengths, self.stopwords)
+        self.cleaned = dict(enumerate(ngram_index.cleaned))
+        self.tokens = dict(enumerate(ngram_index.tokens))
+        self.postings: dict[str, set[int]] = defaultdict(set)
+        for doc, toks in self.tokens.items():
+            for token in toks:
+                self.postings[token].add(doc)
+
+        self.comp_of: dict[int, int] = {}
+        self.members: dict[int, set[int]] = {}
+        self.groups: dict[int, dict[str, Any]] = {}
+        if files:
+            max_title_len = max(len(f.normalized) for f in files)
+            pair_stats = count_pair_stats_sharded(
+                build_postings(ngram_index.tokens), self.max_allowed, self.lengths, max_title_len, self.pair_workers
+            )
+            uf, _ = link_pairs(len(files), pair_stats, ngram_index.cleaned, self.lengths, self.min_pair_matches)
+            for doc in range(len(files)):
+                root = uf.find(doc)
+                self.comp_of[doc] = root
+                self.members.setdefault(root, set()).add(doc)
+        self.next_comp = len(files)
+        for cid, docs in self.members.items():
+            if len(docs) >= 2:
+                self.groups[cid] = self._build_group(docs)
+
+    def sync(self, files: list[FileMeta]) -> bool:
+        if abs(len(files) - self.base_total) > max(1, self.base_total * WATCH_REBUILD_RATIO):
+            self.rebuild(files)
+            return True
+        current = {f.path: f for f in files}
+        removed = [path for path in self.doc_of if path not in current]
+        added: list[FileMeta] = []
+        touched: set[int] = set()
+        for f in files:
+            doc = self.doc_of.get(f.path)
+            if doc is None:
+                added.append(f)
+                continue
+            old = self.files[doc]
+            if (old.size_bytes, old.modified_ts) != (f.size_bytes, f.modified_ts):
+                # 改名以外的修改只影响展示的大小与时间，不必重新配对
+                self.files[doc] = f
+                touched.add(self.comp_of[doc])
+        # 改名表现为旧路径消失、新路径出现
+        for path in removed:
+            self.remove(path)
+        for f in added:
+            self.add(f)
+        self._update_max_allowed()
+        for cid in touched:
+            if cid in self.groups:
+                self.groups[cid] = self._build_group(self.members[cid])
+        return bool(removed or added or touched)
+
+    def add(self, meta: FileMeta) -> None:
+        doc = self.next_doc
+        self.next_doc += 1
+        text = self.strip(meta.normalized)
+        self.files[doc] = meta
+        self.doc_of[meta.path] = doc
+        self.cleaned[doc] = text.replace(" ", "")
+        self.tokens[doc] = extract_ngrams(text, self.lengths)
+        self.comp_of[doc] = self.next_comp
+        self.members[self.next_comp] = {doc}
+        self.next_comp += 1
+        dirty = {doc}
+        for token in self.tokens[doc]:
+            docs = self.postings[token]
+            docs.add(doc)
+            if len(docs) == self.max_allowed + 1:
+                # 片段刚超过频次上限，原先靠它连上的文件需要重新判定
+                dirty.update(docs)
+        self._relink(dirty)
+
+    def remove(self, path: str) -> None:
+        doc = self.doc_of.pop(path)
+        cid = self.comp_of.pop(doc)
+        members = self.members[cid]
+        members.discard(doc)
+        dirty = set(members)
+        if not members:
+            del self.members[cid]
+            self.groups.pop(cid, None)
+        for token in self.tokens.pop(doc):
+            docs = self.postings[token]
+            docs.discard(doc)
+            if not docs:
+                del self.postings[token]
+            elif len(docs) == self.max_allowed:
+                # 片段回落到频次上限内，重新参与配对
+                dirty.update(docs)
+        del self.files[doc], self.cleaned[doc]
+        self._relink(dirty)
+
+    def _update_max_allowed(self) -> None:
+        # 频次上限随文件数变化；文档频次落在新旧上限之间的片段改变了是否参与配对，
+        # 含这些片段的文件需要重新判定，其余文件对的命中计数不受影响
+        max_allowed = compute_max_allowed(len(self.files), self.max_df_abs, self.max_df_ratio)
+        if max_allowed == self.max_allowed:
+            return
+        low, high = sorted((self.max_allowed, max_allowed))
+        self.max_allowed = max_allowed
+        dirty: set[int] = set()
+        for docs in self.postings.values():
+            if low < len(docs) <= high:
+                dirty.update(docs)
+        self._relink(dirty)
+
+    def _partners(self, doc: int) -> dict[int, dict[int, int]]:
+        counters: dict[int, dict[int, int]] = {}
+        for token in self.tokens[doc]:
+            docs = self.postings[token]
+            if len(docs) < 2 or len(docs) > self.max_allowed:
+                continue
+            n = len(token)
+            for other in docs:
+                if other != doc:
+                    counter = counters.setdefault(other, {})
+                    counter[n] = counter.get(n, 0) + 1
+        return counters
+
+    def _relink(self, dirty: set[int]) -> None:
+        # 拆开脏文件所在的分量，在其成员内部重新判定连边；连到外部分量时整体并入，
+        # 外部分量之间的连通关系不受影响，无需重算
+        affected: set[int] = set()
+        for cid in {self.comp_of[doc] for doc in dirty}:
+            affected.update(self.members.pop(cid))
+            self.groups.pop(cid, None)
+        parent = {doc: doc for doc in affected}
+
+        def find(x: int) -> int:
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        for doc in affected:
+            for other, counter in self._partners(doc).items():
+                min_title_len = min(len(self.cleaned[doc]), len(self.cleaned[other]))
+                if not should_link_pair(
+                    len_counter=counter,
+                    lengths=self.lengths,
+                    min_pair_matches=self.min_pair_matches,
+                    short_title_pair=min_title_len <= 12,
+                    min_title_len=min_title_len,
+                ):
+                    continue
+                # 外部分量以负数编号作为单个节点参与合并
+                key = other if other in affected else -1 - self.comp_of[other]
+                parent.setdefault(key, key)
+                ra, rb = find(doc), find(key)
+                if ra != rb:
+                    parent[max(ra, rb)] = min(ra, rb)
+
+        merged: dict[int, set[int]] = defaultdict(set)
+        for key in parent:
+            root = find(key)
+            if key >= 0:
+                merged[root].add(key)
+            else:
+                cid = -1 - key
+                merged[root].update(self.members.pop(cid))
+                self.groups.pop(cid, None)
+        for docs in merged.values():
+            cid = self.next_comp
+            self.next_comp += 1
+            self.members[cid] = docs
+            for doc in docs:
+                self.comp_of[doc] = cid
+            if len(docs) >= 2:
+                self.groups[cid] = self._build_group(docs)
+
+    def _build_group(self, docs: set[int]) -> dict[str, Any]:
+        ordered = sorted(docs)
+        return build_group([self.files[d] for d in ordered])
+
+    def result(self, folder: Path, extensions: set[str], scan_options: ScanOptions) -> dict[str, Any]:
+        # 与批量分析的分组顺序一致：组大小降序、最新修改时间降序，再按组内首个文件名
+        ordered = sorted(
+            self.groups.items(),
+            key=lambda item: (
+                -len(self.members[item[0]]),
+                -max(self.files[d].modified_ts for d in self.members[item[0]]),
+                min((self.files[d].name.lower(), self.files[d].path) for d in self.members[item[0]]),
+            ),
+        )
+        groups = [group for _, group in ordered]
+        return {
+            "folder": str(folder),
+            "roots": [str(folder)],
+            "total_files": len(self.files),
+            "group_count": len(groups),
+            "duplicate_file_count": sum(len(g["files"]) for g in groups),
+            "params": {
+                "extensions": sorted(extensions),
+                "stopwords": self.stopwords,
+                "lengths": self.lengths,
+                "min_pair_matches": self.min_pair_matches,
+                "max_df_abs": self.max_df_abs,
+                "max_df_ratio": self.max_df_ratio,
+                "recursive": scan_options.recursive,
+                "max_depth": scan_options.max_depth,
+                "include": list(scan_options.include),
+                "exclude": list(scan_options.exclude),
+                "engine": "exact",
+                "content_dedup": False,
+                "text_simhash_distance": None,
+                "watch": True,
+            },
+            "groups": groups,
+        }
+
+
+class PollingWatcher:
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self.next_poll = time.monotonic() + interval
+
+    def wait(self, timeout: float) -> bool:
+        # 到达轮询周期时报告“可能有变化”，由调用方重新扫描比对
+        now = time.monotonic()
+        if now + timeout < self.next_poll:
+            time.sleep(timeout)
+            return False
+        time.sleep(max(0.0, self.next_poll - now))
+        self.next_poll = time.monotonic() + self.interval
+        return True
+
+    def close(self) -> None:
+        return
+
+
+class InotifyWatcher:
+    def __init__(self, root: Path, recursive: bool) -> None:
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        self.root = str(root)
+        self.recursive = recursive
+        self.dirs: dict[int, str] = {}
+        self.root_wd = self._watch_tree(self.root)
+
+    def _watch_tree(self, path: str) -> int:
+        wd = self._watch(path)
+        if self.recursive:
+            for dirpath, dirnames, _ in os.walk(path):
+                dirnames[:] = [name for name in dirnames if name != QUARANTINE_DIRNAME]
+                for name in dirnames:
+                    self._watch(os.path.join(dirpath, name))
+        return wd
+
+    def _watch(self, path: str) -> int:
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), INOTIFY_MASK)
+        if wd >= 0:
+            self.dirs[wd] = path
+        return wd
+
+    def wait(self, timeout: float) -> bool:
+        if self.root_wd not in self.dirs:
+            # 扫描目录被删除或移走后监听随之失效，等它重新出现再补上
+            if os.path.isdir(self.root):
+                self.root_wd = self._watch_tree(self.root)
+                return True
+            time.sleep(timeout)
+            return False
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        data = b""
+        while True:
+            try:
+                chunk = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not chunk:
+                break
+            data += chunk
+        offset = 0
+        while offset + INOTIFY_EVENT_SIZE <= len(data):
+            wd, mask, _, name_len = struct.unpack_from("iIII", data, offset)
+            name = data[offset + INOTIFY_EVENT_SIZE : offset + INOTIFY_EVENT_SIZE + name_len].rstrip(b"\0")
+            offset += INOTIFY_EVENT_SIZE + name_len
+            if mask & IN_IGNORED:
+                self.dirs.pop(wd, None)
+            elif self.recursive and mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                # 新建或移入的子目录补上监听
+                parent = self.dirs.get(wd)
+                if parent is not None and os.fsdecode(name) != QUARANTINE_DIRNAME:
+                    self._watch_tree(os.path.join(parent, os.fsdecode(name)))
+        return True
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def create_watcher(folder: Path, recursive: bool, interval: float) -> InotifyWatcher | PollingWatcher:
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(folder, recursive)
+        except (OSError, AttributeError):
+            # 无 inotify（容器限制、监听数耗尽等）时退回轮询
+            pass
+    return PollingWatcher(interval)
+
+
+def is_watchable(params: dict[str, Any]) -> bool:
+    return params.get("engine") == "exact" and not params.get("content_dedup") and params.get("text_simhash_distance") is None
+
+
+def same_analysis(result: dict[str, Any], other: dict[str, Any]) -> bool:
+    # 监听结果带 watch 标记，比较时忽略
+    def strip(params: dict[str, Any]) -> dict[str, Any]:
+        return {k: v for k, v in params.items() if k != "watch"}
+
+    return result.get("roots") == other.get("roots") and strip(result["params"]) == strip(other["params"])
+
+
+class FolderWatch:
+    def __init__(
+        self,
+        folder_path: str,
+        extensions_raw: str,
+        stopwords_raw: str,
+        lengths: list[int],
+        min_pair_matches: int,
+        max_df_abs: int,
+        max_df_ratio: float,
+        on_update: Callable[[dict[str, Any]], None],
+        scan_cache: ScanCache | None = None,
+        scan_options: ScanOptions | None = None,
+        interval: float = 2.0,
+        pair_workers: int = 1,
+    ) -> None:
+        lengths = sorted({int(x) for x in lengths if int(x) >= 2})
+        if not lengths:
+            raise ValueError("片段长度无效")
+        self.folder = Path(folder_path).resolve()
+        self.extensions = split_extensions(extensions_raw)
+        self.scan_cache = scan_cache
+        self.scan_options = scan_options or ScanOptions()
+        self.interval = interval
+        self.on_update = on_update
+        self.index = LiveIndex(
+            lengths,
+            parse_stopwords(stopwords_raw),
+            max(1, int(min_pair_matches)),
+            max(2, int(max_df_abs)),
+            min(max(float(max_df_ratio), 0.0), 1.0),
+            pair_workers,
+        )
+        self.stop_event = threading.Event()
+
+        self.pair_workers = pair_workers
+        self.pending: dict[str, Any] | None = None
+        self.lock = threading.Lock()
+
+    def scan(self) -> list[FileMeta]:
+        return collect_files(self.folder, self.extensions, self.scan_cache, self.scan_options)
+
+    def follow(self, result: dict[str, Any]) -> bool:
+        # 用户重新分析监听目录后，按其参数重建常驻索引，之后推送的结果与页面上的口径一致；
+        # 常驻索引只维护按文件名的 exact 分组，其他引擎或附加内容比对的结果无法跟随
+        params = result["params"]
+        if result.get("roots") != [str(self.folder)] or not is_watchable(params):
+            return False
+        with self.lock:
+            self.pending = params
+        return True
+
+    def _restart(self) -> InotifyWatcher | PollingWatcher:
+        with self.lock:
+            params, self.pending = self.pending, None
+        if params is not None:
+            self.extensions = set(params["extensions"])
+            self.scan_options = replace(
+                self.scan_options,
+                recursive=params["recursive"],
+                max_depth=params["max_depth"],
+                include=tuple(params["include"]),
+                exclude=tuple(params["exclude"]),
+            )
+            self.index = LiveIndex(
+                list(params["lengths"]),
+                list(params["stopwords"]),
+                params["min_pair_matches"],
+                params["max_df_abs"],
+                params["max_df_ratio"],
+                self.pair_workers,
+            )
+        self.index.rebuild(self.scan())
+        self.on_update(self.index.result(self.folder, self.extensions, self.scan_options))
+        return create_watcher(self.folder, self.scan_options.recursive, self.interval)
+
+    def run(self) -> None:
+        watcher = self._restart()
+        try:
+            while not self.stop_event.is_set():
+                if self.pending is not None:
+                    restarted = self._restart()
+                    watcher.close()
+                    watcher = restarted
+                    continue
+                if not watcher.wait(1.0):
+                    continue
+                # 下载、解压时事件成串到达，静默一段时间后再统一处理
+                while watcher.wait(WATCH_DEBOUNCE_SECONDS) and not self.stop_event.is_set():
+                    pass
+                try:
+                    files = self.scan()
+                except OSError as exc:
+                    print(f"监听扫描失败：{exc}")
+                    continue
+                if self.index.sync(files):
+                    self.on_update(self.index.result(self.folder, self.extensions, self.scan_options))
+        finally:
+            watcher.close()
+
+    def stop(self) -> None:
+        self.stop_event.set()
+
+
+class MetricsRegistry:
+    # 进程内累计指标，按 Prometheus 文本格式输出；标签以排好序的 (键, 值) 元组区分
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.meta: dict[str, tuple[str, str, tuple[float, ...]]] = {}
+        self.counters: dict[str, dict[tuple[tuple[str, str], ...], float]] = {}
+        self.histograms: dict[str, dict[tuple[tuple[str, str], ...], list[float]]] = {}
+
+    def counter(self, name: str, help_text: str) -> None:
+        self.meta[name] = ("counter", help_text, ())
+        self.counters[name] = {}
+
+    def histogram(self, name: str, help_text: str, buckets: tuple[float, ...]) -> None:
+        self.meta[name] = ("histogram", help_text, buckets)
+        self.histograms[name] = {}
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            series = self.counters[name]
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        buckets = self.meta[name][2]
+        with self.lock:
+            # 每个桶单独计数，输出时再累加成 le 累积值；末尾两项为总和与总数
+            state = self.histograms[name].setdefault(key, [0.0] * (len(buckets) + 2))
+            slot = bisect_left(buckets, value)
+            if slot < len(buckets):
+                state[slot] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def render(self, extra: list[tuple[str, str, str, list[tuple[dict[str, str], float]]]] | None = None) -> str:
+        lines: list[str] = []
+
+        def fmt_labels(pairs: Any) -> str:
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{escape_label(v)}"' for k, v in pairs) + "}"
+
+        with self.lock:
+            for name, (kind, help_text, buckets) in self.meta.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                if kind == "counter":
+                    for key, value in self.counters[name].items():
+                        lines.append(f"{name}{fmt_labels(key)} {value:g}")
+                    continue
+                for key, state in self.histograms[name].items():
+                    cumulative = 0.0
+                    for bound, count in zip(buckets, state):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{fmt_labels(key + (('le', f'{bound:g}'),))} {cumulative:g}")
+                    lines.append(f"{name}_bucket{fmt_labels(key + (('le', '+Inf'),))} {state[-1]:g}")
+                    lines.append(f"{name}_sum{fmt_labels(key)} {state[-2]:g}")
+                    lines.append(f"{name}_count{fmt_labels(key)} {state[-1]:g}")
+        # 由其他对象维护的累计值（如缓存命中数）在输出时读取
+        for name, kind, help_text, samples in extra or []:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{fmt_labels(sorted(labels.items()))} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+def escape_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def create_metrics() -> MetricsRegistry:
+    metrics = MetricsRegistry()
+    metrics.histogram("novel_analysis_duration_seconds", "分析总耗时（秒）", ANALYSIS_DURATION_BUCKETS)
+    metrics.counter("novel_analysis_phase_seconds_total", "各分析阶段累计耗时（秒）")
+    metrics.counter("novel_analyses_total", "分析次数，按结果状态区分")
+    metrics.counter("novel_analysis_pairs_total", "分析中累计产生的候选对与连边数")
+    metrics.histogram("novel_http_request_duration_seconds", "HTTP 请求处理耗时（秒）", REQUEST_DURATION_BUCKETS)
+    metrics.counter("novel_deleted_files_total", "删除的文件数，按结果区分")
+    metrics.histogram("novel_delete_duration_seconds", "每次删除请求的耗时（秒）", REQUEST_DURATION_BUCKETS)
+    return metrics
+
+
+def metrics_route(path: str) -> str:
+    # 任务 ID 等动态片段归并，避免标签基数无限增长
+    if path.startswith("/api/jobs/"):
+        return "/api/jobs/:id/cancel" if path.endswith("/cancel") else "/api/jobs/:id"
+    if path.startswith("/api/groups/") and path.endswith("/evidence"):
+        return "/api/groups/:id/evidence"
+    if path in METRICS_ROUTES:
+        return path
+    return "other"
+
+
+class JobQueueFull(RuntimeError):
+    pass
+
+
+class ResultVersionMismatch(RuntimeError):
+    pass
+
+
+class Job:
+    def __init__(
+        self,
+        kind: str,
+        run: Callable[[Job], Any],
+        priority: str,
+        seq: int,
+        cancel: CancelToken | None = None,
+        listener: ProgressCallback | None = None,
+        retain: bool = True,
+    ) -> None:
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.run = run
+        self.priority = priority
+        self.seq = seq
+        self.cancel = cancel or CancelToken()
+        self.listener = listener
+        self.retain = retain
+        self.status = "queued"
+        self.progress: dict[str, Any] = {}
+        self.result: Any = None
+        self.error = ""
+        self.created = time.time()
+        self.started = 0.0
+        self.finished = 0.0
+        self.done = threading.Event()
+
+    @property
+    def sort_key(self) -> tuple[int, int]:
+        return JOB_PRIORITIES[self.priority], self.seq
+
+    def report(self, phase: str, counters: dict[str, Any]) -> None:
+        self.progress = {"phase": phase, "counters": counters}
+        if self.listener is not None:
+            self.listener(phase, counters)
+
+    def to_dict(self, include_result: bool = True) -> dict[str, Any]:
+        data: dict[str, Any] = {
+            "id": self.id,
+            "type": self.kind,
+            "priority": self.priority,
+            "status": self.status,
+            "progress": self.progress,
+            "created": fmt_time(self.created),
+            "started": fmt_time(self.started) if self.started else "",
+            "finished": fmt_time(self.finished) if self.finished else "",
+            "error": self.error,
+        }
+        if include_result and self.status == "done":
+            data["result"] = self.result
+        return data
+
+
+class JobQueue:
+    def __init__(self, workers: int = 2, max_pending: int = 32, max_finished: int = 16) -> None:
+        self.workers = max(1, int(workers))
+        self.max_pending = max(1, int(max_pending))
+        self.max_finished = max(0, int(max_finished))
+        self.heap: list[tuple[tuple[int, int], Job]] = []
+        self.jobs: OrderedDict[str, Job] = OrderedDict()
+        self.pending = 0
+        self.seq = 0
+        self.threads: list[threading.Thread] = []
+        self.lock = threading.Lock()
+        self.ready = threading.Condition(self.lock)
+
+    def submit(
+        self,
+        kind: str,
+        run: Callable[[Job], Any],
+        priority: str = "bulk",
+        cancel: CancelToken | None = None,
+        listener: ProgressCallback | None = None,
+        retain: bool = True,
+    ) -> Job:
+        if priority not in JOB_PRIORITIES:
+            raise ValueError(f"未知的任务优先级：{priority}")
+        with self.lock:
+            if self.pending >= self.max_pending:
+                raise JobQueueFull("任务队列已满，请稍后再试")
+            self.seq += 1
+            job = Job(kind, run, priority, self.seq, cancel=cancel, listener=listener, retain=retain)
+            self.jobs[job.id] = job
+            self.pending += 1
+            heapq.heappush(self.heap, (job.sort_key, job))
+            # 工作线程按需启动，避免导入模块时就创建线程；
+            # 0 号线程只接交互任务，批量任务再多也不会让页面分析排长队
+            while len(self.threads) < self.workers:
+                index = len(self.threads)
+                thread = threading.Thread(
+                    target=self._work, args=(index == 0 and self.workers > 1,), name=f"job-worker-{index}", daemon=True
+                )
+                thread.start()
+                self.threads.append(thread)
+            self.ready.notify_all()
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def list(self) -> list[Job]:
+        with self.lock:
+            return list(self.jobs.values())
+
+    def ahead_of(self, job: Job) -> int:
+        with self.lock:
+            return sum(1 for j in self.jobs.values() if j.status == "queued" and j.sort_key < job.sort_key)
+
+    def _work(self, interactive_only: bool) -> None:
+        top = JOB_PRIORITIES["interactive"]
+        while True:
+            with self.ready:
+                while not self.heap or (interactive_only and self.heap[0][0][0] > top):
+                    self.ready.wait()
+                _, job = heapq.heappop(self.heap)
+                self.pending -= 1
+            if job.cancel.cancelled:
+                job.status = "cancelled"
+                job.error = "任务已取消"
+            else:
+                job.status = "running"
+                job.started = time.time()
+                try:
+                    job.result = job.run(job)
+                    job.status = "done"
+                except AnalysisCancelled as exc:
+                    job.status = "cancelled"
+                    job.error = str(exc)
+                except Exception as exc:  # noqa: BLE001
+                    job.status = "failed"
+                    job.error = str(exc)
+            job.finished = time.time()
+            job.listener = None
+            self._retire(job)
+            job.done.set()
+
+    def _retire(self, job: Job) -> None:
+        with self.lock:
+            if not job.retain:
+                self.jobs.pop(job.id, None)
+                return
+            finished = [j for j in self.jobs.values() if j.done.is_set() or j is job]
+            for old in finished[: max(0, len(finished) - self.max_finished)]:
+                self.jobs.pop(old.id, None)
 
 
 class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    _chunked = False
+    _stream_compressor: Any = None
     default_path = str(Path.cwd())
     persisted_default_path = str(Path.cwd())
     config_path = Path.cwd() / CONFIG_FILENAME
     persisted_stopwords = ",".join(DEFAULT_STOPWORDS)
+    scan_cache: ScanCache | None = None
+    analysis_cache = AnalysisCache()
+    scan_workers = 8
+    text_workers = 1
+    delete_workers = 8
+    delete_mode = "quarantine"
+    quarantine_days = 7.0
+    # 最近几次隔离删除前的结果与缓存行，撤销时据此恢复分组而无需重新扫描
+    undo_records: OrderedDict[str, dict[str, Any]] = OrderedDict()
+    quarantine_roots: set[str] = set()
+    engine_options = EngineOptions()
+    active_analyses: dict[str, CancelToken] = {}
+    jobs = JobQueue()
+    # 网页模式的目录监听；用户重新分析监听目录时按其参数重建
+    watch: FolderWatch | None = None
     latest_result: dict[str, Any] | None = None
+    latest_version = 0
+    group_orders: dict[str, list[int]] = {}
+    # 分组 ID → 下标、文件路径 → 分组 ID，按需建立；删除文件时据此只重算受影响的分组
+    group_ids: dict[str, int] | None = None
+    path_groups: dict[str, str] | None = None
+    # 以分组 ID 为键，删除文件后未受影响分组的证据继续有效
+    evidence_cache: dict[tuple[str, bool], dict[str, Any]] = {}
+    page_cache: tuple[tuple[str, str, str], str, dict[str, bytes]] | None = None
+    metrics = create_metrics()
     lock = threading.Lock()
+    result_changed = threading.Condition(lock)
+    _status = 0
 
     def _send_json(self, payload: dict[str, Any], status: int = 200) -> None:
         body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
-        self.send_response(status)
-        self.send_header("Content-Type", "application/json; charset=utf-8")
-        self.send_header("Content-Length", str(len(body)))
-        self.end_headers()
-        self.wfile.write(body)
+        self._send_body(body, "application/json; charset=utf-8", status)
 
     def _send_html(self, html: str, status: int = 200) -> None:
-        body = html.encode("utf-8")
+        self._send_body(html.encode("utf-8"), "text/html; charset=utf-8", status)
+
+    def _send_body(
+        self,
+        body: bytes,
+        content_type: str,
+        status: int = 200,
+        variants: Mapping[str, bytes] | None = None,
+        headers: Mapping[str, str] | None = None,
+    ) -> None:
+        # variants 为预压缩好的各编码版本，未提供时按需现场压缩
+        encoding = None
+        if variants is not None or len(body) >= MIN_COMPRESS_SIZE:
+            encoding = negotiate_encoding(self.headers.get("Accept-Encoding", ""), variants or COMPRESSORS)
+        if encoding == "identity":
+            encoding = None
+        if encoding is not None:
+            body = variants[encoding] if variants is not None else COMPRESSORS[encoding](body)
         self.send_response(status)
-        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Type", content_type)
         self.send_header("Content-Length", str(len(body)))
+        self.send_header("Vary", "Accept-Encoding")
+        if encoding is not None:
+            self.send_header("Content-Encoding", encoding)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
         self.end_headers()
         self.wfile.write(body)
 
+    @classmethod
+    def rendered_page(cls) -> tuple[bytes, str, dict[str, bytes]]:
+        # 页面只依赖默认目录、停用词与删除方式，变化时才重新渲染并压缩
+        with cls.lock:
+            key = (cls.persisted_default_path, cls.persisted_stopwords, cls.delete_mode)
+            cached = cls.page_cache
+        if cached is None or cached[0] != key:
+            html = HTML_PAGE.replace("__DEFAULT_PATH_JSON__", json.dumps(key[0].replace("\\", "/"), ensure_ascii=False))
+            html = html.replace("__DEFAULT_STOPWORDS_JSON__", json.dumps(key[1], ensure_ascii=False))
+            html = html.replace("__DELETE_MODE_JSON__", json.dumps(key[2]))
+            body = html.encode("utf-8")
+            variants = {name: compress(body) for name, compress in COMPRESSORS.items()}
+            variants["identity"] = body
+            etag = 'W/"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+            cached = (key, etag, variants)
+            with cls.lock:
+                cls.page_cache = cached
+        return cached[2]["identity"], cached[1], cached[2]
+
+    def send_response(self, code: int, message: str | None = None) -> None:
+        self._status = code
+        super().send_response(code, message)
+
     def do_GET(self) -> None:  # noqa: N802
+        self._timed("GET", self._handle_get)
+
+    def do_POST(self) -> None:  # noqa: N802
+        self._timed("POST", self._handle_post)
+
+    def _timed(self, method: str, handle: Callable[[], None]) -> None:
+        start = time.perf_counter()
+        self._status = 0
+        try:
+            handle()
+        finally:
+            route = metrics_route(urlparse(self.path).path)
+            # 事件推送是长连接，持续时间不代表处理耗时
+            if route != "/api/events":
+                type(self).metrics.observe(
+                    "novel_http_request_duration_seconds",
+                    time.perf_counter() - start,
+                    method=method,
+                    route=route,
+                    status=str(self._status),
+                )
+
+    def _handle_get(self) -> None:
         parsed = urlparse(self.path)
         if parsed.path == "/":
-            html = HTML_PAGE.replace(
-                "__DEFAULT_PATH__",
-                type(self).persisted_default_path.replace("\\", "/"),
-            )
-            html = html.replace(
-                "__DEFAULT_STOPWORDS_JSON__",
-                json.dumps(type(self).persisted_stopwords, ensure_ascii=False),
-            )
-            self._send_html(html)
+            body, etag, variants = type(self).rendered_page()
+            cache_headers = {"ETag": etag, "Cache-Control": "no-cache"}
+            if_none_match = self.headers.get("If-None-Match", "")
+            if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+                self.send_response(304)
+                self.send_header("Vary", "Accept-Encoding")
+                for key, value in cache_headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                return
+            self._send_body(body, "text/html; charset=utf-8", variants=variants, headers=cache_headers)
             return
 
         if parsed.path == "/api/export":
-            with self.lock:
-                data = self.latest_result
+            qs = parse_qs(parsed.query)
+            try:
+                result = type(self).export_latest(qs.get("output", [""])[0])
+            except Exception as exc:  # noqa: BLE001
+                self._send_json({"error": str(exc)}, status=400)
+                return
+            self._send_json({"ok": True, **result})
+            return
 
-            if not data:
-                self._send_json({"error": "当前没有可导出的结果"}, status=400)
+        if parsed.path == "/api/export/download":
+            qs = parse_qs(parsed.query)
+            try:
+                fmt = qs.get("format", ["csv"])[0] or "csv"
+                if fmt not in EXPORT_FORMATS:
+                    raise ValueError(f"不支持的导出格式：{fmt}")
+                version_raw = qs.get("version", [""])[0]
+                data, version, order = type(self).export_snapshot(
+                    int(version_raw) if version_raw else None, qs.get("sort", ["default"])[0] or "default"
+                )
+            except ResultVersionMismatch as exc:
+                self._send_json({"error": str(exc)}, status=409)
+                return
+            except (LookupError, ValueError) as exc:
+                self._send_json({"error": str(exc)}, status=404 if isinstance(exc, LookupError) else 400)
+                return
+            self._stream_export(data, version, order, fmt)
+            return
+
+        if parsed.path == "/api/groups":
+            qs = parse_qs(parsed.query)
+            try:
+                page = type(self).group_page(
+                    int(qs.get("offset", ["0"])[0] or 0),
+                    int(qs.get("limit", ["50"])[0] or 50),
+                    qs.get("sort", ["default"])[0] or "default",
+                    evidence=qs.get("evidence", ["0"])[0] == "1",
+                )
+            except Exception as exc:  # noqa: BLE001
+                self._send_json({"error": str(exc)}, status=400)
                 return
+            self._send_json(page)
+            return
 
+        if parsed.path.startswith("/api/groups/") and parsed.path.endswith("/evidence"):
             qs = parse_qs(parsed.query)
-            output = qs.get("output", [""])[0].strip()
-            if not output:
-                output = str(Path.cwd() / "novel_groups.csv")
+            try:
+                key = parsed.path[len("/api/groups/") : -len("/evidence")].strip("/")
+                version_raw = qs.get("version", [""])[0]
+                evidence = type(self).evidence_for(key, int(version_raw) if version_raw else None)
+            except ResultVersionMismatch as exc:
+                self._send_json({"error": str(exc)}, status=409)
+                return
+            except (LookupError, ValueError) as exc:
+                self._send_json({"error": str(exc)}, status=404 if isinstance(exc, LookupError) else 400)
+                return
+            self._send_json(evidence)
+            return
 
-            out_path = Path(output).resolve()
-            export_csv(data, out_path)
-            self._send_json({"ok": True, "output": str(out_path)})
+        if parsed.path == "/api/events":
+            self._stream_events()
+            return
+
+        if parsed.path == "/api/quarantine":
+            qs = parse_qs(parsed.query)
+            self._send_json(type(self).list_quarantine(qs.get("folder_path", [""])[0]))
+            return
+
+        if parsed.path == "/api/metrics":
+            body = type(self).render_metrics().encode("utf-8")
+            self._send_body(body, "text/plain; version=0.0.4; charset=utf-8")
+            return
+
+        if parsed.path == "/api/jobs":
+            self._send_json({"jobs": [job.to_dict(include_result=False) for job in type(self).jobs.list()]})
+            return
+
+        if parsed.path.startswith("/api/jobs/"):
+            job = type(self).jobs.get(parsed.path[len("/api/jobs/") :].strip("/"))
+            if job is None:
+                self._send_json({"error": "任务不存在或已过期"}, status=404)
+                return
+            self._send_json(job.to_dict())
             return
 
         self._send_json({"error": "Not Found"}, status=404)
 
-    def do_POST(self) -> None:  # noqa: N802
+    def _handle_post(self) -> None:
         try:
             length = int(self.headers.get("Content-Length", "0"))
             body = self.rfile.read(length)
@@ -1633,22 +5264,157 @@ class Handler(BaseHTTPRequestHandler):
                 return
 
             if self.path == "/api/delete-files":
-                raw_paths = payload.get("paths", [])
-                if not isinstance(raw_paths, list) or not raw_paths:
-                    self._send_json({"error": "paths 不能为空"}, status=400)
-                    return
-                folder_raw = str(payload.get("folder_path", "")).strip()
-                folder = Path(folder_raw).resolve() if folder_raw else Path(type(self).default_path).resolve()
-                result = delete_files([str(p) for p in raw_paths], folder)
+                result = type(self).delete_paths(payload)
                 self._send_json({"ok": True, **result})
                 return
 
+            if self.path == "/api/undo-delete":
+                self._send_json({"ok": True, **type(self).undo_delete(payload)})
+                return
+
+            if self.path == "/api/purge-quarantine":
+                self._send_json({"ok": True, **type(self).purge_quarantine_runs(payload)})
+                return
+
+            if self.path == "/api/bulk-delete":
+                # 先同步生成一次计划：策略或结果版本不对时直接返回错误码，不进入任务队列
+                plan = type(self).bulk_delete({**payload, "dry_run": True}, require_version=not payload.get("dry_run"))
+                if payload.get("dry_run"):
+                    self._send_json({"ok": True, **plan})
+                    return
+                if payload.get("stream"):
+                    events: queue.Queue[tuple[str, dict[str, Any]]] = queue.Queue()
+                    job = self._submit_bulk_delete(payload, "interactive", listener=lambda p, c: events.put((p, c)))
+                    self._stream_job(job, events)
+                    return
+                job = self._submit_bulk_delete(payload, "interactive")
+                job.done.wait()
+                if job.status == "done":
+                    self._send_json({"ok": True, **job.result})
+                else:
+                    self._send_json({"error": job.error}, status=409 if job.status == "cancelled" else 400)
+                return
+
+            if self.path == "/api/jobs":
+                job = self._submit_job(payload)
+                self._send_json({"ok": True, "job_id": job.id, "status": job.status}, status=202)
+                return
+
+            if self.path.startswith("/api/jobs/") and self.path.endswith("/cancel"):
+                target = type(self).jobs.get(self.path[len("/api/jobs/") : -len("/cancel")].strip("/"))
+                if target is None:
+                    self._send_json({"error": "任务不存在或已过期"}, status=404)
+                    return
+                target.cancel.cancel()
+                self._send_json({"ok": True, **target.to_dict(include_result=False)})
+                return
+
             if self.path != "/api/analyze":
                 self._send_json({"error": "Not Found"}, status=404)
                 return
 
-            stopwords_raw = str(payload.get("stopwords", type(self).persisted_stopwords))
-            folder_path_raw = str(payload.get("folder_path", "")).strip() or type(self).persisted_default_path
+            if payload.get("stream"):
+                self._stream_analysis(payload)
+                return
+
+            job = self._submit_analysis(payload, "interactive", retain=False)
+            job.done.wait()
+            if job.status == "cancelled":
+                self._send_json({"error": job.error, "cancelled": True}, status=409)
+            elif job.status == "failed":
+                self._send_json({"error": job.error}, status=400)
+            else:
+                self._send_json(job.result)
+        except JobQueueFull as exc:
+            self._send_json({"error": str(exc)}, status=503)
+        except ResultVersionMismatch as exc:
+            self._send_json({"error": str(exc)}, status=409)
+        except Exception as exc:  # noqa: BLE001
+            self._send_json({"error": str(exc)}, status=400)
+
+    def _submit_job(self, payload: dict[str, Any]) -> Job:
+        kind = str(payload.get("type", "")).strip()
+        priority = str(payload.get("priority", "bulk")).strip()
+        params = payload.get("params", {})
+        if not isinstance(params, dict):
+            raise ValueError("params 必须是对象")
+        if kind == "analyze":
+            return self._submit_analysis(params, priority)
+        if kind == "export":
+            output = str(params.get("output", ""))
+            return type(self).jobs.submit(kind, lambda job: type(self).export_latest(output), priority)
+        if kind == "delete":
+            return type(self).jobs.submit(kind, lambda job: type(self).delete_paths(params), priority)
+        if kind == "bulk-delete":
+            return self._submit_bulk_delete(params, priority)
+        raise ValueError(f"未知的任务类型：{kind}")
+
+    def _submit_bulk_delete(
+        self,
+        payload: dict[str, Any],
+        priority: str,
+        listener: ProgressCallback | None = None,
+    ) -> Job:
+        cls = type(self)
+        return cls.jobs.submit(
+            "bulk-delete",
+            lambda job: cls.bulk_delete(payload, job.report, job.cancel),
+            priority,
+            listener=listener,
+            retain=listener is None,
+        )
+
+    def _submit_analysis(
+        self,
+        payload: dict[str, Any],
+        priority: str,
+        listener: ProgressCallback | None = None,
+        retain: bool = True,
+    ) -> Job:
+        cls = type(self)
+        cancel = CancelToken()
+        # 同一页面（client_id）发起新分析时取消其尚未完成的旧分析（含仍在排队的）；
+        # 不带 client_id 的请求互不取消，同一地址后的多个脚本或用户不会误伤彼此
+        client_key = str(payload.get("client_id", "")).strip()
+        if client_key:
+            with cls.lock:
+                previous = cls.active_analyses.get(client_key)
+                if previous is not None:
+                    previous.cancel()
+                cls.active_analyses[client_key] = cancel
+
+        def release() -> None:
+            if not client_key:
+                return
+            with cls.lock:
+                if cls.active_analyses.get(client_key) is cancel:
+                    del cls.active_analyses[client_key]
+
+        # 保留在队列中的已完成任务只存摘要，分组从最新结果分页读取，避免多份完整结果常驻内存
+        params = {**payload, "include_groups": False} if retain else payload
+
+        def run(job: Job) -> dict[str, Any]:
+            try:
+                return cls.analyze_and_publish(params, job.report, cancel)
+            finally:
+                release()
+
+        try:
+            return cls.jobs.submit("analyze", run, priority, cancel=cancel, listener=listener, retain=retain)
+        except Exception:
+            release()
+            raise
+
+    @classmethod
+    def analyze_and_publish(
+        cls,
+        payload: dict[str, Any],
+        progress: ProgressCallback | None,
+        cancel: CancelToken,
+    ) -> dict[str, Any]:
+        stopwords_raw = str(payload.get("stopwords", cls.persisted_stopwords))
+        folder_path_raw = split_roots(payload.get("folder_path")) or split_roots(cls.persisted_default_path)
+        try:
             result = analyze_folder(
                 folder_path=folder_path_raw,
                 extensions_raw=str(payload.get("extensions", ".txt,.doc,.docx,.epub")),
@@ -1657,22 +5423,571 @@ class Handler(BaseHTTPRequestHandler):
                 min_pair_matches=int(payload.get("min_pair_matches", 2)),
                 max_df_abs=int(payload.get("max_df_abs", 120)),
                 max_df_ratio=float(payload.get("max_df_ratio", 0.04)),
+                scan_cache=cls.scan_cache,
+                analysis_cache=cls.analysis_cache,
+                scan_options=ScanOptions(
+                    recursive=bool(payload.get("recursive", False)),
+                    max_depth=parse_max_depth(payload.get("max_depth")),
+                    include=split_patterns(payload.get("include", "")),
+                    exclude=split_patterns(payload.get("exclude", "")),
+                    workers=cls.scan_workers,
+                ),
+                progress=progress,
+                cancel=cancel,
+                engine_options=EngineOptions(
+                    engine=str(payload.get("engine") or cls.engine_options.engine),
+                    bands=int(payload.get("minhash_bands") or cls.engine_options.bands),
+                    rows=int(payload.get("minhash_rows") or cls.engine_options.rows),
+                    max_bucket=int(payload.get("lsh_max_bucket") or cls.engine_options.max_bucket),
+                    workers=cls.engine_options.workers,
+                    pair_memory_mb=cls.engine_options.pair_memory_mb,
+                ),
+                content_dedup=bool(payload.get("content_dedup", False)),
+                text_simhash_distance=(
+                    int(payload.get("simhash_distance", 3)) if payload.get("text_simhash") else None
+                ),
+                text_workers=cls.text_workers,
             )
-            normalized = ",".join(result["params"]["stopwords"])
+        except AnalysisCancelled:
+            cls.metrics.inc("novel_analyses_total", status="cancelled")
+            raise
+        except Exception:
+            cls.metrics.inc("novel_analyses_total", status="failed")
+            raise
+        cls.record_analysis(result["stats"])
+        cancel.check()
+        normalized = ",".join(result["params"]["stopwords"])
+        try:
+            folder_saved = save_default_path(cls.config_path, result["folder"])
+            save_stopwords(cls.config_path, normalized)
+        except Exception:  # noqa: BLE001
+            folder_saved = result["folder"]
+        with cls.lock:
+            cancel.check()
+            cls.publish_result(result)
+            version = cls.latest_version
+            cls.persisted_stopwords = normalized
+            cls.persisted_default_path = folder_saved
+            cls.default_path = folder_saved
+        if cls.watch is not None:
+            cls.watch.follow(result)
+        # 页面只取摘要，分组再按需分页读取，避免一次返回上万个分组
+        if payload.get("include_groups", True):
+            return {**result, "version": version}
+        return summarize_result(result, version)
+
+    @classmethod
+    def record_analysis(cls, stats: dict[str, Any]) -> None:
+        cls.metrics.inc("novel_analyses_total", status="done")
+        cls.metrics.observe("novel_analysis_duration_seconds", stats["total_seconds"])
+        for phase, seconds in stats["phase_seconds"].items():
+            cls.metrics.inc("novel_analysis_phase_seconds_total", seconds, phase=phase)
+        cls.metrics.inc("novel_analysis_pairs_total", stats["candidate_pairs"], kind="candidate")
+        cls.metrics.inc("novel_analysis_pairs_total", stats["linked_pairs"], kind="linked")
+
+    @classmethod
+    def render_metrics(cls) -> str:
+        cache_stats = cls.analysis_cache.stats()
+        extra: list[tuple[str, str, str, list[tuple[dict[str, str], float]]]] = [
+            (
+                "novel_analysis_cache_hits_total",
+                "counter",
+                "分析阶段缓存命中次数",
+                [({"stage": stage}, stats["hits"]) for stage, stats in cache_stats.items()],
+            ),
+            (
+                "novel_analysis_cache_misses_total",
+                "counter",
+                "分析阶段缓存未命中次数",
+                [({"stage": stage}, stats["misses"]) for stage, stats in cache_stats.items()],
+            ),
+        ]
+        if cls.scan_cache is not None:
+            scan_stats = cls.scan_cache.stats()
+            extra.append(("novel_scan_cache_hits_total", "counter", "扫描元数据缓存命中的文件数", [({}, scan_stats["hits"])]))
+            extra.append(
+                ("novel_scan_cache_misses_total", "counter", "扫描元数据缓存未命中的文件数", [({}, scan_stats["misses"])])
+            )
+        return cls.metrics.render(extra)
+
+    @classmethod
+    def publish_result(cls, result: dict[str, Any] | None) -> None:
+        # 调用方需持有 cls.lock
+        cls.latest_result = result
+        cls.latest_version += 1
+        cls.group_orders = {}
+        cls.group_ids = None
+        cls.path_groups = None
+        cls.evidence_cache = {}
+        cls.result_changed.notify_all()
+
+    @classmethod
+    def group_index(cls) -> dict[str, int]:
+        # 调用方需持有 cls.lock
+        if cls.group_ids is None:
+            groups = cls.latest_result["groups"] if cls.latest_result else []
+            cls.group_ids = {g["id"]: i for i, g in enumerate(groups)}
+        return cls.group_ids
+
+    @classmethod
+    def publish_pruned(cls, deleted: list[str]) -> dict[str, Any]:
+        # 调用方需持有 cls.lock。在当前结果上增量剔除已删除文件并发布新版本，返回分组差异：
+        # 移除的分组 ID、变化后的分组，以及各已缓存排序中被移除分组的原位置。
+        # 排序不因分组变小而重排，页面按原位置平移已加载的分页即可
+        data = cls.latest_result
+        if data is None:
+            raise ValueError("当前没有分析结果")
+        base_version = cls.latest_version
+        ids = cls.group_index()
+        if cls.path_groups is None:
+            cls.path_groups = {f["path"]: g["id"] for g in data["groups"] for f in g["files"]}
+        paths = cls.path_groups
+        touched = sorted({ids[paths[p]] for p in deleted if p in paths})
+        pruned, changes = prune_deleted(data, deleted, touched)
+        removed = sorted(i for i, g in changes.items() if g is None)
+        removed_set = set(removed)
+        orders = {
+            sort: [i - bisect_left(removed, i) for i in order if i not in removed_set]
+            for sort, order in cls.group_orders.items()
+        }
+        removed_positions = {
+            sort: [pos for pos, i in enumerate(order) if i in removed_set] for sort, order in cls.group_orders.items()
+        }
+        old_groups = data["groups"]
+        for i, group in changes.items():
+            old_id = old_groups[i]["id"]
+            for key in ((old_id, True), (old_id, False)):
+                cls.evidence_cache.pop(key, None)
+            ids.pop(old_id, None)
+            if group is None:
+                for f in old_groups[i]["files"]:
+                    paths.pop(f["path"], None)
+                continue
+            ids[group["id"]] = i
+            for f in group["files"]:
+                paths[f["path"]] = group["id"]
+        for p in deleted:
+            paths.pop(p, None)
+
+        cls.latest_result = pruned
+        cls.latest_version += 1
+        cls.group_orders = orders
+        cls.group_ids = None if removed else ids
+        cls.result_changed.notify_all()
+        return {
+            "base_version": base_version,
+            "version": cls.latest_version,
+            "removed": [old_groups[i]["id"] for i in removed],
+            "updated": [
+                {**group, "index": i - bisect_left(removed, i), "previous_id": old_groups[i]["id"]}
+                for i, group in changes.items()
+                if group is not None
+            ],
+            "removed_positions": removed_positions,
+        }
+
+    @classmethod
+    def group_page(cls, offset: int, limit: int, sort: str, evidence: bool = False) -> dict[str, Any]:
+        with cls.lock:
+            data = cls.latest_result
+            version = cls.latest_version
+            if not data:
+                raise ValueError("当前没有分析结果")
+            order = cls.group_orders.get(sort)
+            if order is None:
+                order = sort_group_order(data["groups"], sort)
+                cls.group_orders[sort] = order
+        offset = max(0, offset)
+        limit = max(1, min(limit, 1000))
+        page = [{**data["groups"][i], "index": i} for i in order[offset : offset + limit]]
+        if evidence:
+            # 导出需要公共片段，只合并摘要部分，不列举配对
+            for group in page:
+                group.update(cls.cached_evidence(data, version, group["index"], with_pairs=False))
+        return {
+            "version": version,
+            "total": len(order),
+            "offset": offset,
+            "limit": limit,
+            "sort": sort,
+            "groups": page,
+        }
+
+    @classmethod
+    def evidence_for(cls, key: str, version: int | None) -> dict[str, Any]:
+        # key 为分组 ID，兼容旧的数字下标
+        with cls.lock:
+            data = cls.latest_result
+            current = cls.latest_version
+            if not data:
+                raise LookupError("当前没有分析结果")
+            if version is not None and version != current:
+                raise ResultVersionMismatch("分析结果已更新，请刷新分组")
+            index = cls.group_index().get(key)
+        if index is None:
+            if not key.isdigit() or int(key) >= len(data["groups"]):
+                raise LookupError("分组不存在")
+            index = int(key)
+        return {
+            "version": current,
+            "index": index,
+            "id": data["groups"][index]["id"],
+            **cls.cached_evidence(data, current, index, with_pairs=True),
+        }
+
+    @classmethod
+    def cached_evidence(cls, data: dict[str, Any], version: int, index: int, with_pairs: bool) -> dict[str, Any]:
+        key = (data["groups"][index]["id"], with_pairs)
+        with cls.lock:
+            cached = cls.evidence_cache.get(key) if cls.latest_version == version else None
+        if cached is not None:
+            return cached
+        evidence = group_evidence(data["groups"][index], data["params"], EVIDENCE_MAX_PAIRS if with_pairs else 0)
+        with cls.lock:
+            # 计算期间结果可能已被替换，旧版本的证据不再写入缓存
+            if cls.latest_version == version:
+                cls.evidence_cache[key] = evidence
+        return evidence
+
+    @classmethod
+    def export_latest(cls, output: str) -> dict[str, Any]:
+        with cls.lock:
+            data = cls.latest_result
+        if not data:
+            raise ValueError("当前没有可导出的结果")
+        output = output.strip() or str(Path.cwd() / "novel_groups.csv")
+        out_path = Path(output).resolve()
+        export_csv(data, out_path)
+        return {"output": str(out_path)}
+
+    @classmethod
+    def export_snapshot(cls, version: int | None, sort: str) -> tuple[dict[str, Any], int, list[int]]:
+        # 结果发布后不再原地修改，持有引用即可在锁外逐组导出
+        with cls.lock:
+            data = cls.latest_result
+            current = cls.latest_version
+            if not data:
+                raise LookupError("当前没有可导出的结果")
+            if version is not None and version != current:
+                raise ResultVersionMismatch("分析结果已更新，请重新导出")
+            order = cls.group_orders.get(sort)
+            if order is None:
+                order = sort_group_order(data["groups"], sort)
+                cls.group_orders[sort] = order
+        return data, current, order
+
+    @classmethod
+    def delete_paths(cls, payload: dict[str, Any]) -> dict[str, Any]:
+        raw_paths = payload.get("paths", [])
+        if not isinstance(raw_paths, list) or not raw_paths:
+            raise ValueError("paths 不能为空")
+        roots = resolve_roots(payload.get("folder_path")) or resolve_roots(cls.default_path)
+        return cls.apply_deletion([str(p) for p in raw_paths], roots, mode=payload.get("mode"))
+
+    @classmethod
+    def bulk_delete(
+        cls,
+        payload: dict[str, Any],
+        progress: ProgressCallback | None = None,
+        cancel: CancelToken | None = None,
+        require_version: bool | None = None,
+    ) -> dict[str, Any]:
+        policy = str(payload.get("policy", "largest")).strip() or "largest"
+        prefer = [
+            ext if ext.startswith(".") else f".{ext}"
+            for ext in (part.lower() for part in split_patterns(payload.get("prefer_extensions", "")))
+        ]
+        with cls.lock:
+            data = cls.latest_result
+            version = cls.latest_version
+        if not data:
+            raise ValueError("当前没有分析结果")
+        # 页面按自己看到的结果确认删除范围，结果已更新时拒绝执行，避免删到未预览过的文件；
+        # 只有预览可以不带版本，真正执行时必须指明确认过的是哪一版结果
+        if require_version is None:
+            require_version = not payload.get("dry_run")
+        expected = payload.get("version")
+        if expected is None:
+            if require_version:
+                raise ValueError("执行批量删除时必须提供预览时的结果版本 version")
+        elif int(expected) != version:
+            raise ResultVersionMismatch("分析结果已更新，请重新确认删除范围")
+        paths, affected = plan_bulk_deletion(data["groups"], policy, prefer)
+        plan = {"policy": policy, "prefer_extensions": prefer, "groups_affected": affected, "planned_count": len(paths)}
+        if payload.get("dry_run"):
+            return {**plan, "version": version, "preview": paths[:20]}
+        result = cls.apply_deletion(paths, [Path(r) for r in data["roots"]], progress, cancel, payload.get("mode"))
+        return {**plan, **result}
+
+    @classmethod
+    def apply_deletion(
+        cls,
+        paths: list[str],
+        roots: list[Path],
+        progress: ProgressCallback | None = None,
+        cancel: CancelToken | None = None,
+        mode: str | None = None,
+    ) -> dict[str, Any]:
+        mode = str(mode or cls.delete_mode)
+        if mode not in DELETE_MODES:
+            raise ValueError(f"未知的删除方式：{mode}")
+        run_id = new_quarantine_id() if mode == "quarantine" else None
+        started = time.perf_counter()
+        result = delete_files(paths, roots, cls.delete_workers, progress, cancel, quarantine=run_id)
+        cls.metrics.observe("novel_delete_duration_seconds", time.perf_counter() - started)
+        cls.metrics.inc("novel_deleted_files_total", result["deleted_count"], result="deleted", mode=mode)
+        cls.metrics.inc("novel_deleted_files_total", result["failed_count"], result="failed", mode=mode)
+        cache_rows = cls.scan_cache.forget_paths(result["deleted"]) if cls.scan_cache and result["deleted"] else []
+        # 同步从当前结果中剔除已删除文件，分页视图据此刷新
+        with cls.lock:
+            before = cls.latest_result
+            if cls.latest_result and result["deleted"]:
+                result["diff"] = cls.publish_pruned(result["deleted"])
+            if cls.latest_result:
+                result["summary"] = summarize_result(cls.latest_result, cls.latest_version)
+            if "quarantine" in result:
+                cls.undo_records[result["quarantine"]["run_id"]] = {
+                    "roots": [str(root.resolve()) for root in roots],
+                    "before": before,
+                    "cache_rows": cache_rows,
+                }
+                while len(cls.undo_records) > QUARANTINE_UNDO_KEEP:
+                    cls.undo_records.popitem(last=False)
+                cls.quarantine_roots.update(str(root.resolve()) for root in roots)
+        result["mode"] = mode
+        return result
+
+    @classmethod
+    def undo_delete(cls, payload: dict[str, Any]) -> dict[str, Any]:
+        run_id = str(payload.get("run_id", "")).strip()
+        with cls.lock:
+            if not run_id:
+                if not cls.undo_records:
+                    raise ValueError("没有可撤销的删除")
+                run_id = next(reversed(cls.undo_records))
+            record = cls.undo_records.get(run_id)
+        if record is not None:
+            roots = [Path(root) for root in record["roots"]]
+        else:
+            # 重启后内存中没有记录，按目录找回收批次，文件照常还原，分组需重新分析
+            roots = resolve_roots(payload.get("folder_path")) or resolve_roots(cls.default_path)
+        # 同一批次在每个涉及的扫描目录下各有一个回收区
+        run_dirs = [d for d in (quarantine_run_dir(root, run_id) for root in roots) if (d / QUARANTINE_MANIFEST).is_file()]
+        if not run_dirs:
+            raise ValueError("回收批次不存在或已清理")
+        parts = [restore_quarantine(run_dir, cls.delete_workers) for run_dir in run_dirs]
+        restored = {
+            "run_id": run_id,
+            "restored_count": sum(part["restored_count"] for part in parts),
+            "restored": [path for part in parts for path in part["restored"]],
+            "failed_count": sum(part["failed_count"] for part in parts),
+            "failed": [item for part in parts for item in part["failed"]],
+        }
+        if record is not None and cls.scan_cache is not None:
+            done = set(restored["restored"])
+            cls.scan_cache.restore_rows([row for row in record["cache_rows"] if row[2] in done])
+
+        result_restored = False
+        with cls.lock:
+            cls.undo_records.pop(run_id, None)
+            before = record["before"] if record is not None else None
+            current = cls.latest_result
+            if before is not None and current is not None and restored["restored"]:
+                result_restored = cls._restore_result(before, current, set(restored["restored"]))
+            if cls.latest_result:
+                restored["summary"] = summarize_result(cls.latest_result, cls.latest_version)
+        restored["result_restored"] = result_restored
+        return restored
+
+    @classmethod
+    def _restore_result(cls, before: dict[str, Any], current: dict[str, Any], restored: set[str]) -> bool:
+        # 调用方需持有 cls.lock。只有当前结果是删除前结果逐次剔除得到的（同目录同参数、文件是其子集），
+        # 才能在删除前结果上剔除仍不在盘上的文件来还原；期间重新分析过则交给下一次分析。
+        # 分组只剩一个文件时会整组移出结果，所以不在当前结果里的文件要逐个确认是否真被删了
+        if before["folder"] != current["folder"] or before["params"] != current["params"]:
+            return False
+        before_paths = {f["path"] for g in before["groups"] for f in g["files"]}
+        current_paths = {f["path"] for g in current["groups"] for f in g["files"]}
+        if not current_paths <= before_paths:
+            return False
+        still_missing = [p for p in before_paths - current_paths - restored if not os.path.lexists(p)]
+        cls.publish_result(prune_deleted(before, still_missing)[0])
+        return True
+
+    @classmethod
+    def list_quarantine(cls, folder_raw: Any) -> dict[str, Any]:
+        roots = resolve_roots(folder_raw) or resolve_roots(cls.default_path)
+        runs = [{**run, "root": str(root)} for root in roots for run in list_quarantine_runs(root)]
+        runs.sort(key=lambda run: run["run_id"], reverse=True)
+        return {
+            "folder": join_roots(roots),
+            "roots": [str(root) for root in roots],
+            "days": cls.quarantine_days,
+            "runs": runs,
+        }
+
+    @classmethod
+    def purge_quarantine_runs(cls, payload: dict[str, Any]) -> dict[str, Any]:
+        roots = resolve_roots(payload.get("folder_path")) or resolve_roots(cls.default_path)
+        run_id = str(payload.get("run_id", "")).strip() or None
+        days = payload.get("older_than_days")
+        older_than = float(days) * 86400 if days is not None else None
+        # 不带任何条件会清空全部回收批次，必须显式确认
+        if run_id is None and older_than is None and payload.get("all") is not True:
+            raise ValueError("请指定 run_id 或 older_than_days；清空全部回收批次需传 all: true")
+        purged: list[str] = []
+        for root in roots:
+            for name in purge_quarantine(root, older_than, run_id):
+                if name not in purged:
+                    purged.append(name)
+        with cls.lock:
+            for name in purged:
+                cls.undo_records.pop(name, None)
+        return {"purged": purged, "purged_count": len(purged)}
+
+    @classmethod
+    def purge_expired_quarantine(cls) -> None:
+        if cls.quarantine_days <= 0:
+            return
+        with cls.lock:
+            roots = set(cls.quarantine_roots) | set(split_roots(cls.default_path))
+        for root in roots:
             try:
-                folder_saved = save_default_path(type(self).config_path, result["folder"])
-                save_stopwords(type(self).config_path, normalized)
-            except Exception:  # noqa: BLE001
-                folder_saved = result["folder"]
-                pass
-            with self.lock:
-                self.latest_result = result
-                type(self).persisted_stopwords = normalized
-                type(self).persisted_default_path = folder_saved
-                type(self).default_path = folder_saved
-            self._send_json(result)
-        except Exception as exc:  # noqa: BLE001
-            self._send_json({"error": str(exc)}, status=400)
+                purged = purge_quarantine(Path(root), cls.quarantine_days * 86400)
+            except OSError:
+                continue
+            with cls.lock:
+                for name in purged:
+                    cls.undo_records.pop(name, None)
+
+    def _stream_analysis(self, payload: dict[str, Any]) -> None:
+        events: queue.Queue[tuple[str, dict[str, Any]]] = queue.Queue()
+        job = self._submit_analysis(payload, "interactive", listener=lambda p, c: events.put((p, c)), retain=False)
+        self._stream_job(job, events)
+
+    def _stream_job(self, job: Job, events: queue.Queue[tuple[str, dict[str, Any]]]) -> None:
+        self._start_stream("application/x-ndjson; charset=utf-8")
+        last_phase = ""
+        last_sent = 0.0
+        last_ahead = -1
+
+        try:
+            while not job.done.is_set() or not events.empty():
+                try:
+                    phase, counters = events.get(timeout=0.25)
+                except queue.Empty:
+                    if job.status == "queued":
+                        ahead = type(self).jobs.ahead_of(job)
+                        if ahead != last_ahead:
+                            last_ahead = ahead
+                            self._write_ndjson({"event": "progress", "phase": "queued", "counters": {"ahead": ahead}})
+                    continue
+                now = time.monotonic()
+                # 同一阶段内限流，阶段切换与阶段结束事件总是发送
+                if phase == last_phase and not counters.get("done") and now - last_sent < 0.1:
+                    continue
+                last_phase = phase
+                last_sent = now
+                self._write_ndjson({"event": "progress", "phase": phase, "counters": counters})
+
+            if job.status == "done":
+                self._write_ndjson({"event": "result", "result": job.result})
+            elif job.status == "cancelled":
+                self._write_ndjson({"event": "cancelled", "error": job.error})
+            else:
+                self._write_ndjson({"event": "error", "error": job.error})
+            self._end_stream()
+        except (BrokenPipeError, ConnectionResetError):
+            # 客户端已断开（页面中止了请求），不再为其继续计算；删除任务在当前批次结束后停止
+            job.cancel.cancel()
+            self.close_connection = True
+
+    def _stream_events(self) -> None:
+        # Server-Sent Events：结果每次发布（监听到目录变化、其他页面分析或删除）都推送摘要，
+        # 页面据此刷新分页视图；连接建立时先推送一次当前结果
+        cls = type(self)
+        self._start_stream("text/event-stream; charset=utf-8")
+        sent = -1
+        try:
+            while True:
+                with cls.result_changed:
+                    if cls.latest_version == sent:
+                        cls.result_changed.wait(EVENTS_KEEPALIVE_SECONDS)
+                    data = cls.latest_result
+                    version = cls.latest_version
+                if version == sent:
+                    self._write_chunk(b": keepalive\n\n")
+                    continue
+                sent = version
+                if data is not None:
+                    summary = json.dumps(summarize_result(data, version), ensure_ascii=False)
+                    self._write_chunk(f"event: result\ndata: {summary}\n\n".encode("utf-8"))
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def _stream_export(self, data: dict[str, Any], version: int, order: list[int], fmt: str) -> None:
+        # 直接从缓存结果逐块生成，服务端不落盘也不拼出整份导出内容
+        if fmt == "csv":
+            content_type = "text/csv; charset=utf-8"
+            chunks = iter_export_csv(data, order)
+            prefix = "\ufeff"  # Excel 依据 BOM 识别 UTF-8
+        else:
+            content_type = "application/x-ndjson; charset=utf-8"
+            chunks = iter_export_ndjson(data, order, evidence=True)
+            prefix = ""
+        filename = f"novel_groups_v{version}.{fmt}"
+        self._start_stream(content_type, {"Content-Disposition": f'attachment; filename="{filename}"'})
+        try:
+            for chunk in chunks:
+                self._write_chunk((prefix + chunk).encode("utf-8"))
+                prefix = ""
+            self._end_stream()
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def _start_stream(self, content_type: str, headers: dict[str, str] | None = None) -> None:
+        self._chunked = self.request_version == "HTTP/1.1"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("X-Accel-Buffering", "no")
+        self.send_header("Vary", "Accept-Encoding")
+        # 流式响应只用 gzip：每个事件后同步刷新，客户端可以边收边解压
+        self._stream_compressor = None
+        if negotiate_encoding(self.headers.get("Accept-Encoding", ""), {"gzip": None}):
+            self._stream_compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+            self.send_header("Content-Encoding", "gzip")
+        if self._chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+        else:
+            self.close_connection = True
+        self.end_headers()
+
+    def _write_chunk(self, data: bytes, final: bool = False) -> None:
+        if self._stream_compressor is not None:
+            data = self._stream_compressor.compress(data) + self._stream_compressor.flush(
+                zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH
+            )
+        if not data:
+            return
+        if self._chunked:
+            self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        else:
+            self.wfile.write(data)
+        self.wfile.flush()
+
+    def _write_ndjson(self, payload: dict[str, Any]) -> None:
+        self._write_chunk(json.dumps(payload, ensure_ascii=False).encode("utf-8") + b"\n")
+
+    def _end_stream(self) -> None:
+        if self._stream_compressor is not None:
+            self._write_chunk(b"", final=True)
+            self._stream_compressor = None
+        if self._chunked:
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
 
     def log_message(self, format: str, *args: Any) -> None:  # noqa: A003
         return
@@ -1684,18 +5999,27 @@ def main() -> int:
     parser.add_argument("--port", type=int, default=18080, help="监听端口，默认 18080")
     parser.add_argument(
         "--default-path",
-        default=DEFAULT_SCAN_DIR,
-        help="WebUI 默认扫描目录",
+        action="append",
+        default=None,
+        help=f"WebUI 默认扫描目录，可重复指定多个目录，默认 {DEFAULT_SCAN_DIR}",
     )
     parser.add_argument(
         "--export-json",
         default="",
         help="可选：命令行模式输出分析 JSON 文件路径（提供后不启动 Web）",
     )
+    parser.add_argument(
+        "--export-format",
+        choices=("auto", "json", "ndjson"),
+        default="auto",
+        help="--export-json 的输出格式：json 为完整对象，ndjson 为首行摘要、之后每行一个分组；"
+        "auto 按扩展名判断（.ndjson/.jsonl 为 ndjson）",
+    )
     parser.add_argument(
         "--folder",
-        default="",
-        help="命令行模式：待分析目录（与 --export-json 搭配使用）",
+        action="append",
+        default=None,
+        help="命令行模式：待分析目录（与 --export-json 搭配使用）；可重复指定多个目录，合并查找跨目录的同名文件",
     )
     parser.add_argument(
         "--extensions",
@@ -1712,19 +6036,227 @@ def main() -> int:
         default=",".join(DEFAULT_STOPWORDS),
         help="命令行模式：停用词，逗号分隔",
     )
+    parser.add_argument(
+        "--recursive",
+        action="store_true",
+        help="命令行模式：递归扫描子目录",
+    )
+    parser.add_argument(
+        "--max-depth",
+        type=int,
+        default=None,
+        help="命令行模式：递归扫描的最大深度（0 表示仅根目录），默认不限",
+    )
+    parser.add_argument(
+        "--include",
+        default="",
+        help="命令行模式：仅包含匹配的文件，逗号分隔的通配符，按相对路径或文件名匹配",
+    )
+    parser.add_argument(
+        "--exclude",
+        default="",
+        help="命令行模式：排除匹配的文件或子目录，逗号分隔的通配符，按相对路径或名称匹配",
+    )
+    parser.add_argument(
+        "--scan-workers",
+        type=int,
+        default=8,
+        help="递归扫描时并发列目录的线程数，默认 8",
+    )
     parser.add_argument("--min-pair-matches", type=int, default=2)
     parser.add_argument("--max-df-abs", type=int, default=120)
     parser.add_argument("--max-df-ratio", type=float, default=0.04)
+    parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default="exact",
+        help="候选生成引擎：exact 为倒排表精确配对；minhash 为 MinHash/LSH 近似召回，适合超大文件库，默认 exact",
+    )
+    parser.add_argument(
+        "--minhash-bands",
+        type=int,
+        default=16,
+        help="minhash 引擎的分段数，越大召回越高、越慢，默认 16",
+    )
+    parser.add_argument(
+        "--minhash-rows",
+        type=int,
+        default=1,
+        help="minhash 引擎每段的哈希数，越大越严格、候选越少，默认 1",
+    )
+    parser.add_argument(
+        "--content-dedup",
+        action="store_true",
+        help="CLI 导出时同时比对文件内容，内容完全相同的文件并入同组（按大小分桶、首尾哈希、整文件哈希逐级筛选）",
+    )
+    parser.add_argument(
+        "--text-simhash",
+        action="store_true",
+        help="CLI 导出时对 .txt 正文计算 SimHash，正文近似重复的文件并入同组",
+    )
+    parser.add_argument(
+        "--simhash-distance",
+        type=int,
+        default=3,
+        help=f"正文 SimHash 判定近似重复的最大海明距离（0-{SIMHASH_MAX_DISTANCE}），默认 3",
+    )
+    parser.add_argument(
+        "--text-workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="计算正文 SimHash 的进程数，默认为 CPU 核数",
+    )
+    parser.add_argument(
+        "--delete-workers",
+        type=int,
+        default=8,
+        help="批量删除时并发删除文件的线程数，网络盘上可适当调大，默认 8",
+    )
+    parser.add_argument(
+        "--delete-mode",
+        choices=DELETE_MODES,
+        default="quarantine",
+        help=f"页面删除文件的方式：quarantine 移入扫描目录下的 {QUARANTINE_DIRNAME} 回收区，可撤销；delete 直接删除。默认 quarantine",
+    )
+    parser.add_argument(
+        "--quarantine-days",
+        type=float,
+        default=7.0,
+        help="回收区批次保留天数，过期后由后台定期永久删除；0 表示不自动清理，默认 7",
+    )
+    parser.add_argument(
+        "--pair-workers",
+        type=int,
+        default=1,
+        help="exact 引擎统计候选对时使用的进程数，配对量较小时自动退回单进程，默认 1",
+    )
+    parser.add_argument(
+        "--pair-memory-mb",
+        type=int,
+        default=0,
+        help="exact 引擎统计候选对的内存预算（MB），超出后分批排序写入临时文件、连边时归并，较慢但不会耗尽内存；0 表示不限，默认 0",
+    )
+    parser.add_argument(
+        "--lsh-max-bucket",
+        type=int,
+        default=8,
+        help="minhash 引擎中每个文件在同一桶内最多配对的后续文件数，默认 8",
+    )
     parser.add_argument(
         "--open-browser",
         action="store_true",
         help="服务启动后自动打开浏览器",
     )
+    parser.add_argument(
+        "--no-scan-cache",
+        action="store_true",
+        help="不使用扫描元数据缓存，每次都重新读取并规范化全部文件名",
+    )
+    parser.add_argument(
+        "--rebuild-scan-cache",
+        action="store_true",
+        help="启动前清空并重建扫描元数据缓存",
+    )
+    parser.add_argument(
+        "--analysis-cache-entries",
+        type=int,
+        default=4,
+        help="Web 模式下每个分析阶段（扫描/片段/倒排/配对统计）保留的缓存条目数，默认 4",
+    )
+    parser.add_argument(
+        "--job-workers",
+        type=int,
+        default=2,
+        help="Web 模式下同时执行分析/导出/删除任务的工作线程数，默认 2",
+    )
+    parser.add_argument(
+        "--job-queue-size",
+        type=int,
+        default=32,
+        help="Web 模式下最多排队的任务数，超出时新任务会被拒绝，默认 32",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="常驻监听扫描目录，文件增删改名后增量更新分组（仅按文件名分组）；Web 模式按默认目录与命令行扫描参数监听并推送到页面，"
+        "与 --export-json 搭配时每次变化重写 JSON",
+    )
+    parser.add_argument(
+        "--watch-interval",
+        type=float,
+        default=2.0,
+        help="无 inotify 时轮询目录的间隔秒数，默认 2",
+    )
     args = parser.parse_args()
+    args.default_path = join_roots(split_roots(args.default_path)) or DEFAULT_SCAN_DIR
+    lengths = [int(x.strip()) for x in str(args.lengths).split(",") if x.strip()]
+    scan_options = ScanOptions(
+        recursive=args.recursive,
+        max_depth=parse_max_depth(args.max_depth),
+        include=split_patterns(args.include),
+        exclude=split_patterns(args.exclude),
+        workers=args.scan_workers,
+    )
+    engine_options = EngineOptions(
+        engine=args.engine,
+        bands=args.minhash_bands,
+        rows=args.minhash_rows,
+        max_bucket=args.lsh_max_bucket,
+        workers=max(1, args.pair_workers),
+        pair_memory_mb=max(0, args.pair_memory_mb),
+    )
+
+    config_path = Path(__file__).resolve().parent / CONFIG_FILENAME
+    scan_cache: ScanCache | None = None
+    if not args.no_scan_cache:
+        scan_cache = ScanCache(config_path.with_name(SCAN_CACHE_FILENAME))
+        if args.rebuild_scan_cache:
+            scan_cache.rebuild()
 
     if args.export_json:
-        folder = args.folder or args.default_path
-        lengths = [int(x.strip()) for x in str(args.lengths).split(",") if x.strip()]
+        folder = split_roots(args.folder) or split_roots(args.default_path)
+        output = Path(args.export_json).resolve()
+        export_format = resolve_export_format(args.export_format, output)
+        if args.watch:
+            # 常驻索引只维护按文件名分组的 exact 结果，与页面跟随监听的条件（is_watchable）一致
+            watch_params = {
+                "engine": engine_options.engine,
+                "content_dedup": args.content_dedup,
+                "text_simhash_distance": args.simhash_distance if args.text_simhash else None,
+            }
+            if not is_watchable(watch_params):
+                parser.error("--watch 只支持 exact 引擎，不能与 --content-dedup 或 --text-simhash 同时使用")
+            if len(folder) > 1:
+                parser.error("--watch 只支持单个目录")
+
+            def write_result(result: dict[str, Any]) -> None:
+                # 先写临时文件再替换，读取方不会看到写了一半的 JSON
+                tmp = output.with_name(output.name + ".tmp")
+                write_result_file(result, tmp, export_format)
+                os.replace(tmp, output)
+                print(f"已更新分析结果：{output}（{result['group_count']} 个分组）")
+
+            watch = FolderWatch(
+                folder[0],
+                args.extensions,
+                args.stopwords,
+                lengths,
+                args.min_pair_matches,
+                args.max_df_abs,
+                args.max_df_ratio,
+                on_update=write_result,
+                scan_cache=scan_cache,
+                scan_options=scan_options,
+                interval=args.watch_interval,
+                pair_workers=engine_options.workers,
+            )
+            print("正在监听目录变化，按 Ctrl+C 退出")
+            try:
+                watch.run()
+            except KeyboardInterrupt:
+                pass
+            return 0
+
         result = analyze_folder(
             folder_path=folder,
             extensions_raw=args.extensions,
@@ -1733,24 +6265,88 @@ def main() -> int:
             min_pair_matches=args.min_pair_matches,
             max_df_abs=args.max_df_abs,
             max_df_ratio=args.max_df_ratio,
+            scan_cache=scan_cache,
+            scan_options=scan_options,
+            engine_options=engine_options,
+            content_dedup=args.content_dedup,
+            text_simhash_distance=args.simhash_distance if args.text_simhash else None,
+            text_workers=max(1, args.text_workers),
+            lazy_groups=True,
         )
 
-        output = Path(args.export_json).resolve()
-        output.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+        # 分组边生成边写出，不在内存中保留完整结果
+        write_result_file(result, output, export_format)
         print(f"已输出分析结果：{output}")
+        if scan_cache is not None:
+            stats = scan_cache.stats()
+            print(f"扫描缓存：命中 {stats['hits']}，未命中 {stats['misses']}")
         return 0
 
-    config_path = Path(__file__).resolve().parent / CONFIG_FILENAME
     fallback_stopwords = ",".join(parse_stopwords(args.stopwords))
     persisted_stopwords = load_saved_stopwords(config_path, fallback_stopwords)
     persisted_default_path = load_saved_default_path(config_path, args.default_path)
 
-    Handler.default_path = str(Path(persisted_default_path).resolve())
-    Handler.persisted_default_path = str(Path(persisted_default_path).resolve())
+    Handler.default_path = join_roots(resolve_roots(persisted_default_path))
+    Handler.persisted_default_path = Handler.default_path
     Handler.config_path = config_path
     Handler.persisted_stopwords = persisted_stopwords
+    Handler.scan_cache = scan_cache
+    Handler.analysis_cache = AnalysisCache(args.analysis_cache_entries)
+    Handler.scan_workers = max(1, args.scan_workers)
+    Handler.delete_workers = max(1, args.delete_workers)
+    Handler.delete_mode = args.delete_mode
+    Handler.quarantine_days = max(0.0, args.quarantine_days)
+    Handler.text_workers = max(1, args.text_workers)
+    Handler.jobs = JobQueue(args.job_workers, args.job_queue_size)
+    Handler.engine_options = engine_options
     server = ThreadingHTTPServer((args.host, args.port), Handler)
     print(f"小说同名筛选 WebUI 已启动：http://{args.host}:{args.port}")
+    if args.watch and len(split_roots(Handler.default_path)) > 1:
+        print("目录监听只支持单个目录，默认目录包含多个目录，已跳过监听")
+    elif args.watch:
+
+        def publish_watch(result: dict[str, Any]) -> None:
+            # 页面结果为其他目录或其他参数时不覆盖；重新分析监听目录后监听按新参数重建，口径再次一致
+            with Handler.lock:
+                current = Handler.latest_result
+                if current is None or same_analysis(current, result):
+                    Handler.publish_result(result)
+
+        folder_watch = FolderWatch(
+            Handler.default_path,
+            args.extensions,
+            persisted_stopwords,
+            lengths,
+            args.min_pair_matches,
+            args.max_df_abs,
+            args.max_df_ratio,
+            on_update=publish_watch,
+            scan_cache=scan_cache,
+            scan_options=scan_options,
+            interval=args.watch_interval,
+            pair_workers=engine_options.workers,
+        )
+
+        def run_watch() -> None:
+            try:
+                folder_watch.run()
+            except Exception as exc:  # noqa: BLE001
+                print(f"目录监听已停止：{exc}")
+
+        Handler.watch = folder_watch
+        threading.Thread(target=run_watch, daemon=True).start()
+        print(f"正在监听目录变化：{Handler.default_path}")
+    stop_purge = threading.Event()
+    if Handler.quarantine_days > 0:
+
+        def run_purge() -> None:
+            # 启动时先清理一次，之后定期检查过期的回收批次
+            while True:
+                Handler.purge_expired_quarantine()
+                if stop_purge.wait(QUARANTINE_PURGE_INTERVAL):
+                    return
+
+        threading.Thread(target=run_purge, daemon=True).start()
     print("按 Ctrl+C 退出")
     if args.open_browser:
         threading.Timer(0.8, lambda: webbrowser.open(f"http://{args.host}:{args.port}")).start()
@@ -1759,6 +6355,9 @@ def main() -> int:
     except KeyboardInterrupt:
         pass
     finally:
+        if Handler.watch is not None:
+            Handler.watch.stop()
+        stop_purge.set()
         server.server_close()
     return 0
 
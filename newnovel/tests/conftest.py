@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import json
+import sys
+import threading
+import urllib.error
+import urllib.request
+from collections import OrderedDict
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import novel_similarity_webui as nsw  # noqa: E402
+from novel_similarity_bench import generate_names  # noqa: E402
+
+LENGTHS = [2, 3, 4]
+MIN_PAIR_MATCHES = 2
+MAX_DF_ABS = 120
+MAX_DF_RATIO = 0.04
+EXTENSIONS = ".txt,.doc,.docx,.epub"
+
+
+def analyze(folder: Path | str, lengths: list[int] = LENGTHS, **options: Any) -> dict[str, Any]:
+    return nsw.analyze_folder(
+        str(folder),
+        EXTENSIONS,
+        ",".join(nsw.DEFAULT_STOPWORDS),
+        lengths,
+        MIN_PAIR_MATCHES,
+        MAX_DF_ABS,
+        MAX_DF_RATIO,
+        **options,
+    )
+
+
+def group_sets(result: dict[str, Any]) -> set[frozenset[str]]:
+    return {frozenset(item["path"] for item in group["files"]) for group in result["groups"]}
+
+
+@pytest.fixture
+def make_corpus(tmp_path: Path) -> Callable[..., Path]:
+    # 与基准语料同一生成规则，文件内容为空，仅文件名参与比对
+    def make(count: int = 600, seed: int = 1, name: str = "corpus") -> Path:
+        folder = tmp_path / name
+        folder.mkdir()
+        for filename in generate_names(count, seed):
+            (folder / filename).touch()
+        return folder
+
+    return make
+
+
+class Client:
+    def __init__(self, base: str) -> None:
+        self.base = base
+
+    def request(self, path: str, payload: dict[str, Any] | None = None) -> tuple[int, Any]:
+        data = json.dumps(payload).encode("utf-8") if payload is not None else None
+        req = urllib.request.Request(self.base + path, data=data, headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(req) as resp:
+                return resp.status, json.loads(resp.read())
+        except urllib.error.HTTPError as exc:
+            return exc.code, json.loads(exc.read())
+
+    def analyze(self, folder: Path) -> dict[str, Any]:
+        status, result = self.request("/api/analyze", {"folder_path": str(folder), "lengths": LENGTHS})
+        assert status == 200
+        return result
+
+
+@pytest.fixture
+def server(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[Client]:
+    # Handler 的状态都在类属性上，每个用例换一份新的，互不影响
+    for name, value in {
+        "config_path": tmp_path / nsw.CONFIG_FILENAME,
+        "default_path": str(tmp_path),
+        "persisted_default_path": str(tmp_path),
+        "persisted_stopwords": ",".join(nsw.DEFAULT_STOPWORDS),
+        "scan_cache": None,
+        "analysis_cache": nsw.AnalysisCache(),
+        "undo_records": OrderedDict(),
+        "quarantine_roots": set(),
+        "active_analyses": {},
+        "jobs": nsw.JobQueue(),
+        "watch": None,
+        "latest_result": None,
+        "latest_version": 0,
+        "group_orders": {},
+        "group_ids": None,
+        "path_groups": None,
+        "evidence_cache": {},
+        "page_cache": None,
+    }.items():
+        monkeypatch.setattr(nsw.Handler, name, value)
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), nsw.Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield Client(f"http://127.0.0.1:{httpd.server_address[1]}")
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
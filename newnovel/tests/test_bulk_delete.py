@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import os
+from typing import Any
+
+import pytest
+
+import novel_similarity_webui as nsw
+from conftest import Client
+
+
+def group(*files: tuple[str, int, str]) -> dict[str, Any]:
+    # 与 build_group 一致：文件按体积降序，体积并列最大的都标记为最新
+    latest = max(size for _, size, _ in files)
+    return {
+        "files": [
+            {
+                "name": name,
+                "path": f"/books/{name}",
+                "size_bytes": size,
+                "modified": modified,
+                "is_latest_by_size": size >= latest,
+            }
+            for name, size, modified in files
+        ]
+    }
+
+
+def test_plan_largest_keeps_every_tied_largest() -> None:
+    groups = [
+        group(
+            ("a.txt", 300, "2024-01-01 00:00:00"),
+            ("b.txt", 300, "2024-01-02 00:00:00"),
+            ("c.txt", 100, "2024-01-03 00:00:00"),
+        ),
+        group(("d.txt", 50, "2024-01-01 00:00:00"), ("e.epub", 50, "2024-01-01 00:00:00")),
+    ]
+    assert nsw.plan_bulk_deletion(groups, "largest", []) == (["/books/c.txt"], 1)
+
+
+def test_plan_newest_breaks_ties_by_size_order() -> None:
+    groups = [
+        group(
+            ("a.txt", 300, "2024-01-01 00:00:00"),
+            ("b.txt", 200, "2024-03-01 00:00:00"),
+            ("c.txt", 100, "2024-02-01 00:00:00"),
+        ),
+        # 修改时间相同时保留排在前面（更大）的文件
+        group(("d.txt", 90, "2024-05-01 00:00:00"), ("e.txt", 80, "2024-05-01 00:00:00")),
+    ]
+    assert nsw.plan_bulk_deletion(groups, "newest", []) == (["/books/a.txt", "/books/c.txt", "/books/e.txt"], 2)
+
+
+def test_plan_extension_follows_preference_order() -> None:
+    groups = [
+        group(
+            ("a.txt", 300, "2024-01-01 00:00:00"),
+            ("b.epub", 200, "2024-01-01 00:00:00"),
+            ("c.docx", 100, "2024-01-01 00:00:00"),
+        ),
+        # 没有首选扩展名时保留最大的文件，同一首选扩展名有多个时保留更大的那个
+        group(("d.doc", 90, "2024-01-01 00:00:00"), ("e.txt", 80, "2024-01-01 00:00:00")),
+        group(("f.epub", 70, "2024-01-01 00:00:00"), ("g.EPUB", 60, "2024-01-01 00:00:00")),
+    ]
+    paths, affected = nsw.plan_bulk_deletion(groups, "extension", [".epub", ".docx"])
+    assert paths == ["/books/a.txt", "/books/c.docx", "/books/e.txt", "/books/g.EPUB"]
+    assert affected == 3
+
+
+def test_plan_rejects_bad_policy() -> None:
+    with pytest.raises(ValueError):
+        nsw.plan_bulk_deletion([], "oldest", [])
+    with pytest.raises(ValueError):
+        nsw.plan_bulk_deletion([], "extension", [])
+
+
+def test_bulk_delete_requires_current_version(server: Client, make_corpus: Any) -> None:
+    folder = make_corpus(200, seed=31)
+    server.analyze(folder)
+    request = {"policy": "newest"}
+
+    status, plan = server.request("/api/bulk-delete", {**request, "dry_run": True})
+    assert status == 200
+    assert plan["planned_count"] > 0
+    stale = plan["version"]
+
+    # 执行时不带版本一律拒绝，不能删到页面没有预览过的结果
+    status, body = server.request("/api/bulk-delete", request)
+    assert status == 400
+    assert "version" in body["error"]
+
+    # 预览之后结果被重新分析，旧版本的删除计划作废
+    server.analyze(folder)
+    status, body = server.request("/api/bulk-delete", {**request, "version": stale})
+    assert status == 409
+    assert all(os.path.isfile(p) for p in plan["preview"])
+
+    status, plan = server.request("/api/bulk-delete", {**request, "dry_run": True})
+    assert status == 200
+    status, deleted = server.request("/api/bulk-delete", {**request, "version": plan["version"]})
+    assert status == 200
+    assert deleted["deleted_count"] == plan["planned_count"]
+    assert not any(os.path.lexists(p) for p in plan["preview"])
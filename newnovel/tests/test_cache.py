@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+import novel_similarity_webui as nsw
+from conftest import EXTENSIONS, analyze
+
+
+def analyze_cached(
+    folder: Path, scan_cache: nsw.ScanCache, analysis_cache: nsw.AnalysisCache, recursive: bool
+) -> dict[str, Any]:
+    return analyze(
+        folder,
+        scan_cache=scan_cache,
+        analysis_cache=analysis_cache,
+        scan_options=nsw.ScanOptions(recursive=recursive),
+    )
+
+
+def file_sizes(result: dict[str, Any]) -> dict[str, int]:
+    return {item["path"]: item["size_bytes"] for group in result["groups"] for item in group["files"]}
+
+
+def check_overwrite(folder: Path, tmp_path: Path, recursive: bool) -> None:
+    scan_cache = nsw.ScanCache(tmp_path / f"scan_{recursive}.sqlite")
+    analysis_cache = nsw.AnalysisCache()
+    before = file_sizes(analyze_cached(folder, scan_cache, analysis_cache, recursive))
+    target = next(path for path, size in before.items() if size == 0)
+
+    # 原地覆盖并保持目录 mtime 不变，模拟编辑器或下载工具直接改写文件
+    dir_stat = folder.stat()
+    file_stat = os.stat(target)
+    Path(target).write_bytes(b"x" * 4096)
+    os.utime(target, ns=(file_stat.st_atime_ns, file_stat.st_mtime_ns + 10**9))
+    os.utime(folder, ns=(dir_stat.st_atime_ns, dir_stat.st_mtime_ns))
+
+    after = file_sizes(analyze_cached(folder, scan_cache, analysis_cache, recursive))
+    assert after[target] == 4096
+    assert {path: size for path, size in after.items() if path != target} == {
+        path: size for path, size in before.items() if path != target
+    }
+    scan_cache.conn.close()
+
+
+def test_in_place_overwrite_invalidates_cache(make_corpus: Any, tmp_path: Path) -> None:
+    check_overwrite(make_corpus(300, seed=3), tmp_path, recursive=False)
+
+
+def test_in_place_overwrite_invalidates_cache_recursive(make_corpus: Any, tmp_path: Path) -> None:
+    check_overwrite(make_corpus(300, seed=3), tmp_path, recursive=True)
+
+
+def test_unchanged_folder_reuses_stages(make_corpus: Any, tmp_path: Path) -> None:
+    folder = make_corpus(300, seed=3)
+    scan_cache = nsw.ScanCache(tmp_path / "scan.sqlite")
+    analysis_cache = nsw.AnalysisCache()
+    first = analyze_cached(folder, scan_cache, analysis_cache, recursive=False)
+    second = analyze_cached(folder, scan_cache, analysis_cache, recursive=False)
+    assert file_sizes(first) == file_sizes(second)
+    stats = analysis_cache.stats()
+    assert stats["scan"]["hits"] == 1
+    assert stats["pair_stats"]["hits"] == 1
+    scan_cache.conn.close()
+
+
+def test_forget_paths_uses_path_index(tmp_path: Path) -> None:
+    scan_cache = nsw.ScanCache(tmp_path / "scan.sqlite")
+    plan = scan_cache.conn.execute(
+        "EXPLAIN QUERY PLAN DELETE FROM file_meta WHERE path IN (?, ?)", ("a", "b")
+    ).fetchall()
+    assert any("file_meta_path" in row[-1] for row in plan)
+    scan_cache.conn.close()
+
+
+def scan(folder: Path, scan_cache: nsw.ScanCache) -> list[nsw.FileMeta]:
+    return nsw.collect_files(folder, nsw.split_extensions(EXTENSIONS), scan_cache, nsw.ScanOptions())
+
+
+def test_scan_cache_reuses_unchanged_metadata(
+    make_corpus: Any, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    folder = make_corpus(200, seed=7)
+    db_path = tmp_path / "scan.sqlite"
+    scan_cache = nsw.ScanCache(db_path)
+    first = scan(folder, scan_cache)
+    assert scan_cache.stats()["misses"] == 200
+    scan_cache.conn.close()
+
+    # 重新打开同一数据库，未变化的文件直接取缓存，不再规范化文件名
+    normalized: list[str] = []
+    normalize_title = nsw.normalize_title
+
+    def counting_normalize(stem: str) -> str:
+        normalized.append(stem)
+        return normalize_title(stem)
+
+    monkeypatch.setattr(nsw, "normalize_title", counting_normalize)
+    scan_cache = nsw.ScanCache(db_path)
+    assert scan(folder, scan_cache) == first
+    assert scan_cache.stats()["hits"] == 200
+    assert normalized == []
+
+    # 改大小、改修改时间、删除、新增各一个文件，只有变化的文件重新读取
+    grown, touched, removed = (Path(meta.path) for meta in first[:3])
+    grown.write_bytes(b"x")
+    stat = touched.stat()
+    os.utime(touched, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    removed.unlink()
+    (folder / "新增的小说.txt").touch()
+    second = scan(folder, scan_cache)
+    assert sorted(normalized) == sorted([grown.stem, touched.stem, "新增的小说"])
+    assert {m.path: m.size_bytes for m in second}[str(grown)] == 1
+    assert set(scan_cache.load_folder(str(folder))) == {m.name for m in second}
+    scan_cache.conn.close()
+
+
+def test_forget_and_restore_rows(make_corpus: Any, tmp_path: Path) -> None:
+    folder = make_corpus(50, seed=7)
+    scan_cache = nsw.ScanCache(tmp_path / "scan.sqlite")
+    files = scan(folder, scan_cache)
+    doomed = [files[0].path, files[1].path, str(folder / "不存在.txt")]
+    rows = scan_cache.forget_paths(doomed)
+    assert sorted(row[2] for row in rows) == sorted(doomed[:2])
+    assert set(scan_cache.load_folder(str(folder))) == {m.name for m in files[2:]}
+
+    scan_cache.restore_rows(rows)
+    assert scan_cache.load_folder(str(folder), str(folder)) == {m.name: m for m in files}
+    scan_cache.conn.close()
+
+
+def test_schema_change_and_rebuild_reset_cache(make_corpus: Any, tmp_path: Path) -> None:
+    # 旧版本的数据库结构不兼容，打开时整表重建
+    db_path = tmp_path / "scan.sqlite"
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE file_meta (folder TEXT, name TEXT, mtime REAL)")
+    conn.execute("INSERT INTO file_meta VALUES ('x', 'y', 1.0)")
+    conn.execute(f"PRAGMA user_version = {nsw.SCAN_CACHE_SCHEMA_VERSION - 1}")
+    conn.commit()
+    conn.close()
+
+    folder = make_corpus(50, seed=7)
+    scan_cache = nsw.ScanCache(db_path)
+    assert scan_cache.conn.execute("PRAGMA user_version").fetchone()[0] == nsw.SCAN_CACHE_SCHEMA_VERSION
+    assert scan_cache.load_folder("x") == {}
+    files = scan(folder, scan_cache)
+    assert len(scan_cache.load_folder(str(folder))) == len(files)
+
+    scan_cache.rebuild()
+    assert scan_cache.load_folder(str(folder)) == {}
+    assert scan_cache.stats()["hits"] == scan_cache.stats()["misses"] == 0
+    scan(folder, scan_cache)
+    assert scan_cache.stats()["misses"] == len(files)
+    scan_cache.conn.close()
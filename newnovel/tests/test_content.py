@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import os
+import random
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+import novel_similarity_webui as nsw
+from conftest import analyze
+
+BLOCK = nsw.CONTENT_HEAD_TAIL_BYTES
+
+
+def file_meta(path: Path) -> nsw.FileMeta:
+    stat = path.stat()
+    return nsw.FileMeta(
+        name=path.name,
+        path=str(path),
+        stem=path.stem,
+        normalized=path.stem,
+        size_bytes=stat.st_size,
+        modified_ts=stat.st_mtime,
+        root=str(path.parent),
+    )
+
+
+def write(path: Path, data: bytes) -> nsw.FileMeta:
+    path.write_bytes(data)
+    return file_meta(path)
+
+
+def count_digests(monkeypatch: pytest.MonkeyPatch) -> dict[str, list[str]]:
+    calls: dict[str, list[str]] = {"partial": [], "full": []}
+    partial, full = nsw.partial_content_digest, nsw.full_content_digest
+
+    def counting_partial(path: str, size_bytes: int) -> str:
+        calls["partial"].append(os.path.basename(path))
+        return partial(path, size_bytes)
+
+    def counting_full(path: str) -> str:
+        calls["full"].append(os.path.basename(path))
+        return full(path)
+
+    monkeypatch.setattr(nsw, "partial_content_digest", counting_partial)
+    monkeypatch.setattr(nsw, "full_content_digest", counting_full)
+    return calls
+
+
+def test_small_files_match_on_whole_content(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    files = [
+        write(tmp_path / "a.txt", b"same body"),
+        write(tmp_path / "b.epub", b"same body"),
+        # 大小相同、内容不同
+        write(tmp_path / "c.txt", b"diff body"),
+        write(tmp_path / "d.txt", b"longer body"),
+        write(tmp_path / "e.txt", b""),
+        write(tmp_path / "f.txt", b""),
+    ]
+    calls = count_digests(monkeypatch)
+    found = nsw.find_content_duplicates(files, workers=1)
+    assert set(found) == {files[0].path, files[1].path}
+    assert found[files[0].path] == found[files[1].path]
+    # 大小唯一的文件与空文件不读内容；不超过首尾采样长度的文件，首尾哈希即整文件哈希
+    assert sorted(calls["partial"]) == ["a.txt", "b.epub", "c.txt"]
+    assert calls["full"] == []
+
+
+def test_large_files_need_full_hash(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    head, tail = b"h" * BLOCK, b"t" * BLOCK
+    files = [
+        write(tmp_path / "a.txt", head + b"middle-1" + tail),
+        write(tmp_path / "b.txt", head + b"middle-1" + tail),
+        # 首尾相同、中间不同：首尾哈希相撞，由整文件哈希区分
+        write(tmp_path / "c.txt", head + b"middle-2" + tail),
+        # 大小与开头相同、结尾不同：首尾哈希即可排除，不读整文件
+        write(tmp_path / "d.txt", head + b"middle-1" + b"x" * BLOCK),
+    ]
+    calls = count_digests(monkeypatch)
+    found = nsw.find_content_duplicates(files, workers=2)
+    assert set(found) == {files[0].path, files[1].path}
+    assert sorted(calls["partial"]) == ["a.txt", "b.txt", "c.txt", "d.txt"]
+    assert sorted(calls["full"]) == ["a.txt", "b.txt", "c.txt"]
+
+
+def test_content_hashes_cached_until_file_changes(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    scan_cache = nsw.ScanCache(tmp_path / "scan.sqlite")
+    folder = tmp_path / "books"
+    folder.mkdir()
+    body = b"h" * BLOCK + b"middle" + b"t" * BLOCK
+    files = [write(folder / "a.txt", body), write(folder / "b.txt", body), write(folder / "c.txt", b"small")]
+    expected = nsw.find_content_duplicates(files, scan_cache, workers=1)
+    assert set(expected) == {files[0].path, files[1].path}
+    rows = scan_cache.conn.execute("SELECT path, partial, full FROM content_hash ORDER BY path").fetchall()
+    assert [(path, bool(partial), bool(full)) for path, partial, full in rows] == [
+        (files[0].path, True, True),
+        (files[1].path, True, True),
+    ]
+
+    calls = count_digests(monkeypatch)
+    assert nsw.find_content_duplicates(files, scan_cache, workers=1) == expected
+    assert calls == {"partial": [], "full": []}
+
+    # 原地改写末尾一个字节：大小不变、修改时间变化，只有该文件重新计算
+    target = Path(files[1].path)
+    stat = target.stat()
+    target.write_bytes(body[:-1] + b"x")
+    os.utime(target, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert nsw.find_content_duplicates([files[0], file_meta(target)], scan_cache, workers=1) == {}
+    assert calls == {"partial": ["b.txt"], "full": []}
+    scan_cache.conn.close()
+
+
+def test_content_dedup_groups_unrelated_names(make_corpus: Any) -> None:
+    folder = make_corpus(50, seed=41)
+    write(folder / "完全无关的名字.txt", b"shared body")
+    write(folder / "另一个标题.txt", b"shared body")
+    names = {"完全无关的名字.txt", "另一个标题.txt"}
+
+    def groups_with(result: dict[str, Any]) -> list[dict[str, Any]]:
+        return [g for g in result["groups"] if any(f["name"] in names for f in g["files"])]
+
+    # 文件名毫无相似之处，只有比对内容时才归为一组
+    assert groups_with(analyze(folder)) == []
+    (group,) = groups_with(analyze(folder, content_dedup=True))
+    assert {f["name"] for f in group["files"]} == names
+    assert group["content_duplicate_count"] == 2
+
+
+def sentences(seed: int, count: int) -> str:
+    rng = random.Random(seed)
+    chars = "天地玄黄宇宙洪荒日月盈昃辰宿列张寒来暑往秋收冬藏云腾致雨露结为霜金生丽水玉出昆冈"
+    return "".join("".join(rng.choice(chars) for _ in range(rng.randint(6, 16))) + "。\n" for _ in range(count))
+
+
+def test_text_simhash_ignores_encoding_and_short_texts(tmp_path: Path) -> None:
+    body = sentences(1, 200)
+    (tmp_path / "utf8.txt").write_text(body, encoding="utf-8")
+    (tmp_path / "gbk.txt").write_text(body, encoding="gb18030")
+    (tmp_path / "other.txt").write_text(sentences(2, 200), encoding="utf-8")
+    (tmp_path / "short.txt").write_text(sentences(1, nsw.SIMHASH_MIN_FEATURES - 1), encoding="utf-8")
+
+    simhash, features = nsw.text_simhash(str(tmp_path / "utf8.txt"))
+    assert simhash is not None and features == 200
+    assert nsw.text_simhash(str(tmp_path / "gbk.txt")) == (simhash, features)
+    other, _ = nsw.text_simhash(str(tmp_path / "other.txt"))
+    assert other is not None and (simhash ^ other).bit_count() > nsw.SIMHASH_MAX_DISTANCE
+    assert nsw.text_simhash(str(tmp_path / "short.txt")) == (None, nsw.SIMHASH_MIN_FEATURES - 1)
+
+
+def test_find_text_near_duplicates_computes_and_caches(tmp_path: Path) -> None:
+    body = sentences(1, 200)
+    (tmp_path / "a.txt").write_text(body, encoding="utf-8")
+    (tmp_path / "b.txt").write_text(body, encoding="gb18030")
+    (tmp_path / "c.txt").write_text(sentences(2, 200), encoding="utf-8")
+    # 同样的正文，但不是 .txt，不参与比对
+    (tmp_path / "d.epub").write_text(body, encoding="utf-8")
+    files = [file_meta(tmp_path / name) for name in ("a.txt", "b.txt", "c.txt", "d.epub")]
+    scan_cache = nsw.ScanCache(tmp_path / "scan.sqlite")
+    assert nsw.find_text_near_duplicates(files, 3, scan_cache) == [(files[0].path, files[1].path)]
+    assert scan_cache.conn.execute("SELECT COUNT(*) FROM text_simhash").fetchone()[0] == 3
+    assert set(scan_cache.load_simhashes(files)) == {files[0].path, files[1].path, files[2].path}
+    scan_cache.conn.close()
+
+
+def cached_files(tmp_path: Path, simhashes: dict[str, int | None]) -> tuple[nsw.ScanCache, list[nsw.FileMeta]]:
+    # 指纹直接写入缓存，比对时不再读取正文，便于构造确定的海明距离
+    scan_cache = nsw.ScanCache(tmp_path / "scan.sqlite")
+    files = [
+        nsw.FileMeta(
+            name=name, path=f"/books/{name}", stem=name[:-4], normalized=name[:-4], size_bytes=100, modified_ts=1.0
+        )
+        for name in simhashes
+    ]
+    scan_cache.save_simhashes([(meta, simhashes[meta.name], 100) for meta in files])
+    return scan_cache, files
+
+
+def test_simhash_round_trips_as_signed_64_bit(tmp_path: Path) -> None:
+    values = {"a.txt": 0, "b.txt": (1 << 63) | 5, "c.txt": (1 << 64) - 1, "d.txt": None}
+    scan_cache, files = cached_files(tmp_path, values)
+    stored = dict(scan_cache.conn.execute("SELECT path, simhash FROM text_simhash").fetchall())
+    assert stored["/books/b.txt"] == ((1 << 63) | 5) - (1 << 64)
+    assert stored["/books/c.txt"] == -1
+    assert scan_cache.load_simhashes(files) == {f"/books/{name}": value for name, value in values.items()}
+
+    # 大小或修改时间不同的记录视为失效
+    stale = nsw.FileMeta(name="a.txt", path="/books/a.txt", stem="a", normalized="a", size_bytes=101, modified_ts=1.0)
+    assert scan_cache.load_simhashes([stale]) == {}
+    scan_cache.conn.close()
+
+
+@pytest.mark.parametrize("max_distance", range(nsw.SIMHASH_MAX_DISTANCE + 1))
+def test_near_duplicate_distance_boundary(tmp_path: Path, max_distance: int) -> None:
+    # 翻转的位分散在各个分段，检验按段分桶后恰好在阈值处截断
+    step = 64 // (max_distance + 1)
+    within = sum(1 << (i * step) for i in range(max_distance))
+    beyond = sum(1 << (i * step + 1) for i in range(max_distance + 1))
+    scan_cache, files = cached_files(
+        tmp_path, {"base.txt": 0, "within.txt": within, "beyond.txt": beyond, "none.txt": None}
+    )
+    assert (within ^ beyond).bit_count() > max_distance
+    pairs = nsw.find_text_near_duplicates(files, max_distance, scan_cache)
+    assert pairs == [("/books/base.txt", "/books/within.txt")]
+    scan_cache.conn.close()
+
+
+def test_near_duplicate_distance_is_clamped(tmp_path: Path) -> None:
+    far = (1 << (nsw.SIMHASH_MAX_DISTANCE + 1)) - 1
+    scan_cache, files = cached_files(tmp_path, {"a.txt": 0, "b.txt": far})
+    assert nsw.find_text_near_duplicates(files, 64, scan_cache) == []
+    assert nsw.find_text_near_duplicates(files, -1, scan_cache) == []
+    scan_cache.conn.close()
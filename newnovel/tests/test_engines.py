@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+import novel_similarity_webui as nsw
+from conftest import LENGTHS, MAX_DF_ABS, MAX_DF_RATIO, MIN_PAIR_MATCHES
+
+
+def group_sets(folder: Path, workers: int = 1, memory_budget: int = 0) -> set[frozenset[str]]:
+    files = nsw.collect_files(folder, nsw.split_extensions(".txt,.doc,.docx,.epub"), None, nsw.ScanOptions())
+    stopwords = nsw.parse_stopwords(",".join(nsw.DEFAULT_STOPWORDS))
+    ngram_index = nsw.build_ngram_index(files, LENGTHS, stopwords)
+    postings = nsw.build_postings(ngram_index.tokens)
+    max_allowed = nsw.compute_max_allowed(len(files), MAX_DF_ABS, MAX_DF_RATIO)
+    max_title_len = max(len(f.normalized) for f in files)
+    pair_stats: Any = nsw.count_pair_stats_sharded(
+        postings, max_allowed, LENGTHS, max_title_len, workers, memory_budget=memory_budget
+    )
+    if memory_budget:
+        assert isinstance(pair_stats, nsw.SpilledPairStats) and len(pair_stats.runs) > 1
+    uf, _ = nsw.link_pairs(len(files), pair_stats, ngram_index.cleaned, LENGTHS, MIN_PAIR_MATCHES)
+    groups = nsw.build_groups(files, uf)
+    return {frozenset(item["path"] for item in group["files"]) for group in groups}
+
+
+@pytest.fixture
+def corpus(make_corpus: Any) -> Path:
+    return make_corpus(800, seed=7)
+
+
+def test_sharded_matches_exact(corpus: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    expected = group_sets(corpus)
+    assert expected
+    monkeypatch.setattr(nsw, "PARALLEL_PAIR_MIN_WORK", 0)
+    assert group_sets(corpus, workers=2) == expected
+
+
+def test_spilled_matches_exact(corpus: Path) -> None:
+    expected = group_sets(corpus)
+    # 预算只够几十个累加项，强制多次落盘归并
+    assert group_sets(corpus, memory_budget=nsw.PAIR_ENTRY_BYTES * 50) == expected
+
+
+def test_sharded_spilled_matches_exact(corpus: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    expected = group_sets(corpus)
+    monkeypatch.setattr(nsw, "PARALLEL_PAIR_MIN_WORK", 0)
+    assert group_sets(corpus, workers=2, memory_budget=nsw.PAIR_ENTRY_BYTES * 100) == expected
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import io
+import json
+from pathlib import Path
+from typing import Any
+
+import novel_similarity_webui as nsw
+from conftest import analyze
+
+
+def test_write_result_json_matches_json_dumps(make_corpus: Any) -> None:
+    result = analyze(make_corpus(200, seed=17))
+    buf = io.StringIO()
+    nsw.write_result_json(result, buf)
+    assert buf.getvalue() == json.dumps(result, ensure_ascii=False, indent=2)
+
+
+def test_cli_exports_keep_evidence(make_corpus: Any, tmp_path: Path) -> None:
+    folder = make_corpus(200, seed=17)
+    expected = analyze(folder)
+    assert expected["groups"]
+
+    json_path = tmp_path / "out.json"
+    nsw.write_result_file(analyze(folder, lazy_groups=True), json_path, "json")
+    groups = json.loads(json_path.read_text(encoding="utf-8"))["groups"]
+
+    ndjson_path = tmp_path / "out.ndjson"
+    nsw.write_result_file(analyze(folder, lazy_groups=True), ndjson_path, "ndjson")
+    records = [json.loads(line) for line in ndjson_path.read_text(encoding="utf-8").splitlines()]
+    assert records[0]["type"] == "result"
+
+    for exported in (groups, records[1:]):
+        assert len(exported) == len(expected["groups"])
+        for group, original in zip(exported, expected["groups"]):
+            evidence = nsw.group_evidence(original, expected["params"], max_pairs=0)
+            assert group["shared_snippets"] == evidence["shared_snippets"]
+            assert group["length_stats_text"] == evidence["length_stats_text"]
+            assert group["id"] == original["id"]
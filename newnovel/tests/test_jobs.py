@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any
+
+from conftest import LENGTHS, Client
+
+
+def wait_job(server: Client, job_id: str) -> dict[str, Any]:
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        status, job = server.request(f"/api/jobs/{job_id}")
+        assert status == 200
+        if job["status"] not in ("queued", "running"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError("任务超时")
+
+
+def test_finished_analysis_job_keeps_summary_only(server: Client, make_corpus: Any) -> None:
+    folder = make_corpus(300, seed=5)
+    params = {"folder_path": str(folder), "lengths": LENGTHS, "include_groups": True}
+    status, submitted = server.request("/api/jobs", {"type": "analyze", "params": params})
+    assert status == 202
+    job = wait_job(server, submitted["job_id"])
+    assert job["status"] == "done"
+    assert "groups" not in job["result"]
+    assert job["result"]["group_count"] > 0
+
+    # 分组改由最新结果分页提供
+    status, page = server.request(f"/api/groups?version={job['result']['version']}&limit=5")
+    assert status == 200
+    assert len(page["groups"]) == 5
+
+
+def test_analyses_without_client_id_do_not_cancel_each_other(server: Client, make_corpus: Any) -> None:
+    # 同一地址上的两个请求都不带 client_id，不能按地址互相取消
+    folder = make_corpus(3000, seed=5)
+    payload = {"folder_path": str(folder), "lengths": LENGTHS}
+    statuses: list[int] = []
+
+    def run() -> None:
+        statuses.append(server.request("/api/analyze", payload)[0])
+
+    threads = [threading.Thread(target=run) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert statuses == [200, 200]
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any
+
+import novel_similarity_webui as nsw
+from conftest import Client, analyze
+
+
+def ids_by_members(groups: list[dict[str, Any]]) -> dict[frozenset[str], str]:
+    return {frozenset(f["path"] for f in g["files"]): g["id"] for g in groups}
+
+
+def test_group_ids_follow_members(make_corpus: Any) -> None:
+    folder = make_corpus(300, seed=23)
+    result = analyze(folder)
+    assert ids_by_members(analyze(folder)["groups"]) == ids_by_members(result["groups"])
+    for members, gid in ids_by_members(result["groups"]).items():
+        assert gid == nsw.group_id(members)
+
+    big = next(g for g in result["groups"] if len(g["files"]) >= 3)
+    pair = next(g for g in result["groups"] if len(g["files"]) == 2)
+    deleted = [big["files"][0]["path"], pair["files"][0]["path"]]
+    # 重复路径与不在结果中的路径不应影响计数
+    pruned, changes = nsw.prune_deleted(result, deleted + [deleted[0], str(folder / "不存在.txt")])
+    assert pruned["total_files"] == result["total_files"] - 2
+    assert pruned["group_count"] == result["group_count"] - 1
+    assert pruned["duplicate_file_count"] == result["duplicate_file_count"] - 3
+    assert sum(1 for g in changes.values() if g is None) == 1
+    for group in pruned["groups"]:
+        assert group["id"] == nsw.group_id(f["path"] for f in group["files"])
+    assert big["id"] not in {g["id"] for g in pruned["groups"]}
+
+    # 剔除后的分组与删除后重新分析得到的同成员分组 ID 相同
+    for path in deleted:
+        Path(path).unlink()
+    fresh = ids_by_members(analyze(folder)["groups"])
+    shared = fresh.keys() & ids_by_members(pruned["groups"]).keys()
+    assert shared
+    assert all(fresh[m] == ids_by_members(pruned["groups"])[m] for m in shared)
+
+
+def test_deletion_diff_and_undo_restore_ids(server: Client, make_corpus: Any) -> None:
+    folder = make_corpus(300, seed=23)
+    before = server.analyze(folder)
+    big = next(g for g in before["groups"] if len(g["files"]) >= 3)
+    path = big["files"][0]["path"]
+
+    status, deleted = server.request("/api/delete-files", {"folder_path": str(folder), "paths": [path]})
+    assert status == 200
+    [updated] = deleted["diff"]["updated"]
+    assert updated["previous_id"] == big["id"]
+    assert updated["id"] == nsw.group_id(f["path"] for f in big["files"][1:])
+    status, evidence = server.request(f"/api/groups/{updated['id']}/evidence")
+    assert status == 200
+    status, _ = server.request(f"/api/groups/{big['id']}/evidence")
+    assert status == 404
+
+    status, _ = server.request("/api/undo-delete", {"run_id": deleted["quarantine"]["run_id"]})
+    assert status == 200
+    status, page = server.request(f"/api/groups?limit={before['group_count']}")
+    assert ids_by_members(page["groups"]) == ids_by_members(before["groups"])
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+import novel_similarity_webui as nsw
+from conftest import Client, group_sets
+
+
+def test_quarantine_undo_restores_files_and_groups(server: Client, make_corpus: Any) -> None:
+    folder = make_corpus(200, seed=19)
+    before = server.analyze(folder)
+    paths = [item["path"] for item in before["groups"][0]["files"][:2]]
+
+    status, deleted = server.request("/api/delete-files", {"folder_path": str(folder), "paths": paths})
+    assert status == 200
+    assert deleted["deleted_count"] == 2
+    assert not any(os.path.lexists(p) for p in paths)
+    run_id = deleted["quarantine"]["run_id"]
+    assert (nsw.quarantine_run_dir(folder, run_id) / nsw.QUARANTINE_MANIFEST).is_file()
+
+    status, restored = server.request("/api/undo-delete", {"run_id": run_id})
+    assert status == 200
+    assert sorted(restored["restored"]) == sorted(paths)
+    assert restored["result_restored"]
+    assert all(os.path.isfile(p) for p in paths)
+    status, page = server.request(f"/api/groups?limit={before['group_count']}")
+    assert status == 200
+    assert group_sets(page) == group_sets(before)
+
+
+def test_purge_requires_explicit_scope(server: Client, make_corpus: Any) -> None:
+    folder = make_corpus(200, seed=19)
+    result = server.analyze(folder)
+    runs = []
+    for group in result["groups"][:2]:
+        status, deleted = server.request(
+            "/api/delete-files", {"folder_path": str(folder), "paths": [group["files"][0]["path"]]}
+        )
+        assert status == 200
+        runs.append(deleted["quarantine"]["run_id"])
+
+    # 不带条件的请求不能清空回收区
+    status, body = server.request("/api/purge-quarantine", {"folder_path": str(folder)})
+    assert status == 400
+    assert "error" in body
+    assert len(nsw.list_quarantine_runs(folder)) == 2
+
+    status, body = server.request("/api/purge-quarantine", {"folder_path": str(folder), "run_id": runs[0]})
+    assert status == 200
+    assert body["purged"] == [runs[0]]
+    assert [run["run_id"] for run in nsw.list_quarantine_runs(folder)] == [runs[1]]
+    status, _ = server.request("/api/undo-delete", {"run_id": runs[0]})
+    assert status == 400
+
+    status, body = server.request("/api/purge-quarantine", {"folder_path": str(folder), "all": True})
+    assert status == 200
+    assert body["purged"] == [runs[1]]
+    assert nsw.list_quarantine_runs(folder) == []
+
+
+def test_quarantine_creates_each_directory_once(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    root = tmp_path / "root"
+    paths = []
+    for sub in ("a", "a/b", "c"):
+        (root / sub).mkdir(parents=True)
+        for i in range(5):
+            (root / sub / f"{i}.txt").touch()
+            paths.append(str(root / sub / f"{i}.txt"))
+
+    made: list[Path] = []
+    depth = 0
+    mkdir = Path.mkdir
+
+    def counting_mkdir(self: Path, *args: Any, **kwargs: Any) -> None:
+        # parents=True 时 pathlib 会递归调用 mkdir，只记录最外层的调用
+        nonlocal depth
+        if depth == 0:
+            made.append(self)
+        depth += 1
+        try:
+            mkdir(self, *args, **kwargs)
+        finally:
+            depth -= 1
+
+    monkeypatch.setattr(Path, "mkdir", counting_mkdir)
+    result = nsw.delete_files(paths, root, quarantine="run-1")
+    monkeypatch.undo()
+    assert result["deleted_count"] == len(paths)
+    # 同一目录下的多个文件只创建一次回收区目录
+    assert sorted(made) == sorted(nsw.quarantine_run_dir(root, "run-1") / "files" / sub for sub in ("a", "a/b", "c"))
+
+    restored = nsw.restore_quarantine(nsw.quarantine_run_dir(root, "run-1"))
+    assert restored["restored_count"] == len(paths)
+    assert all(os.path.isfile(p) for p in paths)
@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any
+
+import novel_similarity_webui as nsw
+from conftest import analyze
+
+
+def test_split_roots_keeps_pipes_in_paths() -> None:
+    assert nsw.split_roots("/data/a|b\n /data/c \n\n/data/a|b") == ["/data/a|b", "/data/c"]
+    assert nsw.split_roots(["/data/a|b", "/data/c"]) == ["/data/a|b", "/data/c"]
+    assert nsw.split_roots(None) == []
+    roots = [Path("/data/a|b"), Path("/data/c")]
+    assert nsw.split_roots(nsw.join_roots(roots)) == [str(r) for r in roots]
+
+
+def test_analyze_roots_with_pipe_in_name(make_corpus: Any) -> None:
+    first = make_corpus(200, seed=29, name="第一|备份")
+    second = make_corpus(200, seed=29, name="second")
+    result = analyze(nsw.join_roots([first, second]))
+    assert result["roots"] == [str(first), str(second)]
+    assert result["total_files"] == 400
+    # 两个目录内容相同，每个分组都横跨两个目录
+    assert result["groups"]
+    assert all({f["root"] for f in g["files"]} == {str(first), str(second)} for g in result["groups"])
+
+
+def test_page_embeds_multi_root_default_path(monkeypatch: Any) -> None:
+    monkeypatch.setattr(nsw.Handler, "page_cache", None)
+    monkeypatch.setattr(nsw.Handler, "persisted_default_path", 'D:/小说\nE:/a|"b"')
+    body, _, _ = nsw.Handler.rendered_page()
+    html = body.decode("utf-8")
+    assert f"setFolderPath({json.dumps('D:/小说' + chr(10) + 'E:/a|' + chr(34) + 'b' + chr(34), ensure_ascii=False)});" in html
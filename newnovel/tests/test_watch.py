@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import queue
+import random
+import sys
+import threading
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+import novel_similarity_webui as nsw
+from conftest import EXTENSIONS, LENGTHS, MAX_DF_ABS, MAX_DF_RATIO, MIN_PAIR_MATCHES, analyze, group_sets
+
+
+def scan(folder: Path) -> list[nsw.FileMeta]:
+    return nsw.collect_files(folder, nsw.split_extensions(EXTENSIONS), None, nsw.ScanOptions())
+
+
+def full_groups(folder: Path) -> set[frozenset[str]]:
+    return group_sets(analyze(folder))
+
+
+def live_groups(index: nsw.LiveIndex, folder: Path) -> set[frozenset[str]]:
+    return group_sets(index.result(folder, nsw.split_extensions(EXTENSIONS), nsw.ScanOptions()))
+
+
+def test_live_index_matches_full_analysis(make_corpus: Any, tmp_path: Path) -> None:
+    # 语料分成两半：一半先建索引，另一半分批移入；期间穿插删除，文件数多次跨过频次上限的变化点
+    source = make_corpus(1200, seed=11, name="source")
+    folder = tmp_path / "watched"
+    folder.mkdir()
+    names = sorted(p.name for p in source.iterdir())
+    rng = random.Random(11)
+    rng.shuffle(names)
+    for name in names[:600]:
+        (source / name).rename(folder / name)
+    pending = names[600:]
+
+    index = nsw.LiveIndex(LENGTHS, nsw.parse_stopwords(",".join(nsw.DEFAULT_STOPWORDS)), MIN_PAIR_MATCHES, MAX_DF_ABS, MAX_DF_RATIO)
+    index.rebuild(scan(folder))
+    assert live_groups(index, folder) == full_groups(folder)
+
+    for step in range(6):
+        for name in pending[step * 9 : (step + 1) * 9]:
+            (source / name).rename(folder / name)
+        if step % 2:
+            for path in rng.sample(sorted(folder.iterdir()), 4):
+                path.unlink()
+        files = scan(folder)
+        assert index.sync(files)
+        assert live_groups(index, folder) == full_groups(folder)
+        assert index.max_allowed == nsw.compute_max_allowed(len(files), MAX_DF_ABS, MAX_DF_RATIO)
+
+
+def test_watch_follows_user_analysis(make_corpus: Any) -> None:
+    folder = make_corpus(300, seed=13)
+    updates: queue.Queue[dict[str, Any]] = queue.Queue()
+    watch = nsw.FolderWatch(
+        str(folder),
+        EXTENSIONS,
+        ",".join(nsw.DEFAULT_STOPWORDS),
+        [2, 3, 4, 5, 6],
+        MIN_PAIR_MATCHES,
+        MAX_DF_ABS,
+        MAX_DF_RATIO,
+        on_update=updates.put,
+        interval=0.2,
+    )
+    thread = threading.Thread(target=watch.run, daemon=True)
+    thread.start()
+    try:
+        first = updates.get(timeout=30)
+        result = analyze(folder)
+        assert not nsw.same_analysis(result, first)
+
+        # 按用户分析的参数重建后，推送的结果与用户结果一致
+        assert watch.follow(result)
+        followed = updates.get(timeout=30)
+        assert nsw.same_analysis(result, followed)
+        assert group_sets(followed) == group_sets(result)
+
+        # 常驻索引无法复现 minhash 结果，不跟随
+        assert not watch.follow(analyze(folder, engine_options=nsw.EngineOptions(engine="minhash")))
+    finally:
+        watch.stop()
+        thread.join(10)
+
+
+@pytest.mark.parametrize(
+    "extra",
+    [["--engine", "minhash"], ["--content-dedup"], ["--text-simhash"], ["--folder", "b"]],
+)
+def test_cli_watch_rejects_unwatchable_options(
+    extra: list[str], tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    argv = ["novel_similarity_webui.py", "--watch", "--no-scan-cache", "--export-json", str(tmp_path / "out.json")]
+    monkeypatch.setattr(sys, "argv", [*argv, "--folder", str(tmp_path), *extra])
+    with pytest.raises(SystemExit) as exc:
+        nsw.main()
+    assert exc.value.code == 2
+    assert "--watch" in capsys.readouterr().err
+    assert not (tmp_path / "out.json").exists()